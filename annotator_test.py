@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the Annotator against the simulated camera: that the text changes
+# once each wall-clock second and just after it, that the ISO, LED and
+# colours are written to the camera only when the mode changes, and reports
+# the cost of an update against formatting the annotation afresh (as each
+# second did before), e.g.:
+#
+#   % python3 annotator_test.py
+#
+
+import sys, time, argparse
+from datetime import datetime as dt
+from colorama import init, Fore, Style
+init()
+import tzlocal
+
+from core.logger import Level, Logger
+from lbr.annotator import Annotator
+from lbr.hal import SimCamera, SimClock, SimColor
+from test_support import Checker
+
+# ..............................................................................
+class CountingCamera(SimCamera):
+    '''
+    A simulated camera counting the writes of each of its properties.
+    '''
+    def __init__(self):
+        self.writes = {}
+        super().__init__(( 320, 240 ), 2, SimClock(), Level.WARN)
+        self.writes.clear()
+
+    def __setattr__(self, name, value):
+        if name != 'writes':
+            self.writes[name] = self.writes.get(name, 0) + 1
+        super().__setattr__(name, value)
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='test the video annotator.')
+    _parser.add_argument('--seconds', type=int, default=3, help='seconds to run the annotation loop')
+    _parser.add_argument('--repeats', type=int, default=2000, help='updates made when timing')
+    _args = _parser.parse_args(argv)
+    _log = Logger('annot-test', Level.INFO)
+
+    _checker = Checker(_log)
+    _check = _checker.check
+
+    _camera = CountingCamera()
+    _annotator = Annotator('LetterBox Robot', SimColor, Level.WARN)
+    _annotator.update(_camera, True)
+    _check(_camera.iso == 800 and _camera.led is False and _camera.annotate_background == '#440088',
+            'night mode was set on the camera.')
+    _check(_camera.annotate_text.startswith('LetterBox Robot ' + dt.now().strftime('%Y-%m-%d')), 'the annotation is {}.'.format(_camera.annotate_text))
+
+    # the loop, as run by Video
+    _camera.writes.clear()
+    _texts = []
+    _lateness = []
+    time.sleep(_annotator.delay())
+    for _ in range(_args.seconds):
+        _annotator.update(_camera, True)
+        _lateness.append(time.time() % 1.0)
+        _texts.append(_camera.annotate_text)
+        time.sleep(_annotator.delay())
+    _check(len(set(_texts)) == _args.seconds, 'the text changed each of {:d} seconds.'.format(_args.seconds))
+    _check(max(_lateness) < 0.05, 'updates followed the second by at most {:4.1f}ms.'.format(1000.0 * max(_lateness)))
+    _check(_camera.writes == { 'annotate_text': _args.seconds }, 'only the text was written: {}.'.format(_camera.writes))
+
+    _camera.writes.clear()
+    _annotator.update(_camera, False)
+    _annotator.update(_camera, False)
+    _check(_camera.iso == 100 and _camera.writes.get('iso') == 1 and _camera.writes.get('annotate_foreground') == 1,
+            'day mode was written once on change: {}.'.format(_camera.writes))
+    _camera.writes.clear()
+    _annotator.invalidate()
+    _annotator.update(_camera, False)
+    _check(len(_camera.writes) == 5, 'every property was written again once invalidated.')
+
+    # the cost of an update against the former annotation and night mode each second
+    _cpu = time.thread_time()
+    for _ in range(_args.repeats):
+        _camera.annotate_text = '{} {} {}'.format('LetterBox Robot', dt.now(tzlocal.get_localzone()).strftime('%Y-%m-%d %H:%M:%S %Z'), '')
+        _camera.iso = 800
+        _camera.led = False
+        _camera.annotate_foreground = SimColor.from_string('#ffdada')
+        _camera.annotate_background = SimColor.from_string('#440088')
+    _former = ( time.thread_time() - _cpu ) / _args.repeats
+    _camera.writes.clear()
+    _annotator.invalidate()
+    _annotator.update(_camera, True)
+    _cpu = time.thread_time()
+    for _ in range(_args.repeats):
+        _annotator.update(_camera, True)
+    _current = ( time.thread_time() - _cpu ) / _args.repeats
+    _log.info('per update: {:6.1f}µs formerly, 5 writes; now {:6.1f}µs (within a second), {:d} writes in {:d} updates.'.format(
+            1e6 * _former, 1e6 * _current, sum(_camera.writes.values()), _args.repeats + 1))
+    _fresh = time.thread_time()
+    for _second in range(_args.repeats):
+        _annotator.get_text(1_800_000_000 + _second)
+    _log.info('formatting a new second: {:6.1f}µs.'.format(1e6 * ( time.thread_time() - _fresh ) / _args.repeats))
+
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
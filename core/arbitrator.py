@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import heapq, itertools
+
+from core.logger import Level, Logger
+
+# ..............................................................................
+class Arbitrator(object):
+    '''
+    Decides which published events are dispatched, and in what order.
+
+    Events wait in a bounded priority queue and are released most urgent
+    first (by their EventType's priority), in publication order among
+    equals. An event of a coalescing type replaces one of the same type
+    still waiting, rather than queueing behind it. When the queue is full
+    a new event displaces the least urgent waiting event if it is more
+    urgent than that, otherwise it is dropped.
+
+    This is not thread safe: it is used only on the MessageBus's loop.
+
+    :param maxsize:  the maximum number of waiting events
+    :param level:    the log level
+    '''
+    def __init__(self, maxsize=100, level=Level.INFO):
+        self._log = Logger('arbitrator', level)
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1.')
+        self._maxsize   = maxsize
+        self._heap      = []            # [ priority, sequence, event ]
+        self._pending   = {}            # coalescing type: its heap entry
+        self._counter   = itertools.count()
+        self._dropped   = 0
+        self._displaced = 0
+        self._coalesced = 0
+
+    # ..........................................................................
+    def __len__(self):
+        return len(self._heap)
+
+    # ..........................................................................
+    def put(self, event):
+        '''
+        Admit the event, returning False if it was dropped.
+        '''
+        _type = event.type
+        if _type.coalesce:
+            _entry = self._pending.get(_type)
+            if _entry is not None:
+                _entry[2] = event # keeps its place in the queue
+                self._coalesced += 1
+                return True
+        if len(self._heap) >= self._maxsize:
+            # the least urgent waiting event is the largest entry: O(n), n being bounded
+            _index = max(range(len(self._heap)), key=lambda i: self._heap[i][:2])
+            _least = self._heap[_index]
+            if _least[0] <= _type.priority:
+                self._dropped += 1
+                self._log.debug('dropped event: {}'.format(event))
+                return False
+            self._heap[_index] = self._heap[-1]
+            self._heap.pop()
+            heapq.heapify(self._heap)
+            if _least[2].type.coalesce:
+                self._pending.pop(_least[2].type, None)
+            self._displaced += 1
+            self._log.debug('displaced event: {}'.format(_least[2]))
+        _entry = [ _type.priority, next(self._counter), event ]
+        heapq.heappush(self._heap, _entry)
+        if _type.coalesce:
+            self._pending[_type] = _entry
+        return True
+
+    # ..........................................................................
+    def get(self):
+        '''
+        Returns the most urgent waiting event, or None if there is none.
+        '''
+        if not self._heap:
+            return None
+        _entry = heapq.heappop(self._heap)
+        _event = _entry[2]
+        if _event.type.coalesce:
+            self._pending.pop(_event.type, None)
+        return _event
+
+    # ..........................................................................
+    def get_stats(self):
+        return {
+            'waiting':   len(self._heap),
+            'dropped':   self._dropped,
+            'displaced': self._displaced,
+            'coalesced': self._coalesced
+        }
+
+#EOF
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import time
+from enum import Enum
+
+# ..............................................................................
+class EventType(Enum):
+    '''
+    The types of events published on the MessageBus, with their priority
+    (lower is more urgent) and whether a newly published event replaces one
+    of the same type still waiting to be dispatched (coalescing).
+    '''
+    SHUTDOWN     = ( 0, "shutdown",     0, False )
+    DOOR_OPEN    = ( 1, "door open",    1, False )
+    DOOR_CLOSED  = ( 2, "door closed",  1, False )
+    PIR_ACTIVE   = ( 3, "pir active",   2, False )
+    PIR_IDLE     = ( 4, "pir idle",     2, False )
+    MOTION       = ( 5, "motion",       3, True  )
+    VIDEO_MOTION = ( 7, "video motion", 3, True  )
+    MAIL_PRESENT = ( 8, "mail present", 4, False )
+    MAIL_ABSENT  = ( 9, "mail absent",  4, False )
+    TICK         = ( 6, "tick",         9, True  )
+
+    # ignore the first param since it's already set by __new__
+    def __init__(self, num, name, priority, coalesce):
+        self._name     = name
+        self._priority = priority
+        self._coalesce = coalesce
+
+    # this makes sure the name is read-only
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def priority(self):
+        return self._priority
+
+    @property
+    def coalesce(self):
+        return self._coalesce
+
+# ..............................................................................
+class Event(object):
+    '''
+    An event published on the MessageBus. Slotted, since one is created for
+    every publish.
+
+    :param event_type:  the EventType
+    :param value:       an optional value
+    '''
+    __slots__ = ( 'type', 'value', 'timestamp' )
+
+    def __init__(self, event_type, value=None):
+        self.type      = event_type
+        self.value     = value
+        self.timestamp = time.monotonic()
+
+    def __repr__(self):
+        return 'Event({}, {})'.format(self.type.name, self.value)
+
+#EOF
@@ -7,10 +7,10 @@
 #
 # author:   Murray Altheim
 # created:  2020-01-14
-# modified: 2021-01-28
+# modified: 2026-10-17
 #
 
-import logging, math, traceback, threading
+import logging, math, time, queue, atexit, traceback, threading
 from logging.handlers import RotatingFileHandler
 from datetime import datetime as dt
 from enum import Enum
@@ -41,8 +41,23 @@ class Level(Enum):
 
 # ..............................................................................
 class Logger:
+    '''
+    A colourised wrapper around a named Python logger.
 
-    _suppress = False
+    By default a message is formatted and written on the calling thread,
+    under the Logger's mutex. Once start_queue() has been called (for all
+    Loggers) a message is instead put on a queue, without locking, and
+    formatted and written by a single background thread; stop_queue()
+    writes any remaining messages and returns to the default. The queue is
+    bounded: while it is full further messages are dropped and counted (see
+    dropped()), and a warning is written once it has drained. A message
+    below the Logger's level is dropped before any formatting, in either.
+    '''
+    _suppress   = False
+    _queue      = None # the queue of messages, in queue mode
+    _listener   = None # the thread writing queued messages
+    _max_queued = 0    # the messages that may wait on the queue
+    _dropped    = 0    # the messages dropped while the queue was full
     __color_debug    = Fore.BLUE   + Style.DIM
     __color_info     = Fore.CYAN   + Style.NORMAL
     __color_notice   = Fore.CYAN   + Style.BRIGHT
@@ -102,6 +117,123 @@ class Logger:
                 self.__log.addHandler(self._sh)
         self.level = level
 
+    # ..........................................................................
+    @staticmethod
+    def start_queue(max_queued=10000):
+        '''
+        Start queue mode for all Loggers: messages are formatted and written
+        on a background thread. This has no effect if already started.
+
+        :param max_queued:  the messages that may wait to be written, beyond
+                            which further messages are dropped
+        '''
+        if Logger._listener is None:
+            Logger._max_queued = max_queued
+            Logger._queue = queue.SimpleQueue()
+            Logger._listener = threading.Thread(target=Logger._dequeue, args=[Logger._queue], name='logger', daemon=True)
+            Logger._listener.start()
+            atexit.register(Logger.stop_queue)
+
+    # ..........................................................................
+    @staticmethod
+    def stop_queue():
+        '''
+        Stop queue mode, returning once any queued messages have been written.
+        '''
+        _listener = Logger._listener
+        if _listener is not None:
+            Logger._queue.put(None)
+            Logger._queue = None
+            Logger._listener = None
+            _listener.join()
+
+    # ..........................................................................
+    @staticmethod
+    def queued():
+        '''
+        Returns True if in queue mode.
+        '''
+        return Logger._queue is not None
+
+    # ..........................................................................
+    @staticmethod
+    def dropped():
+        '''
+        Returns the number of messages dropped in queue mode while the queue
+        was full.
+        '''
+        return Logger._dropped
+
+    # ..........................................................................
+    @staticmethod
+    def _dequeue(messages):
+        '''
+        Format and write queued messages until stopped, each with the time
+        it was logged rather than that at which it is written. Once the queue
+        has drained after dropping messages a warning gives their number.
+        '''
+        _stopping = False
+        _reported = Logger._dropped
+        _logger = None
+        while True:
+            if _stopping: # write those put by threads racing stop_queue()
+                try:
+                    _message = messages.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                _message = messages.get()
+            if _message is None:
+                _stopping = True
+                continue
+            _logger, _levelno, _created, _color, _token, _text = _message
+            _logger._handle(_levelno, _created, _color, _token, _text)
+            if Logger._dropped != _reported and messages.qsize() == 0:
+                _reported = _logger._report_dropped(_reported)
+        if Logger._dropped != _reported and _logger is not None:
+            _logger._report_dropped(_reported)
+
+    # ..........................................................................
+    def _report_dropped(self, reported):
+        '''
+        Write a warning of the messages dropped since the number reported,
+        returning the number now reported.
+        '''
+        _dropped = Logger._dropped
+        self._handle(logging.WARN, time.time(), Logger.__color_warning, self.__WARN_TOKEN,
+                'log queue full: {:d} messages dropped.'.format(_dropped - reported))
+        return _dropped
+
+    # ..........................................................................
+    def _handle(self, levelno, created, color, token, message):
+        '''
+        Format and write a queued message with the time it was logged.
+        '''
+        try:
+            _record = self.__log.makeRecord(self._name, levelno, '(queued)', 0,
+                    self._mf.format(color, token, message, Logger.__color_reset) if color else message, None, None)
+            _record.created = created
+            _record.msecs = float(int(( created - int(created) ) * 1000.0))
+            self.__log.handle(_record)
+        except Exception:
+            traceback.print_exc()
+
+    # ..........................................................................
+    def _write(self, levelno, color, token, message):
+        '''
+        Writes the message, queueing it in queue mode; if 'color' is None the
+        message is written without formatting.
+        '''
+        _queue = Logger._queue
+        if _queue is not None:
+            if _queue.qsize() < Logger._max_queued:
+                _queue.put(( self, levelno, time.time(), color, token, message ))
+            else: # counted without locking, so may be an undercount when threads race
+                Logger._dropped += 1
+        else:
+            with self._mutex:
+                self.__log.log(levelno, self._mf.format(color, token, message, Logger.__color_reset) if color else message)
+
     # ..........................................................................
     def set_suppress(self, suppress):
         '''
@@ -119,6 +251,7 @@ class Logger:
     @level.setter
     def level(self, level):
         self._level = level
+        self._levelno = level.value
         self.__log.setLevel(self._level.value)
         if self._fh:
             self._fh.setLevel(level.value)
@@ -147,9 +280,8 @@ class Logger:
 
         The optional 'end' argument is for special circumstances where a different end-of-line is desired.
         '''
-        if not self.suppressed:
-            with self._mutex:
-                self.__log.debug(self._mf.format(Logger.__color_debug, self.__DEBUG_TOKEN, message, Logger.__color_reset))
+        if self._levelno <= logging.DEBUG and not self._suppress:
+            self._write(logging.DEBUG, Logger.__color_debug, self.__DEBUG_TOKEN, message)
 
     # ..........................................................................
     def info(self, message):
@@ -158,9 +290,8 @@ class Logger:
 
         The optional 'end' argument is for special circumstances where a different end-of-line is desired.
         '''
-        if not self.suppressed:
-            with self._mutex:
-                self.__log.info(self._mf.format(Logger.__color_info, self.__INFO_TOKEN, message, Logger.__color_reset))
+        if self._levelno <= logging.INFO and not self._suppress:
+            self._write(logging.INFO, Logger.__color_info, self.__INFO_TOKEN, message)
 
     # ..........................................................................
     def notice(self, message):
@@ -169,9 +300,8 @@ class Logger:
 
         The optional 'end' argument is for special circumstances where a different end-of-line is desired.
         '''
-        if not self.suppressed:
-            with self._mutex:
-                self.__log.info(self._mf.format(Logger.__color_notice, self.__INFO_TOKEN, message, Logger.__color_reset))
+        if self._levelno <= logging.INFO and not self._suppress:
+            self._write(logging.INFO, Logger.__color_notice, self.__INFO_TOKEN, message)
 
     # ..........................................................................
     def warning(self, message):
@@ -180,9 +310,8 @@ class Logger:
 
         The optional 'end' argument is for special circumstances where a different end-of-line is desired.
         '''
-        if not self.suppressed:
-            with self._mutex:
-                self.__log.warning(self._mf.format(Logger.__color_warning, self.__WARN_TOKEN, message, Logger.__color_reset))
+        if self._levelno <= logging.WARN and not self._suppress:
+            self._write(logging.WARN, Logger.__color_warning, self.__WARN_TOKEN, message)
 
     # ..........................................................................
     def error(self, message):
@@ -191,25 +320,23 @@ class Logger:
 
         The optional 'end' argument is for special circumstances where a different end-of-line is desired.
         '''
-        if not self.suppressed:
-            with self._mutex:
-                self.__log.error(self._mf.format(Logger.__color_error, self.__ERROR_TOKEN, Style.NORMAL + message, Logger.__color_reset))
+        if self._levelno <= logging.ERROR and not self._suppress:
+            self._write(logging.ERROR, Logger.__color_error, self.__ERROR_TOKEN, Style.NORMAL + message)
 
     # ..........................................................................
     def critical(self, message):
         '''
         Prints a critical or otherwise application-fatal message.
         '''
-        with self._mutex:
-            self.__log.critical(self._mf.format(Logger.__color_critical, self.__FATAL_TOKEN, Style.BRIGHT + message, Logger.__color_reset))
+        if self._levelno <= logging.CRITICAL:
+            self._write(logging.CRITICAL, Logger.__color_critical, self.__FATAL_TOKEN, Style.BRIGHT + message)
 
     # ..........................................................................
     def file(self, message):
         '''
            This is just info() but without any formatting.
         '''
-        with self._mutex:
-            self.__log.info(message)
+        self._write(logging.INFO, None, None, message)
 
     # headings .................................................................
 
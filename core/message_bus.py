@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import asyncio, threading, traceback
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from core.event import Event, EventType
+from core.arbitrator import Arbitrator
+
+# ..............................................................................
+class MessageBus(object):
+    '''
+    An in-process publish-subscribe message bus running on an asyncio event
+    loop. Publishers (sensors) publish Events; subscribers (the Controller
+    and the devices it drives) subscribe to the EventTypes they're
+    interested in.
+
+    Published events pass through the Arbitrator, a bounded priority queue,
+    and are dispatched on the loop in priority order. Subscribers are
+    indexed by event type, so dispatching an event costs only the
+    subscribers to its type. A subscriber may be a function, called in
+    turn, or a coroutine function, run as a task.
+
+    publish() may be called from any thread. The bus runs either as the
+    run() coroutine on an existing loop, or on a loop of its own thread via
+    start(); stop() or close() end it once the waiting events have been
+    dispatched.
+
+    :param maxsize:  the maximum number of events waiting to be dispatched
+    :param level:    the log level
+    '''
+    def __init__(self, maxsize=100, level=Level.INFO):
+        self._log = Logger('bus', level)
+        self._arbitrator  = Arbitrator(maxsize, level)
+        self._subscribers = {} # EventType: tuple of ( callback, is_coroutine )
+        self._loop        = None
+        self._loop_thread = None # the ident of the loop's thread
+        self._thread      = None
+        self._ready       = None
+        self._stopping    = False
+        self._timers      = []
+        self._published   = 0
+        self._dispatched  = 0
+        self._errors      = 0
+        self._log.info('ready: {:d} events maximum.'.format(maxsize))
+
+    # ..........................................................................
+    def subscribe(self, event_types, callback):
+        '''
+        Subscribe the callback to an EventType or a list of them. The
+        callback is called with the Event.
+        '''
+        if isinstance(event_types, EventType):
+            event_types = [ event_types ]
+        _entry = ( callback, asyncio.iscoroutinefunction(callback) )
+        for _type in event_types:
+            # copy on write, so dispatch never sees a list being modified
+            self._subscribers[_type] = self._subscribers.get(_type, ()) + ( _entry, )
+            self._log.debug('subscribed to {}: {}'.format(_type.name, callback))
+
+    # ..........................................................................
+    def unsubscribe(self, event_type, callback):
+        _entries = self._subscribers.get(event_type, ())
+        self._subscribers[event_type] = tuple(_entry for _entry in _entries if _entry[0] != callback)
+
+    # ..........................................................................
+    def publish(self, event):
+        '''
+        Publish the Event. This may be called from any thread, and returns
+        immediately; events published before the bus runs wait for it.
+        '''
+        if self._loop is not None and threading.get_ident() != self._loop_thread:
+            try:
+                self._loop.call_soon_threadsafe(self._put, event)
+            except RuntimeError: # loop closed
+                self._log.debug('ignored event published after close: {}'.format(event))
+        else:
+            self._put(event)
+
+    # ..........................................................................
+    def _put(self, event):
+        self._published += 1
+        self._arbitrator.put(event)
+        if self._ready is not None:
+            self._ready.set()
+
+    # ..........................................................................
+    def publish_every(self, interval_sec, event_type):
+        '''
+        Publish an Event of the type every interval while the bus runs.
+        '''
+        self._timers.append(( interval_sec, event_type ))
+
+    # ..........................................................................
+    def _on_timer(self, interval_sec, event_type):
+        if not self._stopping:
+            self._put(Event(event_type))
+            self._loop.call_later(interval_sec, self._on_timer, interval_sec, event_type)
+
+    # ..........................................................................
+    async def run(self):
+        '''
+        Dispatch events on the running loop until stop() is called.
+        '''
+        self._loop        = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._ready       = asyncio.Event()
+        self._stopping    = False
+        for _interval, _type in self._timers:
+            self._loop.call_later(_interval, self._on_timer, _interval, _type)
+        if len(self._arbitrator):
+            self._ready.set()
+        self._log.info('running.')
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                _count = 0
+                _event = self._arbitrator.get()
+                while _event is not None:
+                    self._dispatch(_event)
+                    _count += 1
+                    if _count % 64 == 0:
+                        await asyncio.sleep(0) # let other tasks run
+                    _event = self._arbitrator.get()
+                if self._stopping:
+                    break
+        finally:
+            self._loop = None
+            self._ready = None
+            self._log.info('stopped: {}'.format(self.get_stats()))
+
+    # ..........................................................................
+    def _dispatch(self, event):
+        for _callback, _is_coroutine in self._subscribers.get(event.type, ()):
+            try:
+                if _is_coroutine:
+                    self._loop.create_task(_callback(event))
+                else:
+                    _callback(event)
+            except Exception:
+                self._errors += 1
+                self._log.error('error dispatching {} to {}: {}'.format(event, _callback, traceback.format_exc()))
+        self._dispatched += 1
+
+    # ..........................................................................
+    def stop(self):
+        '''
+        Stop run() once the waiting events have been dispatched. This may be
+        called from any thread.
+        '''
+        if self._loop is None:
+            return
+        def _stop():
+            self._stopping = True
+            self._ready.set()
+        if threading.get_ident() == self._loop_thread:
+            _stop()
+        else:
+            self._loop.call_soon_threadsafe(_stop)
+
+    # ..........................................................................
+    def start(self):
+        '''
+        Run the bus on a loop of its own, on a new thread.
+        '''
+        if self._thread is not None:
+            self._log.warning('already started.')
+            return
+        _started = threading.Event()
+        async def _run():
+            asyncio.get_running_loop().call_soon(_started.set) # once run() is under way
+            await self.run()
+        self._thread = threading.Thread(target=lambda: asyncio.run(_run()), name='message-bus')
+        self._thread.setDaemon(True)
+        self._thread.start()
+        _started.wait()
+
+    # ..........................................................................
+    def close(self):
+        '''
+        Stop the bus, and if started on its own thread, wait for it.
+        '''
+        self.stop()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._log.info('closed.')
+
+    # ..........................................................................
+    def get_stats(self):
+        _stats = {
+            'published':   self._published,
+            'dispatched':  self._dispatched,
+            'errors':      self._errors,
+            'subscribers': sum(len(_entries) for _entries in self._subscribers.values())
+        }
+        _stats.update(self._arbitrator.get_stats())
+        return _stats
+
+#EOF
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import os, sys, time, threading
+from datetime import datetime as dt
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from core.timers import Timers
+
+# ..............................................................................
+class SamplingProfiler(object):
+    '''
+    A statistical profiler that, while started, samples the stack of every
+    other thread each 'interval_sec' and counts each distinct stack, so that
+    where the time goes may be seen without stopping the process. Nothing
+    runs while it is stopped: no thread, no hook on any call.
+
+    Upon stop() the counts are written to a file in the collapsed stack
+    format read by flamegraph.pl, speedscope and the like, one line each of
+
+        thread;outermost function;...;innermost function count
+
+    with each function as 'file:qualified name'. A thread blocked (e.g.,
+    sleeping or waiting on a socket) is sampled like any other, so the
+    flamegraph shows wall time; its innermost frame shows where it waits.
+
+    The Timers of the hot paths are enabled while the profiler runs (unless
+    they already were), so both views are of the same period.
+
+    :param dirname:       the directory of the collapsed stack files
+    :param interval_sec:  the sampling interval
+    :param level:         the log level
+    '''
+    def __init__(self, dirname='profiles', interval_sec=0.01, level=Level.INFO):
+        self._log = Logger('profiler', level)
+        self._dirname      = dirname
+        self._interval_sec = interval_sec
+        self._lock         = threading.Lock()
+        self._thread       = None
+        self._stopping     = threading.Event()
+        self._stacks       = {} # ( thread name, code objects ): count
+        self._timers_were_enabled = False
+        self._started      = None
+        self._filename     = None
+        # statistics
+        self._samples      = 0
+        self._profiles     = 0
+        self._cpu_sec      = 0.0
+        self._log.info('ready: sampling every {:5.3f}s when started.'.format(interval_sec))
+
+    # ..........................................................................
+    @property
+    def running(self):
+        return self._thread is not None
+
+    # ..........................................................................
+    def start(self):
+        '''
+        Start sampling, returning False if already started.
+        '''
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._stacks = {}
+            self._samples = 0
+            self._cpu_sec = 0.0
+            self._started = time.time()
+            self._timers_were_enabled = Timers.enabled
+            Timers.enable(True)
+            self._stopping.clear()
+            self._thread = threading.Thread(target=SamplingProfiler.__loop, args=[self], name='profiler')
+            self._thread.setDaemon(True)
+            self._thread.start()
+        self._log.info('started.')
+        return True
+
+    # ..........................................................................
+    def stop(self):
+        '''
+        Stop sampling and write the collapsed stacks, returning the filename,
+        or None if not started.
+        '''
+        with self._lock:
+            if self._thread is None:
+                return None
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+            Timers.enable(self._timers_were_enabled)
+            self._filename = self._write()
+            self._profiles += 1
+        self._log.info('stopped: {:d} samples of {:d} stacks in {:4.1f}s ({:5.3f}s CPU) written to {}'.format(self._samples,
+                len(self._stacks), time.time() - self._started, self._cpu_sec, self._filename))
+        for _name, _stats in Timers.get_stats().items():
+            self._log.info('{:<20} {}'.format(_name, _stats))
+        return self._filename
+
+    # ..........................................................................
+    def toggle(self):
+        '''
+        Start sampling if stopped, otherwise stop it; e.g., upon a signal.
+        '''
+        if not self.start():
+            self.stop()
+
+    # ..........................................................................
+    def __loop(self):
+        _own = threading.get_ident()
+        _cpu = time.thread_time()
+        while not self._stopping.wait(self._interval_sec):
+            _names = { _thread.ident: _thread.name for _thread in threading.enumerate() }
+            for _ident, _frame in sys._current_frames().items():
+                if _ident == _own:
+                    continue
+                _codes = []
+                while _frame is not None:
+                    _codes.append(_frame.f_code)
+                    _frame = _frame.f_back
+                _key = ( _names.get(_ident, str(_ident)), tuple(_codes) )
+                self._stacks[_key] = self._stacks.get(_key, 0) + 1
+            self._samples += 1
+        self._cpu_sec = time.thread_time() - _cpu
+
+    # ..........................................................................
+    def _write(self):
+        os.makedirs(self._dirname, exist_ok=True)
+        _filename = os.path.join(self._dirname, 'profile_{}.folded'.format(dt.utcfromtimestamp(self._started).strftime('%Y%m%dT%H%M%S')))
+        with open(_filename, 'w') as _file:
+            _file.write(self.get_collapsed())
+        return _filename
+
+    # ..........................................................................
+    def get_collapsed(self):
+        '''
+        Returns the stacks sampled in the collapsed stack format.
+        '''
+        _lines = {}
+        for ( _thread, _codes ), _count in self._stacks.items():
+            _line = ';'.join([ _thread ] + [ '{}:{}'.format(os.path.basename(_code.co_filename), getattr(_code, 'co_qualname', _code.co_name))
+                    for _code in reversed(_codes) ])
+            _lines[_line] = _lines.get(_line, 0) + _count
+        return ''.join('{} {:d}\n'.format(_line, _count) for _line, _count in sorted(_lines.items()))
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns whether running, the samples, distinct stacks and CPU time
+        of the current or last profile, the profiles written and the last
+        file.
+        '''
+        return {
+            'running':  self.running,
+            'samples':  self._samples,
+            'stacks':   len(self._stacks),
+            'cpu_sec':  round(self._cpu_sec, 3),
+            'profiles': self._profiles,
+            'filename': self._filename
+        }
+
+#EOF
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import time, threading, functools
+
+# ..............................................................................
+class Histogram(object):
+    '''
+    A histogram of durations (in nanoseconds) in the manner of an HDR
+    histogram: the buckets are exact below 2 × SUB_BUCKETS, then
+    SUB_BUCKETS to each power of two, so that any value from a nanosecond
+    to over a day is recorded in constant time and memory to within
+    1/SUB_BUCKETS (about 3%), and its percentiles read to that precision.
+    '''
+    SUB_BITS    = 5
+    SUB_BUCKETS = 1 << SUB_BITS
+    MAX_BITS    = 48 # values are clamped below 2^48ns, about 78 hours
+    _EXACT      = 2 * SUB_BUCKETS
+    _LIMIT      = 1 << MAX_BITS
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self._counts = [ 0 ] * ( ( Histogram.MAX_BITS - Histogram.SUB_BITS + 1 ) * Histogram.SUB_BUCKETS )
+        self.count   = 0
+        self.total   = 0
+        self.max     = 0
+
+    # ..........................................................................
+    @staticmethod
+    def _value(index):
+        '''
+        Returns the middle of the range of values counted by the bucket.
+        '''
+        if index < Histogram._EXACT:
+            return index
+        _shift = ( index >> Histogram.SUB_BITS ) - 1
+        _top = index - ( _shift << Histogram.SUB_BITS )
+        return ( _top << _shift ) + ( 1 << ( _shift - 1 ) )
+
+    # ..........................................................................
+    def record(self, value):
+        _value = value if 0 <= value < Histogram._LIMIT else ( 0 if value < 0 else Histogram._LIMIT - 1 )
+        if _value < Histogram._EXACT:
+            _index = _value
+        else:
+            _shift = _value.bit_length() - Histogram.SUB_BITS - 1
+            _index = ( _shift << Histogram.SUB_BITS ) + ( _value >> _shift )
+        with self._lock:
+            self._counts[_index] += 1
+            self.count += 1
+            self.total += _value
+            if _value > self.max:
+                self.max = _value
+
+    # ..........................................................................
+    def percentiles(self, *percentiles):
+        '''
+        Returns a list of the values (in nanoseconds) at the percentiles,
+        each from 0 to 100.
+        '''
+        with self._lock:
+            _counts = list(self._counts)
+            _count = self.count
+        _values = []
+        _index = 0
+        _seen = 0
+        for _percentile in sorted(percentiles):
+            _target = max(1, -( -_count * _percentile // 100 )) # the rank, rounded up
+            while _index < len(_counts) and _seen + _counts[_index] < _target:
+                _seen += _counts[_index]
+                _index += 1
+            _values.append(Histogram._value(_index) if _count else 0)
+        return _values
+
+    # ..........................................................................
+    def reset(self):
+        with self._lock:
+            self._counts = [ 0 ] * len(self._counts)
+            self.count = 0
+            self.total = 0
+            self.max   = 0
+
+# ..............................................................................
+class _Span(object):
+    '''
+    The timing of one entry into a Timer's block.
+    '''
+    __slots__ = ( '_histogram', '_start' )
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._histogram.record(time.perf_counter_ns() - self._start)
+        return False
+
+# ..............................................................................
+class _NullSpan(object):
+    '''
+    The shared, empty block of every Timer while timing is disabled.
+    '''
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+# ..............................................................................
+class Timer(object):
+    '''
+    A named Histogram of the durations of a block of code, timed with
+
+        with timer.time():
+            ...
+
+    or of a function, by decorating it with the Timer (see Timers.timed()).
+    While Timers.enabled is False time() returns a shared empty block and a
+    decorated function is called directly, so that an instrumented hot path
+    costs a method call and a test.
+    '''
+    def __init__(self, name):
+        self.name = name
+        self.histogram = Histogram()
+
+    # ..........................................................................
+    def time(self):
+        return _Span(self.histogram) if Timers.enabled else NULL_SPAN
+
+    # ..........................................................................
+    def __call__(self, function):
+        _histogram = self.histogram
+        @functools.wraps(function)
+        def _timed(*args, **kwargs):
+            if not Timers.enabled:
+                return function(*args, **kwargs)
+            _start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _histogram.record(time.perf_counter_ns() - _start)
+        return _timed
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns the count, mean, 50th, 90th and 99th percentile and maximum
+        of the durations, in microseconds.
+        '''
+        _histogram = self.histogram
+        _p50, _p90, _p99 = _histogram.percentiles(50, 90, 99)
+        return {
+            'count':   _histogram.count,
+            'mean_us': round(_histogram.total / _histogram.count / 1000.0, 2) if _histogram.count else 0.0,
+            'p50_us':  round(_p50 / 1000.0, 2),
+            'p90_us':  round(_p90 / 1000.0, 2),
+            'p99_us':  round(_p99 / 1000.0, 2),
+            'max_us':  round(_histogram.max / 1000.0, 2)
+        }
+
+# ..............................................................................
+class Timers(object):
+    '''
+    The registry of the named Timers of the hot paths, and the switch that
+    enables all of them at runtime. Timing is disabled by default.
+
+    A module creates its timers once, by name, when it is loaded, e.g.:
+
+        _WRITE_TIMER = Timers.get('splitter.write')
+
+        @Timers.timed('door.callback')
+        def _internal_callback(self, value):
+    '''
+    enabled = False
+    _timers = {}
+    _lock   = threading.Lock()
+
+    # ..........................................................................
+    @staticmethod
+    def get(name):
+        '''
+        Returns the named Timer, created upon first use.
+        '''
+        with Timers._lock:
+            _timer = Timers._timers.get(name)
+            if _timer is None:
+                _timer = Timers._timers[name] = Timer(name)
+            return _timer
+
+    # ..........................................................................
+    @staticmethod
+    def timed(name):
+        '''
+        A decorator timing each call of a function with the named Timer.
+        '''
+        return Timers.get(name)
+
+    # ..........................................................................
+    @staticmethod
+    def enable(enabled=True):
+        Timers.enabled = enabled
+
+    # ..........................................................................
+    @staticmethod
+    def reset():
+        with Timers._lock:
+            _timers = list(Timers._timers.values())
+        for _timer in _timers:
+            _timer.histogram.reset()
+
+    # ..........................................................................
+    @staticmethod
+    def get_stats():
+        '''
+        Returns a dict of the stats of each Timer that has timed anything,
+        by name.
+        '''
+        with Timers._lock:
+            _timers = sorted(Timers._timers.items())
+        return { _name: _timer.get_stats() for _name, _timer in _timers if _timer.histogram.count }
+
+    # ..........................................................................
+    @staticmethod
+    def get_status():
+        '''
+        Returns whether timing is enabled and the stats of each Timer, for
+        the '/status' and '/metrics' resources.
+        '''
+        _timers = []
+        for _name, _stats in Timers.get_stats().items():
+            _timers.append({
+                'timer':       _name,
+                'calls_total': _stats['count'],
+                'mean_us':     _stats['mean_us'],
+                'p50_us':      _stats['p50_us'],
+                'p99_us':      _stats['p99_us'],
+                'max_us':      _stats['max_us']
+            })
+        return { 'enabled': Timers.enabled, 'timers': _timers }
+
+#EOF
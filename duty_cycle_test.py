@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the DutyCycle with a fake camera: that it idles the camera once
+# nothing has needed it for idle_after_sec, never while the door is open or
+# the camera is busy, resumes it upon activity, and resumes it straight away
+# if activity arrives while it is being idled. This does not require a camera.
+#
+#   % python3 duty_cycle_test.py
+#
+
+import sys, time, asyncio, threading
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from lbr.duty_cycle import DutyCycle
+from test_support import Checker, wait_for, time_until
+
+IDLE_AFTER_SEC = 0.2
+
+# ..............................................................................
+class FakeCamera(object):
+    '''
+    Records each call to idle or resume it. While 'gate' is cleared idling
+    blocks, as stopping a real camera takes time.
+    '''
+    def __init__(self):
+        self.calls = []
+        self.busy  = False
+        self.gate  = threading.Event()
+        self.gate.set()
+        self.idling = threading.Event()
+
+    def set_idle(self, idle):
+        if idle:
+            self.idling.set()
+            self.gate.wait()
+        self.calls.append(idle)
+
+    def is_busy(self):
+        return self.busy
+
+# main .........................................................................
+def main(argv):
+    _log = Logger('duty-test', Level.INFO)
+    _checker = Checker(_log)
+    _check = _checker.check
+
+    _camera = FakeCamera()
+    _duty = DutyCycle(_camera.set_idle, _camera.is_busy, IDLE_AFTER_SEC, Level.WARN)
+    _thread = threading.Thread(target=lambda: asyncio.run(_duty.run()), daemon=True)
+    _thread.start()
+
+    # idle once nothing has needed the camera for idle_after_sec
+    _elapsed = time_until(lambda: _duty.idle, 2.0, 0.001)
+    _check(_elapsed is not None and IDLE_AFTER_SEC * 0.9 <= _elapsed < IDLE_AFTER_SEC * 2 and _camera.calls == [ True ],
+            'the camera was idled after {:5.3f}s without activity.'.format(_elapsed or 0.0))
+
+    # resume on activity
+    _duty.activity('pir')
+    _elapsed = time_until(lambda: not _duty.idle, 1.0, 0.001)
+    _check(_elapsed is not None and _elapsed < 0.05 and _camera.calls == [ True, False ],
+            'activity resumed the camera in {:5.1f}ms.'.format(1000.0 * ( _elapsed or 0.0 )))
+
+    # never idle while the door is open or the camera is busy
+    _duty.set_door_open(True)
+    time.sleep(3 * IDLE_AFTER_SEC)
+    _check(not _duty.idle and _camera.calls == [ True, False ], 'the camera was not idled while the door was open.')
+    _duty.set_door_open(False)
+    _camera.busy = True
+    time.sleep(3 * IDLE_AFTER_SEC)
+    _check(not _duty.idle and _camera.calls == [ True, False ], 'the camera was not idled while busy.')
+    _camera.busy = False
+    _check(wait_for(lambda: _duty.idle, 3 * IDLE_AFTER_SEC), 'the camera was idled once no longer busy.')
+
+    # activity arriving while the camera is being idled resumes it straight away
+    _duty.activity('door')
+    wait_for(lambda: not _duty.idle, 1.0)
+    _calls = len(_camera.calls)
+    _camera.gate.clear()
+    _camera.idling.clear()
+    _check(_camera.idling.wait(2 * IDLE_AFTER_SEC), 'the camera began idling.')
+    _duty.activity('pir')
+    _camera.gate.set()
+    _elapsed = time_until(lambda: len(_camera.calls) == _calls + 2 and not _duty.idle, 1.0, 0.001)
+    _check(_elapsed is not None and _elapsed < 0.05 and _camera.calls[-2:] == [ True, False ],
+            'activity while idling resumed the camera in {:5.1f}ms.'.format(1000.0 * ( _elapsed or 0.0 )))
+    _stats = _duty.get_stats()
+    _check(_stats['idled'] == 3 and _stats['resumed'] == 3 and _stats['idle_sec'] > 0.0,
+            'the idles and resumes were counted: {}.'.format(_stats))
+
+    _duty.stop()
+    _thread.join(1.0)
+    _check(not _thread.is_alive(), 'stop() ended run().')
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
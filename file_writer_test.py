@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the FileWriter against a simulated slow SD card: frames are fed
+# through an OutputSplitter at the configured framerate while a streaming
+# client measures how long each frame takes to reach it. With the disk write
+# inline on the camera thread every stall delays the stream; with the
+# FileWriter the stream should be unaffected. Finally the FileWriter's pool
+# is exhausted mid-frame, after which the file must hold only whole frames.
+# This does not require a camera.
+#
+#   % python3 file_writer_test.py
+#
+
+import os, sys, time, struct, threading, tempfile
+from colorama import init, Fore, Style
+init()
+
+from core.config_loader import ConfigLoader
+from core.logger import Level, Logger
+from lbr.file_writer import FileWriter
+from lbr.output_splitter import OutputSplitter
+
+# ..............................................................................
+class SlowFile(object):
+    '''
+    A file that stalls for 'stall_sec' on every 'every'th write, as an SD
+    card does when it erases or garbage-collects.
+    '''
+    def __init__(self, filename, stall_sec, every):
+        self._file = open(filename, 'wb')
+        self._stall_sec = stall_sec
+        self._every = every
+        self._count = 0
+
+    def write(self, data):
+        self._count += 1
+        if self._count % self._every == 0:
+            time.sleep(self._stall_sec)
+        return self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+# ..............................................................................
+class GatedFile(object):
+    '''
+    A file whose writes wait while 'gate' is cleared, as a stalled card.
+    '''
+    def __init__(self, filename, gate):
+        self._file = open(filename, 'wb')
+        self._gate = gate
+
+    def write(self, data):
+        self._gate.wait()
+        return self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+# ..............................................................................
+class InlineWriter(object):
+    '''
+    Writes on the caller's thread, as OutputSplitter originally did.
+    '''
+    def __init__(self, opener):
+        self._opener = opener
+        self._file = None
+
+    def open(self, filename):
+        self._file = self._opener(filename)
+
+    def write(self, buf):
+        return self._file.write(buf)
+
+    def flush(self):
+        self._file.flush()
+
+    def close_file(self):
+        self._file.close()
+
+# ..............................................................................
+def run(writer, framerate, frame_count, frame_size, filename):
+    '''
+    Feed frames through an OutputSplitter while a client thread records the
+    latency of each frame: the time it was received less the time at which
+    the camera would have completed it, were it never held up. Returns the
+    list of latencies and the frames that were fed.
+    '''
+    _splitter = OutputSplitter(filename, 4, frame_size + 64, writer)
+    _frames = _splitter.frames
+    _latencies = []
+    _done = threading.Event()
+    _period = 1.0 / framerate
+    _start = time.perf_counter()
+    def _client():
+        _sequence = 0
+        while not _done.is_set():
+            _sequence, _frame = _frames.wait(_sequence, timeout=0.2)
+            if _frame is not None:
+                # frame i is completed by the start of frame i + 1
+                _index = struct.unpack('<I', _frame[2:6])[0]
+                _latencies.append(time.perf_counter() - ( _start + ( _index + 1 ) * _period ))
+    _thread = threading.Thread(target=_client, daemon=True)
+    _thread.start()
+    _fed = []
+    _next = _start
+    for i in range(frame_count):
+        _frame = b'\xff\xd8' + struct.pack('<I', i) + bytes([ i % 200 ]) * frame_size + b'\xff\xd9'
+        _fed.append(_frame)
+        _splitter.write(_frame)
+        _next += _period
+        _delay = _next - time.perf_counter()
+        if _delay > 0.0:
+            time.sleep(_delay)
+    _splitter.write(b'\xff\xd8') # completes the final frame
+    _done.set()
+    _thread.join()
+    _splitter.close()
+    return _latencies, _fed
+
+# ..............................................................................
+def percentile(values, pct):
+    _sorted = sorted(values)
+    return _sorted[min(len(_sorted) - 1, int(pct / 100.0 * len(_sorted)))] if _sorted else 0.0
+
+# main .........................................................................
+def main(argv):
+    _log = Logger('writer-test', Level.INFO)
+    _config = ConfigLoader(Level.WARN).configure('config.yaml')['ros'].get('video')
+    _framerate = _config.get('framerate')
+    _frame_size = 50000
+    _frame_count = 4 * _framerate
+    _stall_sec = 0.25
+    _dirname = tempfile.mkdtemp()
+    _failures = 0
+
+    def _opener(filename):
+        return SlowFile(filename, _stall_sec, 8)
+
+    _log.info('{:d} frames at {:d}fps; the file stalls {:4.2f}s on every 8th write.'.format(_frame_count, _framerate, _stall_sec))
+    # inline: the original behaviour, for comparison
+    _latencies, _ = run(InlineWriter(_opener), _framerate, _frame_count, _frame_size, os.path.join(_dirname, 'inline.mjpeg'))
+    _inline_max = max(_latencies)
+    _log.info('inline writes:         stream latency p95: {:7.2f}ms; max: {:7.2f}ms'.format(1000.0 * percentile(_latencies, 95), 1000.0 * _inline_max))
+
+    # background writer, blocking policy: everything must be written
+    _filename = os.path.join(_dirname, 'block.mjpeg')
+    _writer = FileWriter(65536, 64, 'block', opener=_opener, level=Level.WARN)
+    _latencies, _fed = run(_writer, _framerate, _frame_count, _frame_size, _filename)
+    _writer.close()
+    _p95 = percentile(_latencies, 95)
+    _stats = _writer.get_stats()
+    _log.info('file writer (block):   stream latency p95: {:7.2f}ms; max: {:7.2f}ms; max depth: {:d}; write latency max: {:6.1f}ms'.format(
+            1000.0 * _p95, 1000.0 * max(_latencies), _stats['max_depth'], _stats['latency_max_ms']))
+    with open(_filename, 'rb') as _file:
+        if _file.read() != b''.join(_fed) + b'\xff\xd8':
+            _log.error('FAIL: file content does not match the frames written.')
+            _failures += 1
+    if max(_latencies) > _inline_max / 4:
+        _log.error('FAIL: stream latency was affected by the slow file.')
+        _failures += 1
+
+    # background writer, dropping policy with a tiny pool: frames are dropped whole
+    _filename = os.path.join(_dirname, 'drop.mjpeg')
+    _writer = FileWriter(65536, 4, 'drop', opener=_opener, level=Level.WARN)
+    _latencies, _fed = run(_writer, _framerate, _frame_count, _frame_size, _filename)
+    _writer.close()
+    _p95 = percentile(_latencies, 95)
+    _stats = _writer.get_stats()
+    _log.info('file writer (drop):    stream latency p95: {:7.2f}ms; max: {:7.2f}ms; drops: {:d}; bytes dropped: {:d}'.format(
+            1000.0 * _p95, 1000.0 * max(_latencies), _stats['drops'], _stats['bytes_dropped']))
+    with open(_filename, 'rb') as _file:
+        _content = _file.read()
+    if _stats['drops'] == 0 or _content.count(b'\xff\xd8') < 2:
+        _log.error('FAIL: expected some, but not all, frames to be dropped.')
+        _failures += 1
+    if max(_latencies) > _inline_max / 4:
+        _log.error('FAIL: stream latency was affected by the slow file.')
+        _failures += 1
+
+    # dropping policy, the pool exhausted mid-frame: the frame is rolled back, leaving only whole frames
+    _filename = os.path.join(_dirname, 'rollback.mjpeg')
+    _gate = threading.Event()
+    _writer = FileWriter(4096, 4, 'drop', opener=lambda filename: GatedFile(filename, _gate), level=Level.WARN)
+    _writer.open(_filename)
+    _fed = []
+    for i in range(12):
+        _frame = b'\xff\xd8' + struct.pack('<I', i) + bytes([ i % 200 ]) * ( 2500 + 400 * i ) + b'\xff\xd9'
+        _fed.append(_frame)
+        for _start in range(0, len(_frame), 1000):
+            _writer.write(_frame[_start:_start + 1000])
+        if i == 5:
+            _gate.set()
+            time.sleep(0.2) # the card catches up
+            _gate.clear()
+    _gate.set()
+    _writer.close()
+    _stats = _writer.get_stats()
+    with open(_filename, 'rb') as _file:
+        _kept = [ b'\xff\xd8' + _frame for _frame in _file.read().split(b'\xff\xd8')[1:] ]
+    _log.info('file writer (rollback): {:d} of {:d} frames kept; drops: {:d}; bytes dropped: {:d}'.format(
+            len(_kept), len(_fed), _stats['drops'], _stats['bytes_dropped']))
+    if _stats['drops'] == 0 or not _kept or any(_frame not in _fed for _frame in _kept) \
+            or [ _fed.index(_frame) for _frame in _kept ] != sorted(set(_fed.index(_frame) for _frame in _kept)):
+        _log.error('FAIL: expected only whole frames, in order, once the pool was exhausted mid-frame.')
+        _failures += 1
+    if _stats['bytes_written'] + _stats['bytes_dropped'] != sum(len(_frame) for _frame in _fed):
+        _log.error('FAIL: the bytes written and dropped do not account for the frames written.')
+        _failures += 1
+
+    if _failures:
+        _log.error('{:d} failures.'.format(_failures))
+        sys.exit(1)
+    _log.info(Fore.GREEN + 'passed.')
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
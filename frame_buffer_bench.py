@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Benchmarks the FrameBuffer ring against the original BytesIO-based output
+# splitter by feeding synthetic JPEG chunks at the configured framerate and
+# reporting the per-frame copy and allocation counts. This does not require
+# a camera and can be run off the Pi, e.g.:
+#
+#   % python3 frame_buffer_bench.py --seconds 5
+#   % python3 frame_buffer_bench.py --fast --frames 2000
+#
+
+import io, os, sys, time, threading, tracemalloc, argparse
+from colorama import init, Fore, Style
+init()
+
+from core.config_loader import ConfigLoader
+from core.logger import Level, Logger
+from lbr.frame_buffer import FrameBuffer
+
+# ..............................................................................
+class BytesIOSplitter(object):
+    '''
+    The original OutputSplitter frame path, instrumented with copy and
+    allocation counters for comparison.
+    '''
+    def __init__(self):
+        self.frame = None
+        self.buffer = io.BytesIO()
+        self.sequence = 0
+        self.condition = threading.Condition()
+        self.copies = 0
+        self.allocations = 1
+
+    def write(self, buf):
+        if buf.startswith(b'\xff\xd8'):
+            self.buffer.truncate()
+            with self.condition:
+                self.frame = self.buffer.getvalue() # copy and allocation
+                self.copies += 1
+                self.allocations += 1
+                self.sequence += 1
+                self.condition.notify_all()
+            self.buffer.seek(0)
+        return self.buffer.write(buf)
+
+# ..............................................................................
+def make_frames(count, size):
+    '''
+    Returns a list of synthetic JPEG frames, each beginning with an SOI
+    marker and ending with an EOI marker, with no markers in between.
+    '''
+    _frames = []
+    for i in range(count):
+        _body = os.urandom(size).replace(b'\xff', b'\x00')
+        _frames.append(b'\xff\xd8' + _body + b'\xff\xd9')
+    return _frames
+
+# ..............................................................................
+def make_chunks(frames, chunk_size):
+    '''
+    Split each frame into chunks as the camera's encoder would deliver them.
+    '''
+    _chunks = []
+    for _frame in frames:
+        _chunks.append([ _frame[i:i+chunk_size] for i in range(0, len(_frame), chunk_size) ])
+    return _chunks
+
+# ..............................................................................
+def run(name, write, chunks, frame_count, framerate, fast):
+    '''
+    Feed the chunks to the write function, paced at the framerate unless
+    'fast' is True. Returns the elapsed write time and peak traced memory.
+    '''
+    _period = 1.0 / framerate
+    _write_time = 0.0
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    _start_memory = tracemalloc.get_traced_memory()[0]
+    _next = time.perf_counter()
+    for i in range(frame_count):
+        _t0 = time.perf_counter()
+        for _chunk in chunks[i % len(chunks)]:
+            write(_chunk)
+        _write_time += time.perf_counter() - _t0
+        if not fast:
+            _next += _period
+            _delay = _next - time.perf_counter()
+            if _delay > 0.0:
+                time.sleep(_delay)
+    _peak = tracemalloc.get_traced_memory()[1] - _start_memory
+    tracemalloc.stop()
+    return _write_time, _peak
+
+# ..............................................................................
+def reader(f_wait, f_is_running, counts):
+    '''
+    A single streaming client, verifying each frame it receives is whole.
+    '''
+    _sequence = 0
+    while f_is_running():
+        _sequence, _frame = f_wait(_sequence)
+        if not _frame: # timed out, or the original splitter's empty first frame
+            continue
+        counts['read'] += 1
+        if _frame[:2] != b'\xff\xd8' or _frame[-2:] != b'\xff\xd9':
+            counts['torn'] += 1
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='benchmark the video frame buffer.')
+    _parser.add_argument('--seconds',    type=float, default=5.0, help='duration when paced at the configured framerate')
+    _parser.add_argument('--frames',     type=int,   default=0,   help='number of frames (overrides --seconds)')
+    _parser.add_argument('--frame-size', type=int,   default=0,   help='synthetic JPEG size in bytes (default: width x height / 8)')
+    _parser.add_argument('--chunk-size', type=int,   default=65536, help='encoder chunk size in bytes')
+    _parser.add_argument('--fast',       action='store_true', help='feed frames as fast as possible rather than at the framerate')
+    _args = _parser.parse_args(argv)
+
+    _log = Logger('fb-bench', Level.INFO)
+    _config = ConfigLoader(Level.WARN).configure('config.yaml')['ros'].get('video')
+    _width     = _config.get('width')
+    _height    = _config.get('height')
+    _framerate = _config.get('framerate')
+    _slots     = _config.get('frame_slots', 4)
+    _capacity  = _config.get('frame_capacity', 262144)
+    _frame_size  = _args.frame_size if _args.frame_size > 0 else _width * _height // 8
+    _frame_count = _args.frames if _args.frames > 0 else int(_args.seconds * _framerate)
+    _log.info('{:d} frames of {:d} bytes at {}x{} @ {:d}fps{}'.format(_frame_count, _frame_size,
+            _width, _height, _framerate, ' (unpaced)' if _args.fast else ''))
+    _chunks = make_chunks(make_frames(8, _frame_size), _args.chunk_size)
+
+    # original BytesIO splitter ....................
+    _legacy = BytesIOSplitter()
+    _running = True
+    _legacy_counts = { 'read': 0, 'torn': 0 }
+    def _legacy_wait(sequence):
+        with _legacy.condition:
+            if not _legacy.condition.wait_for(lambda: _legacy.sequence > sequence, 0.2):
+                return sequence, None
+            return _legacy.sequence, _legacy.frame
+    _thread = threading.Thread(target=reader, args=[_legacy_wait, lambda: _running, _legacy_counts], daemon=True)
+    _thread.start()
+    _legacy_time, _legacy_peak = run('bytesio', _legacy.write, _chunks, _frame_count, _framerate, _args.fast)
+    _running = False
+    _thread.join()
+
+    # FrameBuffer ring .............................
+    _buffer = FrameBuffer(_slots, _capacity, Level.WARN)
+    def _ring_write(buf):
+        if buf.startswith(b'\xff\xd8'):
+            _buffer.commit()
+        return _buffer.append(buf)
+    _running = True
+    _ring_counts = { 'read': 0, 'torn': 0 }
+    _thread = threading.Thread(target=reader, args=[lambda s: _buffer.wait(s, 0.2), lambda: _running, _ring_counts], daemon=True)
+    _thread.start()
+    _ring_time, _ring_peak = run('ring', _ring_write, _chunks, _frame_count, _framerate, _args.fast)
+    _running = False
+    _thread.join()
+    _stats = _buffer.get_stats()
+
+    # report .......................................
+    _log.info(Fore.WHITE + '{:<12} {:>10} {:>12} {:>14} {:>14} {:>12} {:>8}'.format(
+            'splitter', 'frames', 'copies', 'allocations', 'peak mem (B)', 'µs/frame', 'torn'))
+    _log.info('{:<12} {:>10d} {:>12d} {:>14d} {:>14d} {:>12.1f} {:>8d}'.format('bytesio',
+            _legacy.sequence, _legacy.copies, _legacy.allocations, _legacy_peak,
+            1e6 * _legacy_time / _frame_count, _legacy_counts['torn']))
+    _log.info('{:<12} {:>10d} {:>12d} {:>14d} {:>14d} {:>12.1f} {:>8d}'.format('ring',
+            _stats['frames'], _stats['copies'], _stats['allocations'], _ring_peak,
+            1e6 * _ring_time / _frame_count, _ring_counts['torn']))
+    _log.info('copy and allocation counts exclude the single in-place write of each chunk; ring allocations include its {:d} initial slots.'.format(_slots))
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
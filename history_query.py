@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Prints the activity history kept by lbrd (see 'history' in config.yaml):
+# the motion, door openings, seconds open and light-on duty per minute, hour
+# or day (local time), e.g., the deliveries per day of this month:
+#
+#   % python3 history_query.py --period day --month
+#   % python3 history_query.py --period hour --days 2
+#
+
+import sys, time, argparse
+from datetime import datetime as dt
+
+from core.logger import Level
+from lbr.history import History
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='print the letterbox robot activity history.')
+    _parser.add_argument('--file',   default='history.db', help='the history database')
+    _parser.add_argument('--period', choices=list(History.PERIODS.keys()), default='day', help='the period of each row')
+    _parser.add_argument('--days',   type=float, default=7.0, help='only the last this many days')
+    _parser.add_argument('--month',  action='store_true', help='only this month (instead of --days)')
+    _args = _parser.parse_args(argv)
+
+    if _args.month:
+        _since = dt.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0).timestamp()
+    else:
+        _since = time.time() - _args.days * 86400.0
+    _history = History(_args.file, level=Level.WARN)
+    _start = time.perf_counter()
+    _rollups = _history.get_rollups(_args.period, _since)
+    _elapsed = time.perf_counter() - _start
+    _history.close()
+    _format = { 'minute': '%Y-%m-%d %H:%M', 'hour': '%Y-%m-%d %H:00', 'day': '%Y-%m-%d' }[_args.period]
+    print('{:<16}  {:>6}  {:>6}  {:>9}  {:>9}  {:>6}'.format(_args.period, 'motion', 'opens', 'open sec', 'light sec', 'duty'))
+    for _rollup in _rollups:
+        _length = History.PERIODS[_args.period]
+        print('{:<16}  {:6d}  {:6d}  {:9.1f}  {:9.1f}  {:5.1f}%'.format(dt.fromtimestamp(_rollup['start']).strftime(_format),
+                _rollup['motion'], _rollup['door_opens'], _rollup['open_sec'], _rollup['light_on_sec'],
+                100.0 * _rollup['light_on_sec'] / _length))
+    print('{:d} rows in {:5.2f}ms.'.format(len(_rollups), 1000.0 * _elapsed))
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
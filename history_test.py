@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the History in a temporary database: that events are rolled up per
+# minute, hour and day, durations divided between the buckets they span and
+# overlapping lights counted once, that old rows are pruned, and reports
+# the time to fill a year of simulated activity and to query the days of a
+# month from it, e.g.:
+#
+#   % python3 history_test.py
+#
+
+import os, sys, time, random, argparse, tempfile, shutil
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from lbr.history import History
+from test_support import Checker
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='test the activity history.')
+    _parser.add_argument('--days', type=int, default=365, help='days of activity simulated when timing')
+    _args = _parser.parse_args(argv)
+    _log = Logger('history-test', Level.INFO)
+    _dirname = tempfile.mkdtemp()
+    _filename = os.path.join(_dirname, 'history.db')
+
+    _checker = Checker(_log)
+    _check = _checker.check
+
+    _history = History(_filename, sync_sec=60.0, level=Level.WARN)
+    _hour = History.bucket(time.time(), 3600) - 3600 # the start of the last hour
+    _history.motion(t=_hour + 10.0)
+    _history.motion(t=_hour + 70.0)
+    _history.door(True, t=_hour + 50.0)
+    _history.door(False, 30.0, t=_hour + 80.0) # open across the first minute
+    _history.light('switch', True, t=_hour + 100.0)
+    _history.light('light', True, t=_hour + 110.0)
+    _history.light('switch', False, t=_hour + 130.0)
+    _history.light('switch', False, t=_hour + 140.0) # no change
+    _history.light('light', False, t=_hour + 190.0) # on together 100-190s
+    _check(_history.get_rollups('minute', _hour) == [], 'nothing was written before the sync.')
+    _history.sync()
+    _minutes = { _rollup['start'] - _hour: _rollup for _rollup in _history.get_rollups('minute', _hour, _hour + 3600) }
+    _check(sorted(_minutes.keys()) == [ 0, 60, 120, 180 ], 'the events were rolled up into four minutes.')
+    _check(_minutes[0]['motion'] == 1 and _minutes[60]['motion'] == 1 and _minutes[0]['door_opens'] == 1,
+            'motion and door openings were counted in their minutes.')
+    _check(abs(_minutes[0]['open_sec'] - 10.0) < 1e-6 and abs(_minutes[60]['open_sec'] - 20.0) < 1e-6,
+            'the door open 30s was divided between two minutes.')
+    _check([ round(_minutes[_start]['light_on_sec'], 6) for _start in ( 0, 60, 120, 180 ) ] == [ 0.0, 20.0, 60.0, 10.0 ],
+            'the lights were on 90s, counted once however many.')
+    _hours = _history.get_rollups('hour', _hour, _hour + 3600)
+    _check(len(_hours) == 1 and _hours[0]['motion'] == 2 and _hours[0]['door_opens'] == 1
+            and abs(_hours[0]['open_sec'] - 30.0) < 1e-6 and abs(_hours[0]['light_on_sec'] - 90.0) < 1e-6, 'the hour totals the minutes.')
+    _check(len(_history.get_events(_hour, source='switch')) == 2, 'the events were kept.')
+    _history.close()
+
+    # a year of activity: a few deliveries and passers-by each day
+    os.remove(_filename)
+    _history = History(_filename, sync_sec=60.0, retention={ 'raw': 30, 'minute': 7, 'hour': 90, 'day': 0 }, level=Level.WARN)
+    _random = random.Random(1)
+    _now = time.time()
+    _start = time.perf_counter()
+    for _day in range(_args.days, 0, -1):
+        _midnight = History.bucket(_now - _day * 86400, 86400)
+        for _ in range(_random.randint(1, 4)):
+            _t = _midnight + _random.uniform(8 * 3600, 18 * 3600)
+            _history.motion(t=_t)
+            _history.light('switch', True, t=_t)
+            _history.door(True, t=_t + 5.0)
+            _history.door(False, _random.uniform(2.0, 20.0), t=_t + 25.0)
+            _history.light('switch', False, t=_t + 60.0)
+        if _day % 30 == 0:
+            _history.sync()
+    _history.sync()
+    _fill = time.perf_counter() - _start
+    _stats = _history.get_stats()
+    _history.prune()
+    _check(len(_history.get_events()) < _stats['recorded'] and len(_history.get_rollups('day')) >= _args.days - 1,
+            'old events, minutes and hours were pruned; the days kept ({:d} rows deleted).'.format(_history.get_stats()['deleted']))
+    _month = History.bucket(_now - 30 * 86400, 86400)
+    _start = time.perf_counter()
+    for _ in range(100):
+        _days = _history.get_rollups('day', _month)
+    _query = ( time.perf_counter() - _start ) / 100
+    _check(30 <= len(_days) <= 31 and sum(_day['door_opens'] for _day in _days) > 30, 'the days of the last month were queried.')
+    _size = sum(os.path.getsize(_filename + _suffix) for _suffix in ( '', '-wal' ) if os.path.exists(_filename + _suffix))
+    _log.info('{:d} days of activity ({:d} events) written in {:5.2f}s, {:d} commits; {:d}KB on disk; the days of a month in {:5.2f}ms.'.format(
+            _args.days, _stats['recorded'], _fill, _stats['commits'], _size // 1024, 1000.0 * _query))
+    _history.close()
+
+    shutil.rmtree(_dirname)
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import sys, time
+from datetime import datetime as dt
+from colorama import init, Fore, Style
+init()
+try:
+    import tzlocal
+except ImportError:
+    sys.exit("This script requires the tzlocal module\nInstall with: pip3 install --user tzlocal")
+
+from core.logger import Level, Logger
+
+# ..............................................................................
+class Annotator(object):
+    '''
+    Maintains the annotation of the camera image: a title and the local
+    time, updated once a second, and the ISO, LED and annotation colours of
+    night or day mode.
+
+    Each write of a camera property is an MMAL parameter change, and a
+    write of 'iso' can disturb the exposure, so a property is written only
+    when its value changes: the text once a second, the mode's properties
+    only when the mode changes (or the camera is replaced or reconfigured,
+    see invalidate()). The local timezone is resolved and the colours are
+    parsed once, and the text is formatted once per second however often
+    it is asked for. delay() aligns updates to the wall-clock second.
+
+    :param title:   the title portion of the annotation
+    :param Color:   the picamera Color class, or its substitute
+    :param level:   the log level
+    '''
+    # ( iso, led, foreground, background, background if compass calibrated )
+    NIGHT_MODE = ( 800, False, '#ffdada', '#440088', '#440000' )
+    DAY_MODE   = ( 100, True,  '#111111', '#ffff00', '#ffffff' )
+
+    def __init__(self, title, Color, level=Level.INFO):
+        self._log = Logger('annotator', level)
+        self._title    = title
+        self._heading  = ''
+        self._timezone = tzlocal.get_localzone()
+        self._modes    = {}
+        for _night, ( _iso, _led, _foreground, _background, _calibrated ) in ( ( True, Annotator.NIGHT_MODE ), ( False, Annotator.DAY_MODE ) ):
+            _foreground = Color.from_string(_foreground)
+            self._modes[( _night, False )] = ( _iso, _led, _foreground, Color.from_string(_background) )
+            self._modes[( _night, True )]  = ( _iso, _led, _foreground, Color.from_string(_calibrated) )
+        self._second   = None
+        self._text     = None
+        self._camera   = None
+        self._mode     = None
+        self._applied  = {} # property: the value last written to the camera
+        # statistics
+        self._updates  = 0
+        self._writes   = 0
+        self._formats  = 0
+        self._log.info('ready: {} time.'.format(self._timezone))
+
+    # ..........................................................................
+    def set_heading(self, heading):
+        '''
+        Sets the heading message appended to the annotation.
+        '''
+        self._heading = heading or ''
+        self._second = None
+
+    # ..........................................................................
+    def get_text(self, now=None):
+        '''
+        Returns the annotation for the time (by default, now), formatted only
+        if the second has changed since the last.
+        '''
+        _second = int(time.time() if now is None else now)
+        if _second != self._second:
+            self._text = '{} {} {}'.format(self._title, dt.fromtimestamp(_second, self._timezone).strftime('%Y-%m-%d %H:%M:%S %Z'), self._heading)
+            self._second = _second
+            self._formats += 1
+        return self._text
+
+    # ..........................................................................
+    @staticmethod
+    def delay(now=None):
+        '''
+        Returns the seconds until just after the next wall-clock second.
+        '''
+        return 1.005 - ( time.time() if now is None else now ) % 1.0
+
+    # ..........................................................................
+    def invalidate(self):
+        '''
+        Forget the values written to the camera, so that the next update()
+        writes them all, e.g., after the camera has been reconfigured.
+        '''
+        self._applied.clear()
+
+    # ..........................................................................
+    def _set(self, camera, name, value):
+        if self._applied.get(name, self) != value:
+            setattr(camera, name, value)
+            self._applied[name] = value
+            self._writes += 1
+
+    # ..........................................................................
+    def set_mode(self, camera, night_mode, compass_calibrated=False):
+        '''
+        Sets the ISO, LED and annotation colours of night or day mode on the
+        camera, writing only those that differ from the values last written.
+        NOTE: setting 'iso' overrides the exposure mode.
+        '''
+        if camera is not self._camera:
+            self._camera = camera
+            self.invalidate()
+        _mode = ( night_mode, compass_calibrated )
+        if _mode != self._mode:
+            self._log.debug('night mode.' if night_mode else 'day mode.')
+            self._mode = _mode
+        _iso, _led, _foreground, _background = self._modes[_mode]
+        self._set(camera, 'iso', _iso)
+        self._set(camera, 'led', _led)
+        self._set(camera, 'annotate_foreground', _foreground)
+        self._set(camera, 'annotate_background', _background)
+
+    # ..........................................................................
+    def update(self, camera, night_mode, compass_calibrated=False):
+        '''
+        Updates the annotation text and mode of the camera, writing only what
+        has changed.
+        '''
+        self._updates += 1
+        self.set_mode(camera, night_mode, compass_calibrated)
+        self._set(camera, 'annotate_text', self.get_text())
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns the number of updates, the camera properties written and the
+        times the text was formatted.
+        '''
+        return {
+            'updates': self._updates,
+            'writes':  self._writes,
+            'formats': self._formats
+        }
+
+#EOF
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from core.event import EventType
+
+# ..............................................................................
+class Controller(object):
+    '''
+    The Controller of the Letterbox Robot: subscribes to the events of the
+    MessageBus and drives the output devices accordingly.
+
+        PIR_ACTIVE, PIR_IDLE:      the HT0740 switch (and its LED) and the
+                                   light turned on and off
+        MOTION, DOOR_OPEN/CLOSED:  the camera triggered to record a clip (and
+                                   resumed if idle), and told of the door
+        TICK:                      housekeeping, i.e., the video retention
+                                   policy enforced
+
+    If 'confirm_sec' is above zero the PIR alone does not turn the switch
+    on: its motion must be confirmed by a VIDEO_MOTION event (from the
+    camera's motion detector) published no more than 'confirm_sec' before
+    it went active, or at any time while it remains active. PIR triggers
+    that go idle unconfirmed (e.g., wind or a cat) are counted as rejected.
+
+    Any of the devices may be None if not in use.
+
+    :param message_bus:  the MessageBus
+    :param pir:          the PirSwitch, whose HT0740 switch is driven
+    :param light:        the optional Light
+    :param video:        the optional Video
+    :param level:        the log level
+    :param confirm_sec:  if above zero, the seconds within which the video
+                         must confirm the motion reported by the PIR
+    '''
+    def __init__(self, message_bus, pir=None, light=None, video=None, level=Level.INFO, confirm_sec=0.0):
+        self._log = Logger('controller', level)
+        self._pir   = pir
+        self._light = light
+        self._video = video
+        self._confirm_sec  = confirm_sec
+        self._pir_active   = False
+        self._switch_on    = False
+        self._video_motion = None # the time of the last VIDEO_MOTION event
+        self._confirmed    = 0
+        self._rejected     = 0
+        message_bus.subscribe(EventType.PIR_ACTIVE, self._on_pir_active)
+        message_bus.subscribe(EventType.PIR_IDLE, self._on_pir_idle)
+        if confirm_sec > 0.0:
+            message_bus.subscribe(EventType.VIDEO_MOTION, self._on_video_motion)
+            self._log.info('pir motion must be confirmed by the video within {:4.1f}s.'.format(confirm_sec))
+        if video:
+            message_bus.subscribe([ EventType.MOTION, EventType.DOOR_OPEN, EventType.DOOR_CLOSED ], self._on_trigger)
+            message_bus.subscribe(EventType.TICK, self._on_tick)
+        self._log.info('ready.')
+
+    # ..........................................................................
+    def _on_pir_active(self, event):
+        self._pir_active = True
+        if self._confirm_sec <= 0.0:
+            self._turn_on()
+        elif self._video_motion is not None and event.timestamp - self._video_motion <= self._confirm_sec:
+            self._log.info('pir motion confirmed by earlier video motion.')
+            self._confirmed += 1
+            self._turn_on()
+        else:
+            self._log.debug('pir active: awaiting confirmation from video.')
+
+    # ..........................................................................
+    def _on_video_motion(self, event):
+        self._video_motion = event.timestamp
+        if self._pir_active and not self._switch_on:
+            self._log.info('pir motion confirmed by video ({:4.1f}% of pixels changed).'.format(100.0 * event.value))
+            self._confirmed += 1
+            self._turn_on()
+
+    # ..........................................................................
+    def _on_pir_idle(self, event):
+        _was_active = self._pir_active
+        self._pir_active = False
+        if self._confirm_sec > 0.0 and _was_active and not self._switch_on:
+            self._log.info('pir motion rejected: not confirmed by video.')
+            self._rejected += 1
+        if self._switch_on:
+            self._turn_off()
+
+    # ..........................................................................
+    def _turn_on(self):
+        self._switch_on = True
+        if self._pir:
+            self._pir.turn_on_switch()
+        if self._light:
+            self._light.enable()
+
+    # ..........................................................................
+    def _turn_off(self):
+        self._switch_on = False
+        if self._pir:
+            self._pir.turn_off_switch()
+        if self._light:
+            self._light.disable()
+
+    # ..........................................................................
+    def _on_trigger(self, event):
+        if event.type is not EventType.MOTION:
+            self._video.set_door_open(event.type is EventType.DOOR_OPEN)
+        # a closing door also extends the clip, to capture the quiet period after it
+        self._video.trigger('pir' if event.type is EventType.MOTION else event.type.name)
+
+    # ..........................................................................
+    def _on_tick(self, event):
+        self._video.enforce_retention()
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns the number of PIR triggers confirmed and rejected by the
+        video (both zero unless confirmation is required).
+        '''
+        return {
+            'confirmed': self._confirmed,
+            'rejected':  self._rejected
+        }
+
+#EOF
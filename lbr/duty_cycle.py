@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import time, asyncio, threading
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+
+# ..............................................................................
+class DutyCycle(object):
+    '''
+    Schedules the camera between 'active' (its full resolution and
+    framerate) and 'idle' (a low resolution and framerate, or stopped), the
+    camera being the largest power and CPU draw on the robot.
+
+    The camera is idled once nothing has needed it for 'idle_after_sec':
+    the letterbox door is closed, there has been no activity (PIR motion,
+    the door, a new stream client), and the function 'f_is_busy' (e.g.,
+    stream clients are connected or a clip is being recorded) returns False.
+    Any activity or the door opening resumes it immediately; the latency
+    of resuming is that of the event loop plus restarting the camera.
+
+    The run() coroutine runs on the camera's event loop until stop() is
+    called; the activity(), set_door_open() and stop() methods may be
+    called from any thread.
+
+    :param f_set_idle:      a function called on an executor thread with
+                            True to idle the camera, False to resume it
+    :param f_is_busy:       a function returning True while the camera is
+                            in use regardless of activity
+    :param idle_after_sec:  the seconds without activity before idling
+    :param level:           the log level
+    '''
+    def __init__(self, f_set_idle, f_is_busy, idle_after_sec=30.0, level=Level.INFO):
+        self._log = Logger('duty-cycle', level)
+        self._set_idle       = f_set_idle
+        self._is_busy        = f_is_busy
+        self._idle_after_sec = idle_after_sec
+        self._last_activity  = time.monotonic()
+        self._door_open      = False
+        self._idle           = False
+        self._stopping       = False
+        self._loop           = None
+        self._wake           = None
+        self._lock           = threading.Lock()
+        self._idled          = 0
+        self._resumed        = 0
+        self._idle_sec       = 0.0
+        self._idle_since     = 0.0
+        self._max_resume_sec = 0.0
+        self._log.info('ready: idle after {:4.1f}s.'.format(idle_after_sec))
+
+    # ..........................................................................
+    @property
+    def idle(self):
+        return self._idle
+
+    # ..........................................................................
+    def activity(self, source):
+        '''
+        Record activity from the named source, resuming the camera if idle.
+        '''
+        with self._lock:
+            self._last_activity = time.monotonic()
+        if self._idle:
+            self._log.info('resuming on {}.'.format(source))
+            self._notify()
+
+    # ..........................................................................
+    def set_door_open(self, is_open):
+        '''
+        Set the state of the letterbox door: while open the camera is never
+        idled.
+        '''
+        self._door_open = is_open
+        self.activity('door {}'.format('open' if is_open else 'closed'))
+
+    # ..........................................................................
+    def stop(self):
+        '''
+        End run(), leaving the camera as it is.
+        '''
+        self._stopping = True
+        self._notify()
+
+    # ..........................................................................
+    def _notify(self):
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError: # loop closed during shutdown
+            pass
+
+    # ..........................................................................
+    def _may_idle(self):
+        '''
+        Returns the seconds until the camera may be idled, zero if it may be
+        idled now.
+        '''
+        with self._lock:
+            _remaining = self._last_activity + self._idle_after_sec - time.monotonic()
+        if _remaining > 0.0:
+            return _remaining
+        if self._door_open or self._is_busy():
+            return self._idle_after_sec
+        return 0.0
+
+    # ..........................................................................
+    async def run(self):
+        '''
+        Idle and resume the camera until stop() is called.
+        '''
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        try:
+            while not self._stopping:
+                if self._idle:
+                    await self._wake.wait()
+                    self._wake.clear()
+                    if self._stopping:
+                        break
+                    _start = time.monotonic()
+                    await self._loop.run_in_executor(None, self._set_idle, False)
+                    self._idle = False
+                    _now = time.monotonic()
+                    self._resumed += 1
+                    self._idle_sec += _now - self._idle_since
+                    self._max_resume_sec = max(self._max_resume_sec, _now - _start)
+                    self._log.info('camera active after {:5.1f}ms.'.format(1000.0 * ( _now - _start )))
+                else:
+                    _delay = self._may_idle()
+                    if _delay > 0.0:
+                        try:
+                            await asyncio.wait_for(self._wake.wait(), _delay)
+                        except asyncio.TimeoutError:
+                            pass
+                        self._wake.clear()
+                        continue
+                    self._log.info('idling camera.')
+                    await self._loop.run_in_executor(None, self._set_idle, True)
+                    self._idle = True
+                    self._idled += 1
+                    self._idle_since = time.monotonic()
+                    # activity while idling: resume straight away
+                    if self._may_idle() > 0.0:
+                        self._wake.set()
+        finally:
+            self._loop = None
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns whether idle, the number of times idled and resumed, the
+        total idle seconds and the longest time taken to resume.
+        '''
+        _idle_sec = self._idle_sec + ( time.monotonic() - self._idle_since if self._idle else 0.0 )
+        return {
+            'idle':           self._idle,
+            'idled':          self._idled,
+            'resumed':        self._resumed,
+            'idle_sec':       _idle_sec,
+            'max_resume_sec': self._max_resume_sec
+        }
+
+#EOF
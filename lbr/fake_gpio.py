@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import threading
+
+# ..............................................................................
+class FakeGPIO(object):
+    '''
+    A stand-in for the RPi.GPIO module, for use off the Raspberry Pi. An
+    instance may be passed wherever the module would be used.
+
+    Input levels are set by calling set_input(), which calls any callback
+    registered with add_event_detect() for a matching edge, on the calling
+    thread (RPi.GPIO calls them on its own thread). Bounce times are ignored.
+    '''
+    BCM      = 11
+    BOARD    = 10
+    IN       = 1
+    OUT      = 0
+    PUD_OFF  = 20
+    PUD_DOWN = 21
+    PUD_UP   = 22
+    RISING   = 31
+    FALLING  = 32
+    BOTH     = 33
+    HIGH     = 1
+    LOW      = 0
+
+    def __init__(self):
+        self._mode      = None
+        self._levels    = {}
+        self._callbacks = {} # pin: ( edge, callback )
+        self._lock      = threading.Lock()
+        self.reads      = 0
+
+    def setmode(self, mode):
+        self._mode = mode
+
+    def setwarnings(self, enabled):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=None, initial=None):
+        if pin not in self._levels:
+            self._levels[pin] = 1 if pull_up_down == FakeGPIO.PUD_UP else 0
+
+    def input(self, pin):
+        self.reads += 1
+        return self._levels.get(pin, 0)
+
+    def output(self, pin, value):
+        self._levels[pin] = 1 if value else 0
+
+    def PWM(self, pin, frequency):
+        return FakePWM(pin, frequency)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        with self._lock:
+            if pin in self._callbacks:
+                raise RuntimeError('Conflicting edge detection already enabled for this GPIO channel')
+            self._callbacks[pin] = ( edge, callback )
+
+    def remove_event_detect(self, pin):
+        with self._lock:
+            self._callbacks.pop(pin, None)
+
+    def cleanup(self, pin=None):
+        with self._lock:
+            if pin is None:
+                self._callbacks.clear()
+            else:
+                self._callbacks.pop(pin, None)
+
+    def set_input(self, pin, value):
+        '''
+        Set the level of an input pin, calling any callback for the edge.
+        '''
+        _value = 1 if value else 0
+        _previous = self._levels.get(pin, 0)
+        self._levels[pin] = _value
+        if _value == _previous:
+            return
+        with self._lock:
+            _edge, _callback = self._callbacks.get(pin, ( None, None ))
+        if _callback is None:
+            return
+        if _edge == FakeGPIO.BOTH or ( _edge == FakeGPIO.RISING and _value ) or ( _edge == FakeGPIO.FALLING and not _value ):
+            _callback(pin)
+
+# ..............................................................................
+class FakePWM(object):
+    '''
+    A stand-in for RPi.GPIO's PWM class.
+    '''
+    def __init__(self, pin, frequency):
+        self.pin        = pin
+        self.frequency  = frequency
+        self.duty_cycle = 0
+        self.running    = False
+
+    def start(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        self.running = True
+
+    def ChangeDutyCycle(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        self.running = False
+
+#EOF
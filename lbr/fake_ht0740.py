@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+# ..............................................................................
+class FakeOutput(object):
+    '''
+    One output of a FakeHT0740 (its switch or its LED), counting the I²C
+    transactions that would have been made on the device.
+    '''
+    def __init__(self, device):
+        self._device = device
+        self._state = False
+
+    def on(self):
+        self._device.writes += 1
+        self._state = True
+
+    def off(self):
+        self._device.writes += 1
+        self._state = False
+
+    def toggle(self):
+        self._device.reads += 1
+        self._device.writes += 1
+        self._state = not self._state
+
+    def state(self):
+        self._device.reads += 1
+        return self._state
+
+    @property
+    def is_on(self):
+        '''
+        The state of the output, without counting a transaction.
+        '''
+        return self._state
+
+# ..............................................................................
+class FakeHT0740(object):
+    '''
+    A stand-in for the ht0740 library's HT0740 switch, for use off the
+    Raspberry Pi. The 'reads' and 'writes' attributes count I²C transactions.
+    '''
+    def __init__(self, i2c_addr=0x38):
+        self.i2c_addr = i2c_addr
+        self.reads    = 0
+        self.writes   = 0
+        self.switch   = FakeOutput(self)
+        self.led      = FakeOutput(self)
+
+    def enable(self):
+        self.writes += 1
+
+    @property
+    def transactions(self):
+        return self.reads + self.writes
+
+#EOF
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import io, time, queue, threading, traceback
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+
+_WRITE = 0
+_OPEN  = 1
+_FLUSH = 2
+_CLOSE = 3
+
+# ..............................................................................
+class FileWriter(object):
+    '''
+    Writes video output to disk on a dedicated thread so that a stalled SD
+    card never blocks the camera thread, and therefore never delays frame
+    delivery to streaming clients.
+
+    write() copies each chunk into a block from a preallocated pool; full
+    blocks are queued to the writer thread, which writes them to the file
+    and returns them to the pool. Small chunks are thereby coalesced into
+    large writes of exactly 'block_size' bytes, aligned to that size within
+    the file; only the final block before a flush or close is shorter.
+
+    The pool bounds the queue. When the card falls behind and the pool is
+    exhausted the policy decides: 'block' makes write() wait for a free
+    block, 'drop' discards whole frames. Since the output is MJPEG, under
+    'drop' the full blocks holding a frame are queued only once the next
+    frame begins (a chunk starting with an SOI marker). A frame that runs
+    out of blocks is then rolled back to its start, the rest of it is
+    discarded, and writing resumes with the next frame, so the file holds
+    only whole frames. A frame larger than the pool is always dropped.
+
+    open(), flush() and close_file() are queued in order with the data, so
+    one writer can be used for a succession of files (e.g., event clips or
+    video segments). If provided, the 'f_on_close' function is called on the
+    writer thread with the filename of each file once it has been closed.
+
+    :param block_size:  the size of each write in bytes
+    :param blocks:      the number of blocks in the pool
+    :param policy:      'drop' or 'block' when the pool is exhausted
+    :param opener:      the function used to open files (default io.open)
+    :param f_on_close:  an optional function called with each closed filename
+    :param level:       the log level
+    '''
+    def __init__(self, block_size=65536, blocks=64, policy='drop', opener=None, f_on_close=None, level=Level.INFO):
+        self._log = Logger('file-writer', level)
+        if policy not in ( 'drop', 'block' ):
+            raise ValueError('unrecognised file writer policy: {}'.format(policy))
+        if blocks < 2:
+            raise ValueError('file writer requires at least two blocks.')
+        self._block_size = block_size
+        self._blocks     = blocks
+        self._policy     = policy
+        self._opener     = opener if opener else lambda filename: io.open(filename, 'wb')
+        self._on_close   = f_on_close
+        self._free       = queue.Queue()
+        for _ in range(blocks):
+            self._free.put(bytearray(block_size))
+        self._queue      = queue.Queue()
+        self._block      = None    # the block being filled
+        self._fill       = 0       # bytes in that block
+        self._hold       = policy == 'drop'
+        self._pending    = []      # full blocks held until the frame is complete ('drop' only)
+        self._frame_offset = 0     # the start of the frame in its first block
+        self._frame_length = 0     # bytes of the frame accepted so far
+        self._dropping   = False
+        self._file       = None    # used only on the writer thread
+        self._filename   = None
+        # statistics
+        self._writes         = 0
+        self._bytes_written  = 0
+        self._bytes_dropped  = 0
+        self._drops          = 0
+        self._errors         = 0
+        self._max_depth      = 0
+        self._latency_total  = 0.0
+        self._latency_max    = 0.0
+        self._thread = threading.Thread(target=FileWriter.__loop, args=[self], name='file-writer')
+        self._thread.setDaemon(True)
+        self._thread.start()
+        self._log.info('ready: {:d} blocks of {:d} bytes; {} when full.'.format(blocks, block_size, policy))
+
+    # ..........................................................................
+    @property
+    def depth(self):
+        '''
+        The number of full blocks waiting to be written.
+        '''
+        return self._blocks - self._free.qsize() - len(self._pending) - ( 1 if self._block is not None else 0 )
+
+    # ..........................................................................
+    def open(self, filename):
+        '''
+        Queue the opening of a new output file, closing any current file.
+        '''
+        self._queue_block()
+        self._dropping = False
+        self._queue.put(( _OPEN, filename ))
+
+    # ..........................................................................
+    def write(self, buf):
+        '''
+        Copy the chunk into the write blocks, returning the number of bytes
+        accepted: zero if its frame is dropped. This only blocks if the
+        policy is 'block' and the pool is exhausted.
+        '''
+        _length = len(buf)
+        _frame_start = buf[:2] == b'\xff\xd8'
+        if self._dropping:
+            if not _frame_start:
+                self._bytes_dropped += _length
+                return 0
+            self._dropping = False
+        if _frame_start and self._hold:
+            self._start_frame()
+        _view = memoryview(buf)
+        _position = 0
+        while _position < _length:
+            if self._block is None:
+                self._block = self._acquire()
+                if self._block is None:
+                    self._drop_frame(_length)
+                    return 0
+            _count = min(_length - _position, self._block_size - self._fill)
+            self._block[self._fill:self._fill + _count] = _view[_position:_position + _count]
+            self._fill += _count
+            _position += _count
+            if self._fill == self._block_size:
+                if self._hold:
+                    self._pending.append(self._block)
+                    self._block = None
+                    self._fill  = 0
+                else:
+                    self._queue_block()
+        self._frame_length += _length
+        return _length
+
+    # ..........................................................................
+    def _start_frame(self):
+        '''
+        The previous frame is complete: queue the full blocks held for it,
+        and note where the new frame starts.
+        '''
+        self._queue_pending()
+        self._frame_offset = self._fill
+        self._frame_length = 0
+
+    # ..........................................................................
+    def _drop_frame(self, length):
+        '''
+        The pool is exhausted mid-frame: roll the frame back to its start,
+        returning the blocks it alone filled to the pool, and discard the
+        rest of it, the chunk of the length and those to come.
+        '''
+        self._drops += 1
+        self._bytes_dropped += self._frame_length + length
+        if self._pending:
+            if self._block is not None:
+                self._free.put(self._block)
+            self._block = self._pending[0]
+            for _block in self._pending[1:]:
+                self._free.put(_block)
+            self._pending.clear()
+        self._fill = self._frame_offset
+        self._frame_length = 0
+        self._dropping = True
+
+    # ..........................................................................
+    def _acquire(self):
+        if self._policy == 'block':
+            return self._free.get()
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            return None
+
+    # ..........................................................................
+    def _queue_block(self):
+        '''
+        Queue any held blocks, then the current block, full or not, to the
+        writer thread.
+        '''
+        self._queue_pending()
+        if self._block is not None:
+            if self._fill > 0:
+                self._queue.put(( _WRITE, self._block, self._fill ))
+                _depth = self.depth + 1
+                if _depth > self._max_depth:
+                    self._max_depth = _depth
+            else:
+                self._free.put(self._block)
+            self._block = None
+            self._fill  = 0
+        self._frame_offset = 0
+        self._frame_length = 0
+
+    # ..........................................................................
+    def _queue_pending(self):
+        '''
+        Queue the full blocks held for a frame to the writer thread.
+        '''
+        if self._pending:
+            _pending, self._pending = self._pending, []
+            for _block in _pending:
+                self._queue.put(( _WRITE, _block, self._block_size ))
+            _depth = self.depth
+            if _depth > self._max_depth:
+                self._max_depth = _depth
+
+    # ..........................................................................
+    def flush(self):
+        '''
+        Queue any partial block followed by a flush of the file.
+        '''
+        self._queue_block()
+        self._queue.put(( _FLUSH, None ))
+
+    # ..........................................................................
+    def close_file(self):
+        '''
+        Queue any partial block followed by closing the current file.
+        '''
+        self._queue_block()
+        self._queue.put(( _CLOSE, None ))
+
+    # ..........................................................................
+    def close(self, timeout=None):
+        '''
+        Write everything queued, close the current file and stop the writer
+        thread, waiting up to the timeout (seconds) for it to finish.
+        '''
+        self.close_file()
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self._log.warning('writer thread did not finish; {:d} blocks unwritten.'.format(self.depth))
+        self._log.info('closed.')
+
+    # ..........................................................................
+    def __loop(self):
+        '''
+        The writer thread: performs all file operations in queued order.
+        '''
+        while True:
+            _item = self._queue.get()
+            if _item is None:
+                break
+            _kind, _value = _item[0], _item[1]
+            try:
+                if _kind == _WRITE:
+                    if self._file is not None:
+                        _start = time.perf_counter()
+                        self._file.write(memoryview(_value)[:_item[2]])
+                        _latency = time.perf_counter() - _start
+                        self._writes += 1
+                        self._bytes_written += _item[2]
+                        self._latency_total += _latency
+                        if _latency > self._latency_max:
+                            self._latency_max = _latency
+                    self._free.put(_value)
+                elif _kind == _OPEN:
+                    self._close_file()
+                    self._file = self._opener(_value)
+                    self._filename = _value
+                    self._log.info(Fore.MAGENTA + 'output file: {}'.format(_value))
+                elif _kind == _FLUSH:
+                    if self._file is not None:
+                        self._file.flush()
+                elif _kind == _CLOSE:
+                    self._close_file()
+            except Exception:
+                self._errors += 1
+                self._log.error('error writing {}: {}'.format(self._filename, traceback.format_exc()))
+                if _kind == _WRITE:
+                    self._free.put(_value)
+        self._close_file()
+
+    # ..........................................................................
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._log.debug('closed file: {}'.format(self._filename))
+            if self._on_close:
+                try:
+                    self._on_close(self._filename)
+                except Exception:
+                    self._log.error('error on close of {}: {}'.format(self._filename, traceback.format_exc()))
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns a dict of the queue depth, write latency (ms) and drop counts.
+        '''
+        return {
+            'depth':          self.depth,
+            'max_depth':      self._max_depth,
+            'blocks':         self._blocks,
+            'writes':         self._writes,
+            'bytes_written':  self._bytes_written,
+            'bytes_dropped':  self._bytes_dropped,
+            'drops':          self._drops,
+            'errors':         self._errors,
+            'latency_avg_ms': 1000.0 * self._latency_total / self._writes if self._writes else 0.0,
+            'latency_max_ms': 1000.0 * self._latency_max
+        }
+
+#EOF
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import time
+from threading import Condition
+
+from core.logger import Level, Logger
+
+PART_HEADER = b'--FRAME\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n'
+HEADER_ROOM = 64 # bytes reserved ahead of each frame for its multipart header
+
+# ..............................................................................
+class FrameBuffer(object):
+    '''
+    A preallocated ring of frame slots used to pass MJPEG frames from the
+    camera thread to any number of readers without copying or allocating
+    per frame.
+
+    The camera writes each chunk in place into the current slot. When a
+    frame is complete commit() publishes the slot under a new sequence
+    number and moves the writer on to the next slot. Readers receive a
+    read-only memoryview onto the slot along with its sequence number.
+
+    A published slot is not rewritten until the writer has come all the
+    way around the ring, so a reader holding a frame view has (slots - 1)
+    frame periods to finish with it. Nothing holds the writer back for a
+    slow reader, so every reader must respect this itself: a view may only
+    be relied upon while valid() holds for its sequence number, and any use
+    of it that may outlive the slot (e.g., a send that can block on a slow
+    client) must be given a copy instead. Since valid() only ever turns
+    False, a copy taken while valid() still holds afterwards is intact.
+
+    Each slot reserves room ahead of the frame so that on commit the
+    multipart boundary and headers can be written directly in front of the
+    JPEG and a CRLF after it. The complete multipart part is therefore built
+    once per frame, in place, and every stream client sends that same view
+    with a single call (see latest_part()), falling back to sending a copy
+    of whatever the socket won't take at once.
+
+    If a frame is larger than its slot the slot is replaced by a larger
+    one (counted as an allocation); the old bytearray remains alive for as
+    long as any reader still holds a view of it.
+
+    :param slots:     the number of frame slots in the ring (minimum 3)
+    :param capacity:  the initial capacity of each slot in bytes
+    :param level:     the log level
+    '''
+    def __init__(self, slots=4, capacity=262144, level=Level.INFO):
+        self._log = Logger('frame-buffer', level)
+        if slots < 3:
+            raise ValueError('frame buffer requires at least three slots.')
+        self._slot_count  = slots
+        self._slots       = [ bytearray(HEADER_ROOM + capacity + 2) for _ in range(slots) ]
+        self._views       = [ memoryview(_slot) for _slot in self._slots ]
+        self._ro_views    = [ _view.toreadonly() for _view in self._views ]
+        self._lengths     = [ 0 ] * slots
+        self._part_starts = [ HEADER_ROOM ] * slots
+        self._sequences   = [ 0 ] * slots
+        self._timestamps  = [ 0.0 ] * slots
+        self._index       = 0     # the slot currently being written
+        self._position    = HEADER_ROOM # the write position within that slot
+        self._latest      = -1    # the slot holding the most recent frame
+        self._sequence    = 0     # the sequence number of the most recent frame
+        self._condition   = Condition()
+        self._listeners   = []
+        # statistics
+        self._bytes       = 0
+        self._allocations = slots
+        self._copies      = 0
+        self._log.info('ready: {:d} slots of {:d} bytes.'.format(slots, capacity))
+
+    # ..........................................................................
+    @property
+    def condition(self):
+        '''
+        The Condition notified each time a frame is committed.
+        '''
+        return self._condition
+
+    # ..........................................................................
+    def add_listener(self, listener):
+        '''
+        Adds a function to be called with the new sequence number each time
+        a frame is committed. Listeners are called on the writer's (camera)
+        thread so must return quickly.
+        '''
+        self._listeners = self._listeners + [ listener ]
+
+    # ..........................................................................
+    def remove_listener(self, listener):
+        self._listeners = [ _listener for _listener in self._listeners if _listener != listener ]
+
+    # ..........................................................................
+    @property
+    def sequence(self):
+        '''
+        The sequence number of the most recently committed frame, zero if
+        no frame has yet been committed.
+        '''
+        return self._sequence
+
+    # ..........................................................................
+    @property
+    def pending(self):
+        '''
+        The number of bytes written to the current, uncommitted slot.
+        '''
+        return self._position - HEADER_ROOM
+
+    # ..........................................................................
+    def append(self, buf):
+        '''
+        Write the chunk in place into the current slot, returning the
+        number of bytes written.
+        '''
+        _length = len(buf)
+        _end = self._position + _length
+        if _end + 2 > len(self._slots[self._index]): # leave room for the trailing CRLF
+            self._grow(_end + 2)
+        self._views[self._index][self._position:_end] = buf
+        self._position = _end
+        self._bytes += _length
+        return _length
+
+    # ..........................................................................
+    def _grow(self, required):
+        '''
+        Replace the current slot with one large enough to hold the required
+        number of bytes, preserving any bytes already written. This is the
+        only path that allocates or copies, and should be rare once the
+        capacity has been sized for the camera's output.
+        '''
+        _old = self._views[self._index]
+        _slot = bytearray(max(required, 2 * len(_old)))
+        _view = memoryview(_slot)
+        if self._position > HEADER_ROOM:
+            _view[HEADER_ROOM:self._position] = _old[HEADER_ROOM:self._position]
+            self._copies += 1
+        self._slots[self._index]    = _slot
+        self._views[self._index]    = _view
+        self._ro_views[self._index] = _view.toreadonly()
+        self._allocations += 1
+        self._log.debug('slot {:d} grown to {:d} bytes.'.format(self._index, len(_slot)))
+
+    # ..........................................................................
+    def commit(self):
+        '''
+        Publish the current slot as the latest frame, notify all waiting
+        readers and move the writer on to the next slot. Does nothing if
+        nothing has been written since the last commit.
+
+        The frame's multipart header is written into the room reserved in
+        front of it and a CRLF after it before the slot is published.
+        '''
+        _length = self._position - HEADER_ROOM
+        if _length <= 0:
+            return
+        _index = self._index
+        _view = self._views[_index]
+        _header = PART_HEADER % _length
+        _part_start = HEADER_ROOM - len(_header)
+        _view[_part_start:HEADER_ROOM] = _header
+        _view[self._position:self._position + 2] = b'\r\n'
+        with self._condition:
+            self._lengths[_index]     = _length
+            self._part_starts[_index] = _part_start
+            self._timestamps[_index] = time.time()
+            self._sequence += 1
+            self._sequences[_index]  = self._sequence
+            self._latest = _index
+            self._condition.notify_all()
+        self._index = ( _index + 1 ) % self._slot_count
+        self._position = HEADER_ROOM
+        for _listener in self._listeners:
+            _listener(self._sequence)
+
+    # ..........................................................................
+    def latest(self):
+        '''
+        Returns a tuple of the sequence number and a read-only memoryview of
+        the most recent frame, or (0, None) if no frame has been committed.
+        This never blocks. The view is only intact while valid() holds for
+        the sequence number.
+        '''
+        _index = self._latest
+        if _index < 0:
+            return 0, None
+        return self._sequences[_index], self._ro_views[_index][HEADER_ROOM:HEADER_ROOM + self._lengths[_index]]
+
+    # ..........................................................................
+    def latest_part(self):
+        '''
+        Returns a tuple of the sequence number and a read-only memoryview of
+        the most recent frame as a complete multipart part: the '--FRAME'
+        boundary, Content-Type and Content-Length headers, the JPEG and a
+        trailing CRLF. Returns (0, None) if no frame has been committed.
+        As for latest(), the view is only intact while valid() holds, so a
+        send that may block must be given a copy.
+        '''
+        _index = self._latest
+        if _index < 0:
+            return 0, None
+        return self._sequences[_index], self._ro_views[_index][self._part_starts[_index]:HEADER_ROOM + self._lengths[_index] + 2]
+
+    # ..........................................................................
+    def timestamp(self):
+        '''
+        Returns the time (epoch seconds) at which the most recent frame was
+        committed, or zero if no frame has been committed.
+        '''
+        return self._timestamps[self._latest] if self._latest >= 0 else 0.0
+
+    # ..........................................................................
+    def wait(self, after_sequence, timeout=None, part=False):
+        '''
+        Blocks until a frame newer than 'after_sequence' has been committed,
+        then returns a tuple of its sequence number and a read-only view,
+        of the multipart part if 'part' is True, otherwise of the JPEG.
+        Intermediate frames are skipped: the reader always gets the latest.
+        Returns (after_sequence, None) if the timeout expires first. As for
+        latest(), the view is only intact while valid() holds.
+        '''
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._sequence > after_sequence, timeout):
+                return after_sequence, None
+            return self.latest_part() if part else self.latest()
+
+    # ..........................................................................
+    def valid(self, sequence):
+        '''
+        Returns True if the frame with the given sequence number is still
+        held intact in the ring, i.e., a view of it may still be read.
+        '''
+        return 0 < sequence and self._sequence - sequence < self._slot_count - 1
+
+    # ..........................................................................
+    def get_rate(self):
+        '''
+        Returns a tuple of the frames per second and the mean bytes per frame
+        of the frames held in the ring, from the commit times and lengths
+        already kept for each slot, so the writer does no extra work. The
+        rate is zero once no frame has been committed for longer than the
+        ring spans (e.g., the camera has been stopped).
+        '''
+        with self._condition:
+            _frames = [ ( self._timestamps[_index], self._lengths[_index] )
+                    for _index in range(self._slot_count) if self._sequences[_index] > 0 ]
+        if not _frames:
+            return 0.0, 0
+        _bytes_per_frame = sum(_length for _, _length in _frames) // len(_frames)
+        _oldest = min(_timestamp for _timestamp, _ in _frames)
+        _newest = max(_timestamp for _timestamp, _ in _frames)
+        _span = _newest - _oldest
+        if _span <= 0.0 or time.time() - _newest > _span:
+            return 0.0, _bytes_per_frame
+        return ( len(_frames) - 1 ) / _span, _bytes_per_frame
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns a dict of the frame, byte, allocation and copy counts.
+        The allocation count includes the initial slots.
+        '''
+        return {
+            'frames':      self._sequence,
+            'bytes':       self._bytes,
+            'slots':       self._slot_count,
+            'allocations': self._allocations,
+            'copies':      self._copies
+        }
+
+#EOF
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# The hardware abstraction layer (HAL): provides the GPIO, HT0740 switch and
+# camera used by the robot, either the real devices on a Raspberry Pi or
+# deterministic simulations of them, selected by 'ros.hal.backend' in the
+# configuration.
+#
+
+import io, sys, time, threading
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from lbr.fake_gpio import FakeGPIO
+from lbr.fake_ht0740 import FakeHT0740
+
+# ..............................................................................
+class Hal(object):
+    '''
+    Provides the hardware devices for the configured backend:
+
+        'pi':   the RPi.GPIO module, HT0740 switches and the PiCamera
+        'sim':  a FakeGPIO whose PIR and door pins are driven by scripted
+                traces, FakeHT0740 switches counting I²C transactions, and a
+                SimCamera emitting synthetic JPEG frames
+
+    The simulation runs on a SimClock at 'time_scale' times real time, and
+    the durations used by the devices and daemon should be passed through
+    scale() so that everything runs at the same rate. On the Pi the time
+    scale is always 1.
+
+    Hardware libraries are imported only when the 'pi' backend is used.
+
+    :param config:  the application configuration
+    :param level:   the log level
+    '''
+    def __init__(self, config, level=Level.INFO):
+        self._log = Logger('hal', level)
+        if config is None:
+            raise ValueError('no configuration provided.')
+        _config = config['ros'].get('hal') or {}
+        self._level   = level
+        self._backend = _config.get('backend', 'pi')
+        self._traces  = []
+        self._switches = []
+        self._camera  = None
+        if self._backend == 'pi':
+            try:
+                import RPi.GPIO as GPIO
+            except ImportError:
+                sys.exit(Fore.RED + "This script requires the RPi.GPIO module.\nInstall with: pip3 install --user RPi.GPIO" + Style.RESET_ALL)
+            self._gpio  = GPIO
+            self._clock = SimClock(1.0)
+        elif self._backend == 'sim':
+            self._gpio  = FakeGPIO()
+            self._clock = SimClock(_config.get('time_scale', 1.0))
+            # the pins driven by the scripted traces, as configured for the daemon
+            _lbrd_config = config['ros'].get('lbrd')
+            _period = _config.get('trace_period_sec', 0.0)
+            _pir_pin  = _lbrd_config.get('pir_pin')
+            _door_pin = _lbrd_config.get('door_pin')
+            self._gpio.output(_door_pin, 0) # the door starts closed (pulled up, so open is high)
+            self._traces.append(SimTrace('pir', self._gpio, _pir_pin, _config.get('pir_trace') or [], _period, self._clock, level))
+            self._traces.append(SimTrace('door', self._gpio, _door_pin, _config.get('door_trace') or [], _period, self._clock, level))
+        else:
+            raise ValueError('unrecognised hal backend: {}'.format(self._backend))
+        self._log.info('ready: {} backend at {:4.1f}x real time.'.format(self._backend, self._clock.time_scale))
+
+    # ..........................................................................
+    @property
+    def backend(self):
+        return self._backend
+
+    # ..........................................................................
+    @property
+    def simulated(self):
+        return self._backend == 'sim'
+
+    # ..........................................................................
+    @property
+    def gpio(self):
+        '''
+        The GPIO module, or its simulation.
+        '''
+        return self._gpio
+
+    # ..........................................................................
+    @property
+    def clock(self):
+        return self._clock
+
+    # ..........................................................................
+    @property
+    def time_scale(self):
+        return self._clock.time_scale
+
+    # ..........................................................................
+    def scale(self, seconds):
+        '''
+        Returns the real duration of the given simulated duration.
+        '''
+        return seconds / self._clock.time_scale
+
+    # ..........................................................................
+    @property
+    def Color(self):
+        '''
+        The picamera Color class, or a substitute providing from_string().
+        '''
+        if self._backend == 'pi':
+            from picamera import Color
+            return Color
+        return SimColor
+
+    # ..........................................................................
+    @property
+    def switches(self):
+        '''
+        The switches created by this HAL.
+        '''
+        return self._switches
+
+    # ..........................................................................
+    @property
+    def camera(self):
+        '''
+        The most recently created camera.
+        '''
+        return self._camera
+
+    # ..........................................................................
+    def create_switch(self, i2c_address):
+        '''
+        Returns an enabled HT0740 switch at the I²C address, or its simulation.
+        '''
+        if self._backend == 'pi':
+            try:
+                from ht0740 import HT0740
+            except ImportError:
+                sys.exit(Fore.RED + "This script requires the ht0740 module.\nInstall with: pip3 install --user ht0740" + Style.RESET_ALL)
+            try:
+                self._log.info('enabling switch at I²C address 0x{:02X}'.format(i2c_address))
+                _switch = HT0740(i2c_addr=i2c_address)
+            except OSError as e:
+                self._log.error('error instantiating HT0740: {}. '.format(e) + Fore.YELLOW + 'Is the device available at the specified I²C address?')
+                sys.exit(1)
+        else:
+            _switch = FakeHT0740(i2c_address)
+        self._switches.append(_switch)
+        return _switch
+
+    # ..........................................................................
+    def create_camera(self, resolution, framerate):
+        '''
+        Returns a camera (to be used as a context manager) at the resolution
+        and framerate, or its simulation.
+        '''
+        if self._backend == 'pi':
+            import picamera
+            self._camera = picamera.PiCamera(resolution=resolution, framerate=framerate)
+        else:
+            self._camera = SimCamera(resolution, framerate, self._clock, self._level)
+        return self._camera
+
+    # ..........................................................................
+    def start(self):
+        '''
+        Start playing any scripted device traces.
+        '''
+        for _trace in self._traces:
+            _trace.start()
+
+    # ..........................................................................
+    def close(self):
+        for _trace in self._traces:
+            _trace.close()
+        self._log.info('closed.')
+
+# ..............................................................................
+class SimClock(object):
+    '''
+    A clock running at 'time_scale' times real time, from its creation.
+    '''
+    def __init__(self, time_scale=1.0):
+        if time_scale <= 0.0:
+            raise ValueError('time scale must be greater than zero.')
+        self._time_scale = float(time_scale)
+        self._start      = time.monotonic()
+
+    @property
+    def time_scale(self):
+        return self._time_scale
+
+    def time(self):
+        '''
+        Returns the simulated seconds elapsed since the clock was created.
+        '''
+        return ( time.monotonic() - self._start ) * self._time_scale
+
+    def sleep(self, seconds):
+        time.sleep(seconds / self._time_scale)
+
+    def wait(self, event, seconds):
+        '''
+        Wait on the threading.Event for up to the simulated duration.
+        '''
+        return event.wait(max(0.0, seconds / self._time_scale))
+
+# ..............................................................................
+class SimTrace(object):
+    '''
+    Drives a FakeGPIO input pin high for each ( start, duration ) pair of a
+    scripted trace, in simulated seconds from when it is started. If a
+    period is set the trace repeats with that period.
+    '''
+    def __init__(self, name, gpio, pin, trace, period, clock, level):
+        self._log = Logger('trace-{}'.format(name), level)
+        self._gpio   = gpio
+        self._pin    = pin
+        self._trace  = sorted(( float(_start), float(_duration) ) for _start, _duration in trace)
+        self._period = period
+        self._clock  = clock
+        self._stop   = threading.Event()
+        self._thread = None
+        self.events  = 0
+
+    def start(self):
+        if self._trace and self._thread is None:
+            self._thread = threading.Thread(target=SimTrace.__play, args=[self], name='sim-trace')
+            self._thread.setDaemon(True)
+            self._thread.start()
+
+    def __play(self):
+        _origin = self._clock.time()
+        while True:
+            for _start, _duration in self._trace:
+                for _time, _value in ( ( _start, 1 ), ( _start + _duration, 0 ) ):
+                    if self._clock.wait(self._stop, _origin + _time - self._clock.time()):
+                        return
+                    self._gpio.set_input(self._pin, _value)
+                    self.events += 1
+                    self._log.debug('pin {:d} set {}.'.format(self._pin, 'high' if _value else 'low'))
+            if not self._period:
+                return
+            _origin += self._period
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+# ..............................................................................
+class SimColor(object):
+    '''
+    Substitutes for picamera's Color class.
+    '''
+    @staticmethod
+    def from_string(value):
+        return value
+
+# ..............................................................................
+class SimCamera(object):
+    '''
+    Simulates the subset of picamera's PiCamera used by Video, emitting
+    synthetic MJPEG frames at the configured resolution and framerate (in
+    simulated time) to the output passed to start_recording(), on any of
+    the splitter ports and optionally resized, as the PiCamera does. The
+    'frames' counter is of the main port (1).
+
+    If Pillow is installed the frames are real JPEGs of a bar moving across
+    a gradient; otherwise they are SOI/EOI-delimited placeholders of a
+    typical compressed size. A short loop of frames is generated once for
+    each resolution, so producing frames costs no encoding.
+    '''
+    LOOP_FRAMES = 16
+    CHUNK_SIZE  = 65536 # the size of the writes made by the camera
+
+    def __init__(self, resolution, framerate, clock, level=Level.INFO):
+        self._log = Logger('sim-camera', level)
+        self.resolution    = resolution
+        self.framerate     = framerate
+        self.iso           = 0
+        self.exposure_mode = 'auto'
+        self.shutter_speed = 0
+        self.led           = False
+        self.annotate_text = ''
+        self.annotate_text_size  = 32
+        self.annotate_foreground = None
+        self.annotate_background = None
+        self.closed        = False
+        self.frames        = 0
+        self._clock        = clock
+        self._ports        = {} # splitter port: ( thread, stop event )
+        self._loops        = {} # resolution: frames
+
+    # ..........................................................................
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # ..........................................................................
+    @property
+    def recording(self):
+        '''
+        True if recording on the main (default) splitter port.
+        '''
+        return 1 in self._ports
+
+    # ..........................................................................
+    @staticmethod
+    def render_frames(resolution, count, quality=85):
+        '''
+        Returns a list of 'count' synthetic JPEG frames at the resolution.
+        '''
+        _width, _height = resolution
+        try:
+            from PIL import Image, ImageDraw
+        except ImportError:
+            _size = max(1024, _width * _height // 10)
+            return [ b'\xff\xd8' + bytes([ ( i * 7 + j ) % 255 for j in range(256) ]) * ( _size // 256 ) + b'\xff\xd9' for i in range(count) ]
+        _frames = []
+        _background = Image.linear_gradient('L').resize(( _width, _height )).convert('RGB')
+        for i in range(count):
+            _image = _background.copy()
+            _x = ( i * _width ) // count
+            ImageDraw.Draw(_image).rectangle([ _x, _height // 4, _x + _width // 16, 3 * _height // 4 ], fill=( 255, 255, 255 ))
+            _buffer = io.BytesIO()
+            _image.save(_buffer, format='JPEG', quality=quality)
+            _frames.append(_buffer.getvalue())
+        return _frames
+
+    # ..........................................................................
+    def start_recording(self, output, format='mjpeg', quality=None, splitter_port=1, resize=None):
+        if format != 'mjpeg':
+            raise ValueError('the simulated camera supports only mjpeg.')
+        if splitter_port in self._ports:
+            raise RuntimeError('the camera is already recording on port {:d}.'.format(splitter_port))
+        _resolution = tuple(resize or self.resolution)
+        if _resolution not in self._loops:
+            self._loops[_resolution] = SimCamera.render_frames(_resolution, SimCamera.LOOP_FRAMES, quality if quality and quality > 0 else 85)
+        _stop = threading.Event()
+        _thread = threading.Thread(target=SimCamera.__record, args=[self, output, self._loops[_resolution], splitter_port, _stop], name='sim-camera')
+        _thread.setDaemon(True)
+        self._ports[splitter_port] = ( _thread, _stop )
+        _thread.start()
+        self._log.info('recording at {}x{}, {}fps on port {:d}.'.format(_resolution[0], _resolution[1], self.framerate, splitter_port))
+
+    # ..........................................................................
+    def __record(self, output, frames, splitter_port, stop):
+        _period = 1.0 / self.framerate
+        _next = self._clock.time()
+        _count = 0
+        while not stop.is_set():
+            _frame = frames[_count % len(frames)]
+            for _position in range(0, len(_frame), SimCamera.CHUNK_SIZE):
+                output.write(_frame[_position:_position + SimCamera.CHUNK_SIZE])
+            _count += 1
+            if splitter_port == 1:
+                self.frames += 1
+            _next += _period
+            self._clock.wait(stop, _next - self._clock.time())
+
+    # ..........................................................................
+    def stop_recording(self, splitter_port=1):
+        _recording = self._ports.pop(splitter_port, None)
+        if _recording is not None:
+            _thread, _stop = _recording
+            _stop.set()
+            _thread.join()
+            self._log.info('stopped recording on port {:d}.'.format(splitter_port))
+
+    # ..........................................................................
+    def close(self):
+        for _port in list(self._ports):
+            self.stop_recording(_port)
+        self.closed = True
+
+#EOF
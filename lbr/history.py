@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import time, sqlite3, threading, traceback
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+
+# ..............................................................................
+class History(object):
+    '''
+    Keeps the history of the letterbox's activity in an SQLite database:
+    the events of the PIR, the door and the light, and rollups of them per
+    minute, hour and day (in local time) of
+
+        motion:        the number of times the PIR became active
+        door_opens:    the number of times the door was opened
+        open_sec:      the seconds the door was open
+        light_on_sec:  the seconds any light (the switch or the LED) was on
+
+    so that a query such as the door openings per day of a month reads a
+    few rows of an index rather than scanning the events. A duration that
+    spans buckets is divided between them.
+
+    The motion(), door() and light() methods only add to a batch in memory,
+    and may be called from any thread; a thread writes each batch (the
+    events, and the rollups as upserts) in one transaction every 'sync_sec',
+    so queries lag by at most that (see sync()). The database is bounded by
+    deleting, once an hour, the events and the rollups of each period older
+    than their days of 'retention' (0 to keep them all).
+
+    :param filename:   the database file
+    :param sync_sec:   the longest an event waits to be written
+    :param retention:  a dict of the days to keep of the 'raw' events and
+                       the 'minute', 'hour' and 'day' rollups
+    :param level:      the log level
+    '''
+    PERIODS   = { 'minute': 60, 'hour': 3600, 'day': 86400 }
+    RETENTION = { 'raw': 30, 'minute': 7, 'hour': 90, 'day': 3650 }
+    PRUNE_SEC = 3600.0
+
+    def __init__(self, filename, sync_sec=30.0, retention=None, level=Level.INFO):
+        self._log = Logger('history', level)
+        self._filename  = filename
+        self._sync_sec  = sync_sec
+        self._retention = dict(History.RETENTION, **( retention or {} ))
+        self._events    = [] # ( time, source, event, value )
+        self._rollups   = {} # ( period, bucket ): [ motion, door_opens, open_sec, light_on_sec ]
+        self._lights    = {} # source: time turned on
+        self._light_on  = None # the time the first light was turned on
+        self._lock      = threading.Lock()
+        self._wake      = threading.Event()
+        self._closing   = False
+        self._pruned    = 0.0
+        self._swaps     = 0 # batches taken by the writer thread
+        # statistics
+        self._recorded  = 0
+        self._commits   = 0
+        self._deleted   = 0
+        self._errors    = 0
+        self._connection = self._connect()
+        self._connection.executescript('''
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS events ( t REAL NOT NULL, source TEXT NOT NULL, event TEXT NOT NULL, value REAL );
+            CREATE INDEX IF NOT EXISTS events_t ON events ( t );
+            CREATE TABLE IF NOT EXISTS rollups ( period INTEGER NOT NULL, bucket INTEGER NOT NULL,
+                motion INTEGER NOT NULL DEFAULT 0, door_opens INTEGER NOT NULL DEFAULT 0,
+                open_sec REAL NOT NULL DEFAULT 0.0, light_on_sec REAL NOT NULL DEFAULT 0.0,
+                PRIMARY KEY ( period, bucket ) ) WITHOUT ROWID;
+        ''')
+        self._reader = self._connect()
+        self._reader_lock = threading.Lock()
+        self._thread = threading.Thread(target=History.__loop, args=[self], name='history')
+        self._thread.setDaemon(True)
+        self._thread.start()
+        self._log.info('ready: {}; synced every {:4.1f}s; keeping {}.'.format(filename, sync_sec,
+                ', '.join('{} {:d} days'.format(_name, _days) for _name, _days in self._retention.items())))
+
+    # ..........................................................................
+    def _connect(self):
+        return sqlite3.connect(self._filename, timeout=10.0, check_same_thread=False)
+
+    # ..........................................................................
+    @staticmethod
+    def bucket(t, period):
+        '''
+        Returns the start (seconds since the epoch) of the bucket of the
+        period (in seconds) containing the time, aligned to local time.
+        '''
+        _offset = time.localtime(t).tm_gmtoff
+        return int(( t + _offset ) // period * period - _offset)
+
+    # ..........................................................................
+    def _add(self, t, index, value):
+        '''
+        Add the value to the field at the index of the rollups containing
+        the time. Called with the lock held.
+        '''
+        for _period in History.PERIODS.values():
+            _rollup = self._rollups.setdefault(( _period, History.bucket(t, _period) ), [ 0, 0, 0.0, 0.0 ])
+            _rollup[index] += value
+
+    # ..........................................................................
+    def _add_duration(self, start, end, index):
+        '''
+        Add the duration from start to end to the field at the index of the
+        rollups, divided between the buckets it spans. Called with the lock
+        held.
+        '''
+        for _period in History.PERIODS.values():
+            _bucket = History.bucket(start, _period)
+            while _bucket < end:
+                _next = History.bucket(_bucket + _period * 1.5, _period) # allowing for days of 23 or 25 hours
+                _rollup = self._rollups.setdefault(( _period, _bucket ), [ 0, 0, 0.0, 0.0 ])
+                _rollup[index] += min(end, _next) - max(start, _bucket)
+                _bucket = _next
+
+    # ..........................................................................
+    def _append(self, t, source, event, value=None):
+        self._events.append(( t, source, event, value ))
+        self._recorded += 1
+
+    # ..........................................................................
+    def motion(self, t=None):
+        '''
+        Record the PIR becoming active.
+        '''
+        _t = time.time() if t is None else t
+        with self._lock:
+            self._append(_t, 'pir', 'active')
+            self._add(_t, 0, 1)
+
+    # ..........................................................................
+    def door(self, is_open, elapsed_sec=0.0, t=None):
+        '''
+        Record the door opening or, after 'elapsed_sec' open, closing.
+        '''
+        _t = time.time() if t is None else t
+        with self._lock:
+            if is_open:
+                self._append(_t, 'door', 'open')
+                self._add(_t, 1, 1)
+            else:
+                self._append(_t, 'door', 'closed', elapsed_sec)
+                self._add_duration(_t - elapsed_sec, _t, 2)
+
+    # ..........................................................................
+    def light(self, source, is_on, t=None):
+        '''
+        Record the named light (e.g., 'switch') turning on or off. The time
+        that any light is on is counted once.
+        '''
+        _t = time.time() if t is None else t
+        with self._lock:
+            if bool(is_on) == ( source in self._lights ):
+                return # no change
+            self._append(_t, source, 'on' if is_on else 'off')
+            if is_on:
+                self._lights[source] = _t
+                if self._light_on is None:
+                    self._light_on = _t
+            else:
+                del self._lights[source]
+                if not self._lights:
+                    self._add_duration(self._light_on, _t, 3)
+                    self._light_on = None
+
+    # ..........................................................................
+    def sync(self, timeout=None):
+        '''
+        Write the waiting events and rollups now, returning once written.
+        '''
+        with self._lock:
+            _batch = self._swaps + 1 # the next batch taken includes all until now
+        self._wake.set()
+        _start = time.monotonic()
+        while self._commits < _batch and self._thread.is_alive():
+            if timeout is not None and time.monotonic() - _start > timeout:
+                return False
+            time.sleep(0.005)
+        return True
+
+    # ..........................................................................
+    def __loop(self):
+        while True:
+            self._wake.wait(self._sync_sec)
+            self._wake.clear()
+            with self._lock:
+                if self._closing and self._lights: # count the lights still on
+                    _t = time.time()
+                    self._add_duration(self._light_on, _t, 3)
+                    self._lights = {}
+                    self._light_on = None
+                _events, self._events = self._events, []
+                _rollups, self._rollups = self._rollups, {}
+                _closing = self._closing
+                self._swaps += 1
+            try:
+                self._write(_events, _rollups)
+                if self._pruned is None or time.monotonic() - self._pruned >= History.PRUNE_SEC:
+                    self._prune()
+            except Exception:
+                self._errors += 1
+                self._log.error('error writing history: {}'.format(traceback.format_exc()))
+            self._commits += 1
+            if _closing:
+                break
+        self._connection.close()
+
+    # ..........................................................................
+    def _write(self, events, rollups):
+        if not events and not rollups:
+            return
+        with self._connection:
+            self._connection.executemany('INSERT INTO events ( t, source, event, value ) VALUES ( ?, ?, ?, ? )', events)
+            self._connection.executemany('''INSERT INTO rollups ( period, bucket, motion, door_opens, open_sec, light_on_sec )
+                    VALUES ( ?, ?, ?, ?, ?, ? ) ON CONFLICT ( period, bucket ) DO UPDATE SET
+                    motion = motion + excluded.motion, door_opens = door_opens + excluded.door_opens,
+                    open_sec = open_sec + excluded.open_sec, light_on_sec = light_on_sec + excluded.light_on_sec''',
+                    [ _key + tuple(_values) for _key, _values in rollups.items() ])
+
+    # ..........................................................................
+    def prune(self, timeout=None):
+        '''
+        Delete the events and rollups older than they are kept now, rather
+        than within the hour, returning once done.
+        '''
+        self._pruned = None
+        return self.sync(timeout)
+
+    # ..........................................................................
+    def _prune(self):
+        '''
+        Delete the events and rollups older than they are kept. Called on
+        the writer thread.
+        '''
+        self._pruned = time.monotonic()
+        _now = time.time()
+        _deleted = 0
+        with self._connection:
+            if self._retention['raw'] > 0:
+                _deleted += self._connection.execute('DELETE FROM events WHERE t < ?', ( _now - self._retention['raw'] * 86400, )).rowcount
+            for _name, _period in History.PERIODS.items():
+                if self._retention[_name] > 0:
+                    _deleted += self._connection.execute('DELETE FROM rollups WHERE period = ? AND bucket < ?',
+                            ( _period, _now - self._retention[_name] * 86400 )).rowcount
+        self._deleted += _deleted
+        if _deleted:
+            self._log.info('pruned {:d} rows.'.format(_deleted))
+
+    # ..........................................................................
+    def get_rollups(self, period, since=None, until=None):
+        '''
+        Returns a list of the rollups of the period ('minute', 'hour' or
+        'day') starting at or after 'since' and before 'until' (seconds since
+        the epoch), oldest first, each a dict of its 'start' and fields.
+        '''
+        _period = History.PERIODS[period]
+        with self._reader_lock:
+            _rows = self._reader.execute('''SELECT bucket, motion, door_opens, open_sec, light_on_sec FROM rollups
+                    WHERE period = ? AND bucket >= ? AND bucket < ? ORDER BY bucket''',
+                    ( _period, 0 if since is None else History.bucket(since, _period), 1 << 62 if until is None else until )).fetchall()
+        return [ { 'start': _row[0], 'motion': _row[1], 'door_opens': _row[2], 'open_sec': _row[3], 'light_on_sec': _row[4] }
+                for _row in _rows ]
+
+    # ..........................................................................
+    def get_events(self, since=None, until=None, source=None):
+        '''
+        Returns a list of the ( time, source, event, value ) tuples of the
+        events at or after 'since' and before 'until', optionally only of
+        the source, oldest first.
+        '''
+        _sql = 'SELECT t, source, event, value FROM events WHERE t >= ? AND t < ?'
+        _args = [ 0.0 if since is None else since, float(1 << 62) if until is None else until ]
+        if source:
+            _sql += ' AND source = ?'
+            _args.append(source)
+        with self._reader_lock:
+            return self._reader.execute(_sql + ' ORDER BY t', _args).fetchall()
+
+    # ..........................................................................
+    def close(self, timeout=None):
+        '''
+        Write any waiting events (counting the time of any light still on)
+        and close the database.
+        '''
+        with self._lock:
+            self._closing = True
+        self._wake.set()
+        self._thread.join(timeout)
+        with self._reader_lock:
+            self._reader.close()
+        self._log.info('closed: {}'.format(self.get_stats()))
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns the number of events recorded, the transactions committed,
+        the rows pruned and any errors writing.
+        '''
+        return {
+            'recorded': self._recorded,
+            'commits':  self._commits,
+            'deleted':  self._deleted,
+            'errors':   self._errors
+        }
+
+#EOF
@@ -7,30 +7,42 @@
 #
 # author:   Murray Altheim
 # created:  2021-07-23
-# modified: 2021-07-23
+# modified: 2026-10-17
 #
 
-import time
-import RPi.GPIO as GPIO
+import sys, time
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    GPIO = None # a gpio backend must then be provided
+
 from core.logger import Level, Logger
 
 # ..............................................................................
 class Light():
     '''
     Turns the light (a white LED) on and off when it is set enabled or disabled.
+
+    :param config:  the application configuration
+    :param level:   the log level
+    :param gpio:    the GPIO backend (default RPi.GPIO)
+    :param history: the optional History recording the light on and off
     '''
-    def __init__(self, config, level):
+    def __init__(self, config, level, gpio=None, history=None):
         self._log = Logger('light', level)
         self._log.debug('initialising...')
         if config is None:
             raise ValueError('no configuration provided.')
         _config = config['ros'].get('light')
         self._led_pin = _config.get('pin')
-        self._gpio = GPIO
+        self._gpio = gpio if gpio else GPIO
+        if self._gpio is None:
+            sys.exit("This script requires the RPi.GPIO module.\nInstall with: pip3 install --user RPi.GPIO")
         self._gpio.setwarnings(False)
-        self._gpio.setmode(GPIO.BCM)
-        self._gpio.setup(self._led_pin, GPIO.OUT, initial=GPIO.LOW)
+        self._gpio.setmode(self._gpio.BCM)
+        self._gpio.setup(self._led_pin, self._gpio.OUT, initial=self._gpio.LOW)
         self._pwm = None
+        self._history = history
         self._log.info('ready.')
 
     # ..........................................................................
@@ -40,6 +52,8 @@ class Light():
         '''
         self._log.info('enable.')
         self._gpio.output(self._led_pin, True)
+        if self._history:
+            self._history.light('light', True)
 
     # ..........................................................................
     def pwm(self, duty_cycle):
@@ -49,10 +63,12 @@ class Light():
         if self._pwm:
             self._log.warn('PWM already enabled.')
         else:
-            self._pwm = GPIO.PWM(self._led_pin, 100) # initialize PWM at 100Hz frequency
+            self._pwm = self._gpio.PWM(self._led_pin, 100) # initialize PWM at 100Hz frequency
             self._pwm.start(0) # Start PWM with 0% duty cycle
             self._pwm.ChangeDutyCycle(duty_cycle)
             self._log.info('PWM enabled at {:d} duty cycle.'.format(duty_cycle))
+            if self._history:
+                self._history.light('light', duty_cycle > 0)
 
     # ..........................................................................
     def disable(self):
@@ -63,6 +79,8 @@ class Light():
             self._pwm.stop()
         else:
             self._gpio.output(self._led_pin, False)
+        if self._history:
+            self._history.light('light', False)
         self._log.info('disabled.')
 
     # ..........................................................................
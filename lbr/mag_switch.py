@@ -7,16 +7,21 @@
 #
 # author:   Murray Altheim
 # created:  2021-07-23
-# modified: 2021-07-23
+# modified: 2026-10-17
 #
 
-import time
-import RPi.GPIO as GPIO
+import sys, time
 from enum import Enum
 from colorama import init, Fore, Style
 init()
 
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    GPIO = None # a gpio backend must then be provided
+
 from core.logger import Level, Logger
+from core.timers import Timers
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 class Door(Enum):
@@ -52,13 +57,18 @@ class MagneticSwitch(object):
     :param doorOpenCallback:  the callback to execute upon door opening
     :param doorCloseCallback: the callback to execute upon door closing
     :param level:             log level
+    :param gpio:              the GPIO backend (default RPi.GPIO)
     '''
-    def __init__(self, pin, callback, level):
+    def __init__(self, pin, callback, level, gpio=None):
         self._log = Logger("magnetic", level)
         self._pin = pin
         self._callback = callback
+        self._start_time = time.time()
+        self._gpio = gpio if gpio else GPIO
+        if self._gpio is None:
+            sys.exit("This script requires the RPi.GPIO module.\nInstall with: pip3 install --user RPi.GPIO")
         self._log.info('configuring magnetic contact switch on pin {}'.format(self._pin))
-        GPIO.setmode(GPIO.BCM)
+        self._gpio.setmode(self._gpio.BCM)
         # The GPIO pin is set up as an input, pulled up to avoid false
         # detection. The pin is wired to connect to GND as default (magnet
         # engaged), with the door opening disconnecting the magnet and the
@@ -66,28 +76,54 @@ class MagneticSwitch(object):
         #
         # It is configured to detect a rising edge for the door open, a
         # falling edge for the door closing.
-        GPIO.setup(self._pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        self._gpio.setup(self._pin, self._gpio.IN, pull_up_down=self._gpio.PUD_UP)
         # when a falling edge is detected on the pin, regardless of whatever
         # else is happening in the program, the function _callback will be run
         # 'bouncetime=300' includes the bounce control written into interrupts2a.py
-        GPIO.add_event_detect(self._pin, GPIO.BOTH, callback=self._internal_callback, bouncetime=300)
+        self._state = Door.CLOSED if self._gpio.input(self._pin) == 0 else Door.OPEN
+        self._opens = 0
+        self._gpio.add_event_detect(self._pin, self._gpio.BOTH, callback=self._internal_callback, bouncetime=300)
         self._log.info('ready.')
 
     # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
+    @Timers.timed('door.callback')
     def _internal_callback(self, value):
         _elapsed_time_sec = 0.0
-        _door_state = Door.CLOSED if GPIO.input(self._pin) == 0 else Door.OPEN
+        _door_state = Door.CLOSED if self._gpio.input(self._pin) == 0 else Door.OPEN
         if _door_state is Door.OPEN:
             self._start_time = time.time()
+            self._opens += 1
         else:
             _end_time = time.time()
             _elapsed_time_sec = _end_time - self._start_time
         self._log.info('callback on pin: {}; door state: {}; elapsed: {:5.2f} sec'.format(value, _door_state.name, _elapsed_time_sec))
+        self._state = _door_state
         self._callback(_door_state, _elapsed_time_sec)
 
+    # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
+    @property
+    def state(self):
+        '''
+        The state of the door as of its last change.
+        '''
+        return self._state
+
+    # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
+    def get_status(self):
+        '''
+        Returns whether the door is open, for how long, and the number of
+        times it has been opened.
+        '''
+        _open = self._state is Door.OPEN
+        return {
+            'open':        _open,
+            'open_sec':    round(time.time() - self._start_time, 1) if _open else 0.0,
+            'opens_total': self._opens
+        }
+
     # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
     def close(self):
-        GPIO.cleanup() # clean up GPIO on normal exit
+        self._gpio.cleanup() # clean up GPIO on normal exit
         self._log.info('closed.')
 
 #EOF
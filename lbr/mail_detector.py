@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import os, sys, time, threading
+from enum import Enum
+from datetime import datetime as dt, timezone
+from colorama import init, Fore, Style
+init()
+try:
+    import numpy as np
+except ImportError:
+    sys.exit(Fore.RED + "This script requires the numpy module.\nInstall with: pip3 install --user numpy" + Style.RESET_ALL)
+
+from core.logger import Level, Logger
+
+# ..............................................................................
+class Mail(Enum):
+    UNKNOWN = ( 0, "unknown" )
+    ABSENT  = ( 1, "absent" )
+    PRESENT = ( 2, "present" )
+
+    # ignore the first param since it's already set by __new__
+    def __init__(self, num, name):
+        self._name = name
+
+    # this makes sure the name is read-only
+    @property
+    def name(self):
+        return self._name
+
+# ..............................................................................
+class MailDetector(object):
+    '''
+    Answers the question "is there mail?" by comparing the floor of the
+    letterbox, as seen by the camera looking down into it, against a learned
+    reference image of the empty box (the baseline).
+
+    Frames are not analysed continuously: an evaluation is made after the
+    door closes (a burst of 'debounce' evaluations, 'settle_sec' apart, the
+    first once the flap has settled) and otherwise only every 'interval_sec',
+    and never while the door is open. Each takes a greyscale thumbnail of
+    the latest frame from the Thumbnailer, at 1/'scale' of its size, and
+    reduces the region of interest to a grid of block means. Both the
+    blocks and the baseline have their median subtracted, so that a change
+    of light is not taken as mail; a block differing from the baseline by
+    more than 'block_threshold' has changed, and mail is observed when at
+    least 'min_ratio' of the blocks have. The state changes only once
+    'debounce' consecutive evaluations agree, whereupon 'f_on_change' is
+    called with the new state and the ratio.
+
+    The baseline is learned from the next evaluated frame upon learn(), or
+    if there is none at all, on the first evaluation (the box must then be
+    empty). Evaluations that observe the box empty blend the frame into the
+    baseline, tracking slow changes of light. A baseline is kept for each
+    frame size, as the camera may be idled at a lower resolution; one for a
+    new size is learned while the box is known to be empty. The baselines
+    are saved to 'baseline_file' (if set), so survive a restart.
+
+    If the latest frame is older than 'max_frame_age_sec' (the camera being
+    stopped) the 'f_wake' function, if provided, is called to restart the
+    camera, and the evaluation is retried after 'settle_sec'.
+
+    Evaluations run on a thread of its own, which otherwise sleeps.
+
+    :param thumbnails:         the Thumbnailer of the video frames
+    :param scale:              the scale of the thumbnails: 1, 2, 4 or 8
+    :param blocks:             the grid of blocks as [ columns, rows ]
+    :param roi:                the region of interest (the floor of the box)
+                               as [ left, top, right, bottom ], each a
+                               fraction of the frame's size
+    :param block_threshold:    the difference of a block's mean (0-255) from
+                               the baseline beyond which it has changed
+    :param min_ratio:          the ratio of changed blocks meaning mail
+    :param debounce:           the consecutive agreeing evaluations required
+                               to change the state
+    :param settle_sec:         the delay after the door closes before the
+                               first evaluation, and between those following
+    :param interval_sec:       the period of evaluation otherwise
+    :param baseline_file:      the file (.npz) in which baselines are kept
+    :param f_on_change:        an optional function called with the Mail
+                               state and ratio upon each change of state
+    :param f_wake:             an optional function called to restart the
+                               camera when there is no recent frame
+    :param max_frame_age_sec:  the age beyond which a frame is too old
+    :param level:              the log level
+    '''
+    ADAPT_RATE = 0.2 # the weight of an empty frame blended into the baseline
+
+    def __init__(self, thumbnails, scale=8, blocks=( 16, 8 ), roi=None, block_threshold=16.0, min_ratio=0.05, debounce=2, settle_sec=2.0,
+            interval_sec=600.0, baseline_file=None, f_on_change=None, f_wake=None, max_frame_age_sec=5.0, level=Level.INFO):
+        self._log = Logger('mail', level)
+        self._roi_fractions = tuple(roi) if roi else ( 0.0, 0.0, 1.0, 1.0 )
+        _left, _top, _right, _bottom = self._roi_fractions
+        if not ( 0.0 <= _left < _right <= 1.0 and 0.0 <= _top < _bottom <= 1.0 ):
+            raise ValueError('invalid mail detection region of interest: {}'.format(roi))
+        self._thumbnails      = thumbnails
+        self._scale           = scale
+        self._columns, self._rows = blocks
+        self._block_threshold = block_threshold
+        self._min_ratio       = min_ratio
+        self._debounce        = max(1, debounce)
+        self._settle_sec      = settle_sec
+        self._interval_sec    = interval_sec
+        self._baseline_file   = baseline_file
+        self._on_change       = f_on_change
+        self._wake_camera     = f_wake
+        self._max_frame_age   = max_frame_age_sec
+        self._baselines       = self._load() # 'WxH' of the decoded frame: block means
+        self._learn           = not self._baselines
+        self._state           = Mail.UNKNOWN
+        self._since           = None # the time (epoch) of the last change of state
+        self._observed        = None # the state of the last evaluation
+        self._agreed          = 0    # the consecutive evaluations observing it
+        self._ratio           = 0.0
+        self._door_open       = False
+        self._burst           = 0    # evaluations remaining after the door closed
+        self._retried         = False
+        self._due             = time.monotonic() + settle_sec
+        self._lock            = threading.Lock()
+        self._wake            = threading.Event()
+        self._stopping        = False
+        self._thread          = None
+        # statistics
+        self._evaluations     = 0
+        self._evaluated       = None # the time (epoch) of the last evaluation
+        self._unavailable     = 0
+        self._changes         = 0
+        self._cpu_sec         = 0.0
+        if self._learn:
+            self._log.warning('no baseline: learning the empty letterbox from the first frame evaluated.')
+        self._log.info('ready: {:d}x{:d} blocks; evaluated every {:4.0f}s and after the door closes.'.format(
+                self._columns, self._rows, interval_sec))
+
+    # ..........................................................................
+    @property
+    def state(self):
+        return self._state
+
+    # ..........................................................................
+    def _load(self):
+        if not self._baseline_file or not os.path.isfile(self._baseline_file):
+            return {}
+        try:
+            with np.load(self._baseline_file) as _data:
+                _baselines = { _size: _data[_size].astype(np.float32) for _size in _data.files }
+            self._log.info('loaded baselines for {} from {}'.format(', '.join(_baselines), self._baseline_file))
+            return _baselines
+        except (OSError, ValueError) as e:
+            self._log.error('could not load baselines from {}: {}'.format(self._baseline_file, e))
+            return {}
+
+    # ..........................................................................
+    def _save(self):
+        if not self._baseline_file:
+            return
+        _temp = self._baseline_file + '.tmp.npz'
+        try:
+            np.savez(_temp, **self._baselines)
+            os.replace(_temp, self._baseline_file)
+        except OSError as e:
+            self._log.error('could not save baselines to {}: {}'.format(self._baseline_file, e))
+
+    # ..........................................................................
+    def learn(self):
+        '''
+        Learn the empty letterbox from the next frame, discarding all other
+        baselines. The box must be empty. This returns immediately.
+        '''
+        self._log.info('learning the empty letterbox...')
+        self._learn = True
+        self.evaluate_soon(0.0)
+
+    # ..........................................................................
+    def set_door_open(self, is_open):
+        '''
+        Set the state of the letterbox door: nothing is evaluated while it is
+        open, and a burst of evaluations follows its closing.
+        '''
+        self._door_open = is_open
+        if not is_open:
+            with self._lock:
+                self._burst = self._debounce
+            self.evaluate_soon(self._settle_sec)
+
+    # ..........................................................................
+    def evaluate_soon(self, delay_sec):
+        with self._lock:
+            self._due = time.monotonic() + delay_sec
+        self._wake.set()
+
+    # ..........................................................................
+    def measure(self, pixels):
+        '''
+        Returns the size of the greyscale thumbnail (as 'WxH') and the mean
+        of each block of its region of interest, less the median of the
+        blocks (unlike the overall mean, unmoved by mail covering a few).
+        '''
+        _height, _width = pixels.shape
+        _left, _top, _right, _bottom = self._roi_fractions
+        _region = pixels[int(_top * _height):int(_bottom * _height), int(_left * _width):int(_right * _width)]
+        _block_height, _block_width = _region.shape[0] // self._rows, _region.shape[1] // self._columns
+        if _block_height == 0 or _block_width == 0:
+            raise ValueError('a {}x{} frame is too small for {}x{} blocks.'.format(_width, _height, self._columns, self._rows))
+        _region = _region[:_block_height * self._rows, :_block_width * self._columns]
+        _blocks = _region.reshape(self._rows, _block_height, self._columns, _block_width).mean(axis=( 1, 3 ), dtype=np.float32)
+        _blocks -= np.median(_blocks)
+        return '{:d}x{:d}'.format(_width, _height), _blocks
+
+    # ..........................................................................
+    def compare(self, blocks, baseline):
+        '''
+        Returns the ratio of the blocks differing from the baseline.
+        '''
+        return float(np.count_nonzero(np.abs(blocks - baseline) > self._block_threshold)) / blocks.size
+
+    # ..........................................................................
+    def _evaluate(self):
+        '''
+        Evaluate the latest frame, returning False if there was no recent
+        frame to evaluate.
+        '''
+        _frames = self._thumbnails.frames
+        if _frames.sequence == 0 or time.time() - _frames.timestamp() > self._max_frame_age:
+            return False
+        _, _pixels = self._thumbnails.latest(self._scale)
+        if _pixels is None:
+            return False
+        _size, _blocks = self.measure(_pixels)
+        self._evaluations += 1
+        self._evaluated = time.time()
+        if self._learn:
+            self._learn = False
+            self._baselines = { _size: _blocks }
+            self._save()
+            self._log.info('learned the empty letterbox at {}.'.format(_size))
+            self._observed, self._agreed = Mail.ABSENT, self._debounce
+            self._set_state(Mail.ABSENT, 0.0)
+            return True
+        _baseline = self._baselines.get(_size)
+        if _baseline is None:
+            if self._state is not Mail.ABSENT or self._observed is not Mail.ABSENT:
+                self._log.info('no baseline at {} while the letterbox may not be empty: not evaluated.'.format(_size))
+                return True
+            self._baselines[_size] = _blocks
+            self._save()
+            self._log.info('learned the empty letterbox at {}.'.format(_size))
+            return True
+        self._ratio = self.compare(_blocks, _baseline)
+        _observed = Mail.PRESENT if self._ratio >= self._min_ratio else Mail.ABSENT
+        if _observed is Mail.ABSENT: # follow slow changes of light
+            _baseline += MailDetector.ADAPT_RATE * ( _blocks - _baseline )
+        if _observed is self._observed:
+            self._agreed += 1
+        else:
+            self._observed, self._agreed = _observed, 1
+        self._log.debug('observed mail {} ({:4.1f}% of blocks changed), {:d} times.'.format(_observed.name, 100.0 * self._ratio, self._agreed))
+        if self._agreed >= self._debounce and _observed is not self._state:
+            self._set_state(_observed, self._ratio)
+        return True
+
+    # ..........................................................................
+    def _set_state(self, state, ratio):
+        self._state = state
+        self._since = time.time()
+        self._changes += 1
+        self._log.info(Fore.GREEN + 'mail {} ({:4.1f}% of blocks changed).'.format(state.name, 100.0 * ratio))
+        if self._on_change:
+            self._on_change(state, ratio)
+
+    # ..........................................................................
+    def start(self):
+        if self._thread is not None:
+            self._log.warning('ignored: mail detector already started.')
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=MailDetector.__loop, args=[self], name='mail-detector')
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    # ..........................................................................
+    def __loop(self):
+        while not self._stopping:
+            with self._lock:
+                _delay = self._due - time.monotonic()
+            if _delay > 0.0:
+                self._wake.wait(_delay)
+                self._wake.clear()
+                continue
+            with self._lock:
+                self._due = time.monotonic() + self._interval_sec
+            if self._door_open:
+                continue
+            _cpu = time.thread_time()
+            try:
+                _evaluated = self._evaluate()
+            except (OSError, ValueError) as e:
+                self._log.warning('could not evaluate frame: {}'.format(e))
+                _evaluated = True
+            self._cpu_sec += time.thread_time() - _cpu
+            if not _evaluated:
+                if self._wake_camera and not self._retried:
+                    self._retried = True
+                    self._wake_camera()
+                    self.evaluate_soon(self._settle_sec)
+                    continue
+                self._unavailable += 1
+                self._log.debug('no recent frame to evaluate.')
+            self._retried = False
+            with self._lock:
+                if self._burst > 0:
+                    self._burst -= 1
+                    if self._burst > 0:
+                        self._due = time.monotonic() + self._settle_sec
+
+    # ..........................................................................
+    def get_state(self):
+        '''
+        Returns the state as a dict: whether mail is present, since when, the
+        ratio of blocks changed at the last evaluation and when that was.
+        '''
+        _iso = lambda t: dt.fromtimestamp(t, timezone.utc).isoformat() if t else None
+        return {
+            'mail':        self._state.name,
+            'since':       _iso(self._since),
+            'ratio':       round(self._ratio, 4),
+            'evaluated':   _iso(self._evaluated),
+            'door_open':   self._door_open,
+            'learning':    self._learn
+        }
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns the number of evaluations made, those without a recent
+        frame, the changes of state and the CPU time used.
+        '''
+        return {
+            'state':       self._state.name,
+            'evaluations': self._evaluations,
+            'unavailable': self._unavailable,
+            'changes':     self._changes,
+            'cpu_sec':     self._cpu_sec
+        }
+
+    # ..........................................................................
+    def close(self):
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+            self._log.info('closed: {}'.format(self.get_stats()))
+
+#EOF
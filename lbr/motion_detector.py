@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import sys, time, threading
+from colorama import init, Fore, Style
+init()
+try:
+    import numpy as np
+except ImportError:
+    sys.exit(Fore.RED + "This script requires the numpy module.\nInstall with: pip3 install --user numpy" + Style.RESET_ALL)
+
+from core.logger import Level, Logger
+
+# ..............................................................................
+class MotionDetector(object):
+    '''
+    Detects motion in the video by differencing frames against a background
+    model, used to confirm (or reject) the triggers of the PIR sensor, which
+    also responds to wind-blown plants and passing cats.
+
+    Frames are taken at 'sample_hz' (i.e., a subsample of the camera's
+    framerate) as greyscale thumbnails from the Thumbnailer, at 1/2, 1/4 or
+    1/8 'scale', a fraction of the cost of a full decode and shared with any
+    other consumer of the same frame at that scale. Within the region of
+    interest a running average of the frames is kept as the background; the
+    ratio of pixels differing from it by more than 'threshold' is the motion
+    ratio of the frame. Motion is reported to the 'f_on_motion' function
+    (with the ratio) for each frame whose ratio is at least 'min_ratio'.
+
+    The background is reset whenever the size of the frames changes (e.g.,
+    the camera being idled at a lower resolution), the first frame at the
+    new size then being taken as the background.
+
+    Frames are analysed on a thread of its own, which is idle between
+    samples; the CPU time it uses is reported in get_stats().
+
+    :param thumbnails:   the Thumbnailer of the video frames
+    :param sample_hz:    the number of frames analysed per second
+    :param scale:        the scale of the thumbnails analysed: 1, 2, 4 or 8
+                         (meaning 1/1, 1/2, 1/4 or 1/8 of the full size)
+    :param roi:          the region of interest as [ left, top, right,
+                         bottom ], each a fraction of the frame's size
+    :param alpha:        the rate at which the background learns each frame
+    :param threshold:    the difference from the background (0-255) beyond
+                         which a pixel has changed
+    :param min_ratio:    the ratio of changed pixels in the region of
+                         interest at which motion is reported
+    :param f_on_motion:  an optional function called with the motion ratio
+                         of each frame with motion, on the detector's thread
+    :param level:        the log level
+    '''
+    def __init__(self, thumbnails, sample_hz=4.0, scale=8, roi=None, alpha=0.05, threshold=24, min_ratio=0.02, f_on_motion=None, level=Level.INFO):
+        self._log = Logger('motion', level)
+        if scale not in ( 1, 2, 4, 8 ):
+            raise ValueError('unsupported motion detection scale: {} (must be 1, 2, 4 or 8).'.format(scale))
+        self._roi_fractions = tuple(roi) if roi else ( 0.0, 0.0, 1.0, 1.0 )
+        _left, _top, _right, _bottom = self._roi_fractions
+        if not ( 0.0 <= _left < _right <= 1.0 and 0.0 <= _top < _bottom <= 1.0 ):
+            raise ValueError('invalid motion detection region of interest: {}'.format(roi))
+        self._thumbnails  = thumbnails
+        self._period      = 1.0 / sample_hz
+        self._scale       = scale
+        self._alpha       = alpha
+        self._threshold   = threshold
+        self._min_ratio   = min_ratio
+        self._on_motion   = f_on_motion
+        # the model, allocated for the current frame shape
+        self._shape       = None
+        self._roi         = None
+        self._background  = None
+        self._difference  = None
+        self._learned     = None
+        self._changed     = None
+        self._thread      = None
+        self._stop        = threading.Event()
+        # statistics
+        self._ratio       = 0.0
+        self._last_motion = 0.0
+        self._samples     = 0
+        self._motion      = 0
+        self._skipped     = 0
+        self._errors      = 0
+        self._cpu_sec     = 0.0
+        self._started     = 0.0
+        self._log.info('ready: {:4.1f} samples/s at 1/{:d} scale; region of interest: {}'.format(sample_hz, scale, self._roi_fractions))
+
+    # ..........................................................................
+    @property
+    def ratio(self):
+        '''
+        The motion ratio of the most recently analysed frame.
+        '''
+        return self._ratio
+
+    # ..........................................................................
+    @property
+    def last_motion(self):
+        '''
+        The time (monotonic) at which motion was last detected, zero if never.
+        '''
+        return self._last_motion
+
+    # ..........................................................................
+    def _reset(self, shape):
+        '''
+        Allocate the model for frames of the given shape, the next frame
+        becoming the background.
+        '''
+        _height, _width = shape
+        _left, _top, _right, _bottom = self._roi_fractions
+        self._shape = shape
+        self._roi = ( slice(int(_top * _height), max(int(_top * _height) + 1, int(_bottom * _height))),
+                      slice(int(_left * _width), max(int(_left * _width) + 1, int(_right * _width))) )
+        _roi_shape = ( self._roi[0].stop - self._roi[0].start, self._roi[1].stop - self._roi[1].start )
+        self._background = None
+        self._difference = np.empty(_roi_shape, dtype=np.float32)
+        self._learned    = np.empty(_roi_shape, dtype=np.float32)
+        self._changed    = np.empty(_roi_shape, dtype=bool)
+        self._log.info('background reset for {}x{} frames.'.format(_width, _height))
+
+    # ..........................................................................
+    def analyse(self, pixels):
+        '''
+        Update the background with the greyscale pixels of a frame and
+        return its motion ratio: the ratio of the pixels in the region of
+        interest that have changed, zero for the first frame.
+        '''
+        _pixels = pixels
+        if _pixels.shape != self._shape:
+            self._reset(_pixels.shape)
+        _region = _pixels[self._roi]
+        if self._background is None:
+            self._background = _region.astype(np.float32)
+            return 0.0
+        # all in place on preallocated arrays: difference = frame - background,
+        # background += alpha * difference, changed = |difference| > threshold
+        np.subtract(_region, self._background, out=self._difference)
+        np.multiply(self._difference, self._alpha, out=self._learned)
+        np.add(self._background, self._learned, out=self._background)
+        np.abs(self._difference, out=self._difference)
+        np.greater(self._difference, self._threshold, out=self._changed)
+        return float(np.count_nonzero(self._changed)) / self._changed.size
+
+    # ..........................................................................
+    def start(self):
+        if self._thread is not None:
+            self._log.warning('ignored: motion detector already started.')
+            return
+        self._stop.clear()
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=MotionDetector.__loop, args=[self], name='motion-detector')
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    # ..........................................................................
+    def __loop(self):
+        '''
+        Analyse the latest frame every sample period, skipping the frames in
+        between.
+        '''
+        _sequence = 0
+        _next = time.monotonic()
+        while not self._stop.is_set():
+            _delay = _next - time.monotonic()
+            if _delay > 0.0 and self._stop.wait(_delay):
+                break
+            _cpu = time.thread_time()
+            try:
+                _latest, _pixels = self._thumbnails.wait(_sequence, 1.0, self._scale)
+                if _pixels is None: # no frames: the camera is stopped
+                    continue
+                _next = time.monotonic() + self._period
+                if _latest <= _sequence: # rewritten while copied
+                    self._skipped += 1
+                    continue
+                _sequence = _latest
+                _ratio = self.analyse(_pixels)
+            except (OSError, ValueError) as e:
+                self._errors += 1
+                self._log.warning('could not analyse frame {:d}: {}'.format(_sequence, e))
+                continue
+            finally:
+                self._cpu_sec += time.thread_time() - _cpu
+            self._samples += 1
+            self._ratio = _ratio
+            if _ratio >= self._min_ratio:
+                self._motion += 1
+                self._last_motion = time.monotonic()
+                self._log.debug('motion: {:5.1f}% changed.'.format(100.0 * _ratio))
+                if self._on_motion:
+                    self._on_motion(_ratio)
+        self._log.info('motion detector stopped.')
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns the number of frames analysed and with motion, those skipped
+        or failing to decode, the latest motion ratio, and the CPU time used,
+        in total and as a percentage of one core.
+        '''
+        _elapsed = time.monotonic() - self._started if self._started else 0.0
+        return {
+            'samples':     self._samples,
+            'motion':      self._motion,
+            'skipped':     self._skipped,
+            'errors':      self._errors,
+            'ratio':       self._ratio,
+            'cpu_sec':     self._cpu_sec,
+            'cpu_percent': 100.0 * self._cpu_sec / _elapsed if _elapsed > 0.0 else 0.0
+        }
+
+    # ..........................................................................
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self._log.info('closed: {}'.format(self.get_stats()))
+
+#EOF
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 by Murray Altheim. All rights reserved. This file is part of
+# the Robot Operating System project and is released under the "Apache Licence,
+# Version 2.0". Please see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2019-12-23
+# modified: 2026-10-17
+#
+# Split out of video.py so that it doesn't require the picamera library.
+#
+
+import time
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from core.timers import Timers
+from lbr.frame_buffer import FrameBuffer
+
+# ..............................................................................
+class OutputSplitter(object):
+    '''
+        An output (as far as picamera is concerned), is just a filename or an object
+        which implements a write() method (and optionally the flush() and close() methods)
+
+        Frames are written in place into a preallocated FrameBuffer ring, from
+        which streaming clients read without any per-frame copy or allocation.
+
+        Disk output is handed to a FileWriter, which writes on its own thread
+        so that a slow SD card never delays frames on the camera thread.
+
+        If the filename parameter is None no file is written.
+
+        If a segment duration or size limit is set the output is rotated into
+        a new file, named by 'f_get_filename', once either limit is reached.
+        Segments are always cut at the start of a frame.
+
+        :param filename:       the optional output filename
+        :param slots:          the number of frame slots in the ring
+        :param capacity:       the initial capacity of each frame slot in bytes
+        :param writer:         the FileWriter used for the output file (required
+                               if a filename is provided)
+        :param segment_sec:    the maximum duration of a segment (0 for no limit)
+        :param segment_bytes:  the maximum size of a segment (0 for no limit)
+        :param f_get_filename: a function returning the next segment filename
+    '''
+    def __init__(self, filename, slots=4, capacity=262144, writer=None, segment_sec=0, segment_bytes=0, f_get_filename=None):
+        self._log = Logger('output', Level.INFO)
+        self._frames = FrameBuffer(slots, capacity)
+        self._filename = filename
+        if self._filename:
+            if writer is None:
+                raise ValueError('a file writer is required for file output.')
+            if ( segment_sec or segment_bytes ) and f_get_filename is None:
+                raise ValueError('a filename function is required for segmented output.')
+            self._writer = writer
+            self._writer.open(filename)
+            self._log.info(Fore.MAGENTA + 'output file: {}'.format(filename))
+        else:
+            self._writer = None
+            self._log.info(Fore.MAGENTA + 'no output file generated from video.')
+        self._segment_sec    = segment_sec
+        self._segment_bytes  = segment_bytes
+        self._get_filename   = f_get_filename
+        self._segment_start  = time.time()
+        self._segment_length = 0
+        self._segments       = 1 if self._filename else 0
+        self._condition = self._frames.condition
+        self._log.info('ready.')
+
+    def get_filename(self):
+        '''
+        Returns the filename of the current segment.
+        '''
+        return self._filename
+
+    @property
+    def segment_count(self):
+        return self._segments
+
+    @property
+    def frames(self):
+        '''
+        The FrameBuffer holding the most recent frames.
+        '''
+        return self._frames
+
+    @property
+    def frame(self):
+        '''
+        A read-only view of the most recent complete frame, None if none yet.
+        '''
+        return self._frames.latest()[1]
+
+    @Timers.timed('splitter.write')
+    def write(self, buf):
+        if buf.startswith(b'\xff\xd8'):
+            # new frame, publish the completed slot and notify all clients it's available
+            self._frames.commit()
+            if self._writer and self._is_segment_full():
+                self._next_segment()
+        if self._writer:
+            self._writer.write(buf)
+            self._segment_length += len(buf)
+        return self._frames.append(buf)
+
+    def _is_segment_full(self):
+        return ( self._segment_bytes and self._segment_length >= self._segment_bytes ) \
+                or ( self._segment_sec and time.time() - self._segment_start >= self._segment_sec )
+
+    def _next_segment(self):
+        '''
+        Start a new segment; the writer closes the current file first.
+        '''
+        self._filename = self._get_filename()
+        self._writer.open(self._filename)
+        self._segment_start  = time.time()
+        self._segment_length = 0
+        self._segments += 1
+        self._log.info(Fore.MAGENTA + 'new segment: {}'.format(self._filename))
+
+    def flush(self):
+        self._log.debug('flushing...')
+        if self._writer:
+            self._writer.flush()
+        self._log.debug('flushed.')
+
+    def close(self):
+        self._log.info('closing...')
+        if self._writer:
+            self._writer.close_file()
+            self._writer = None
+        self._log.info('closed.')
+
+#EOF
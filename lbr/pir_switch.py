@@ -7,20 +7,25 @@
 #
 # author:   Murray Altheim
 # created:  2021-02-14
-# modified: 2021-06-12
+# modified: 2026-10-17
 #
 
-import sys, time, threading
-import RPi.GPIO as GPIO
+import sys, time, asyncio, threading
 from colorama import init, Fore, Style
 init()
 
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    GPIO = None # a gpio backend must then be provided
 try:
     from ht0740 import HT0740
 except ImportError:
-    sys.exit(Fore.RED + "This script requires the ht0740 module.\nInstall with: pip3 install --user ht0740" + Style.RESET_ALL)
+    HT0740 = None # a switch must then be provided
 
 from core.logger import Level, Logger
+from core.event import Event, EventType
+from core.timers import Timers
 
 # ..............................................................................
 class PirSwitch(object):
@@ -29,44 +34,116 @@ class PirSwitch(object):
     the on-off state of an HT0740 digital switch, which can be connected
     to anything but in this case is to a 12 volt strip of white LEDs.
 
-    In a 1 second loop, a counter is incremented if the PIR sensor has
-    been triggered, with the count limited to a maximum value. If the
-    PIR is not triggered the counter is decremented until it reaches zero.
-    If at the end of each loop iteration the value of the count is above 
-    zero the HT0740 Switch (and its LED) are turned on, otherwise off (if
-    is on).
+    Once a second, a counter is incremented if the PIR sensor has been
+    triggered, with the count limited to a maximum value. If the PIR is
+    not triggered the counter is decremented until it reaches zero. If
+    after each tick the value of the count is above zero the HT0740 Switch
+    (and its LED) are turned on, otherwise off (if is on).
+
+    In 'poll' mode a thread performs a tick every second, reading the PIR.
+    In 'interrupt' mode a rising edge on the PIR pin is handled immediately,
+    turning on the switch within milliseconds, and the 1 second ticks that
+    decay the count run on a timer only while the count is above zero; with
+    no motion nothing runs at all.
+
+    The states of the switch and its LED are cached as they are written, so
+    that I²C traffic is limited to actual changes of state. The cache is
+    re-validated by reading the hardware once it is older than the
+    'revalidate_sec' interval (0 to always read), and after any I²C error.
 
-    :param pin:          the BCM pin to which the PIR sensor is connected
-    :param i2c_address:  the I²C address of the HT0740
-    :param level:        the log level
+    If an asyncio event loop is passed to enable() all of this runs on that
+    loop rather than on threads of its own: polling is a task, edges are
+    passed to the loop with call_soon_threadsafe(), and ticks are scheduled
+    with call_later(). The loop must then also be used to call disable().
+
+    If a MessageBus is provided the PIR does not drive the switch itself:
+    it publishes a MOTION event whenever triggered, and PIR_ACTIVE or
+    PIR_IDLE events as the count rises above or falls to zero, leaving the
+    subscribers (i.e., the Controller) to turn the switch on and off.
+
+    The 'gpio' and 'switch' arguments permit a substitute for the RPi.GPIO
+    module and the HT0740 (e.g., a FakeGPIO and FakeHT0740 off the Pi).
+
+    :param pin:              the BCM pin to which the PIR sensor is connected
+    :param i2c_address:      the I²C address of the HT0740
+    :param level:            the log level
+    :param motion_callback:  optional function called (with no arguments) on
+                             each tick or edge that the PIR is triggered
+    :param mode:             'poll' or 'interrupt'
+    :param gpio:             the GPIO backend (default RPi.GPIO)
+    :param switch:           the HT0740 switch (default created at i2c_address)
+    :param tick_sec:         the period of a tick in seconds
+    :param revalidate_sec:   the maximum age of the cached switch state
+    :param message_bus:      the optional MessageBus on which to publish events
+    :param telemetry:        the optional Telemetry recording changes of the
+                             count and the switch
+    :param history:          the optional History recording the PIR becoming
+                             active and the switch
     '''
-    def __init__(self, pin, i2c_address, switch_tied_to_light=True, level=Level.INFO):
+    def __init__(self, pin, i2c_address, switch_tied_to_light=True, level=Level.INFO, motion_callback=None,
+            mode='poll', gpio=None, switch=None, tick_sec=1.0, revalidate_sec=60.0, message_bus=None,
+            telemetry=None, history=None):
         self._log = Logger("pir", level)
+        if mode not in ( 'poll', 'interrupt' ):
+            raise ValueError('unrecognised pir mode: {}'.format(mode))
         self._pin         = pin
+        self._motion_callback = motion_callback
+        self._message_bus = message_bus
+        self._telemetry   = telemetry
+        self._history     = history
+        self._mode        = mode
         self._enabled     = False
         self._count       = 0
         self._count_limit = 10
+        self._tick_sec    = tick_sec
         self._thread      = None
+        self._timer       = None
+        self._loop        = None
+        self._task        = None
+        self._lock        = threading.RLock()
+        self._edges       = 0
+        self._ticks       = 0
+        # write-through cache of the switch and LED states: name: [ state, time validated ]
+        self._revalidate_sec = revalidate_sec
+        self._cache          = { 'switch': [ None, 0.0 ], 'led': [ None, 0.0 ] }
+        self._i2c_reads      = 0
+        self._i2c_writes     = 0
+        self._reads_avoided  = 0
+        self._writes_avoided = 0
+        self._i2c_errors     = 0
         self._switch_tied_to_light = switch_tied_to_light
-        self._log.info('configuring pir on pin {}'.format(pin))
+        self._gpio = gpio if gpio else GPIO
+        if self._gpio is None:
+            sys.exit(Fore.RED + "This script requires the RPi.GPIO module.\nInstall with: pip3 install --user RPi.GPIO" + Style.RESET_ALL)
+        self._log.info('configuring pir on pin {} in {} mode'.format(pin, mode))
         # The GPIO pin is set up as an input, pulled low to avoid false
         # detection. The pin is wired to connect to GND on button press.
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self._pin, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        self._gpio.setmode(self._gpio.BCM)
+        self._gpio.setup(self._pin, self._gpio.IN, pull_up_down=self._gpio.PUD_DOWN)
         # configure the HT0740 digital switch
-        try:
-#           i2c_address = 0x39 # or modified board
-            self._log.info('enabling switch at I²C address 0x{:02X}'.format(i2c_address))
-            self._switch = HT0740(i2c_addr=i2c_address)
-        except OSError as e:
-            self._log.error('error instantiating HT0740: {}. '.format(e) + Fore.YELLOW + 'Is the device available at the specified I²C address?')
-            sys.exit(1)
+        if switch:
+            self._switch = switch
+        else:
+            if HT0740 is None:
+                sys.exit(Fore.RED + "This script requires the ht0740 module.\nInstall with: pip3 install --user ht0740" + Style.RESET_ALL)
+            try:
+#               i2c_address = 0x39 # or modified board
+                self._log.info('enabling switch at I²C address 0x{:02X}'.format(i2c_address))
+                self._switch = HT0740(i2c_addr=i2c_address)
+            except OSError as e:
+                self._log.error('error instantiating HT0740: {}. '.format(e) + Fore.YELLOW + 'Is the device available at the specified I²C address?')
+                sys.exit(1)
         self._switch.enable()
         self._log.info('ready.')
 
     # ..........................................................................
-    def enable(self):
+    def enable(self, loop=None):
+        '''
+        Enable the PIR switch, on the asyncio event loop if provided,
+        otherwise on threads of its own.
+        '''
         self._log.info("enabling pir switch...")
+        self._loop = loop
         if not self._switch_tied_to_light:
             self.light(True)
         self._set_active(True)
@@ -80,6 +157,19 @@ class PirSwitch(object):
 
     # ..........................................................................
     def _set_active(self, active):
+        if self._mode == 'interrupt':
+            self._set_interrupts_active(active)
+            return
+        if self._loop is not None:
+            if active and self._task is None:
+                self._enabled = True
+                self._task = self._loop.create_task(self._poll())
+            elif not active and self._task is not None:
+                self._enabled = False
+                self._task.cancel()
+                self._task = None
+                self._log.info('poll task cancelled.')
+            return
         if active:
             if self._thread is None:
                 self._log.debug('starting loop...')
@@ -98,37 +188,175 @@ class PirSwitch(object):
                 self._thread = None
                 self._log.info('loop thread ended.')
 
+    # ..........................................................................
+    def _set_interrupts_active(self, active):
+        with self._lock:
+            if active:
+                if self._enabled:
+                    self._log.warning('ignored: interrupts already enabled.')
+                    return
+                self._enabled = True
+                if self._loop is not None:
+                    _callback = lambda pin: self._loop.call_soon_threadsafe(self._on_edge, pin)
+                else:
+                    _callback = self._on_edge
+                self._gpio.add_event_detect(self._pin, self._gpio.RISING, callback=_callback, bouncetime=50)
+                self._log.debug('edge detection enabled.')
+                if self.pir_triggered: # already high, so no edge to come
+                    self._on_edge(self._pin)
+            elif self._enabled:
+                self._enabled = False
+                self._gpio.remove_event_detect(self._pin)
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                self._log.info('edge detection disabled.')
+
+    # ..........................................................................
+    def _on_edge(self, pin):
+        '''
+        Called upon a rising edge on the PIR pin, on the GPIO library's thread
+        or, if enabled with one, on the event loop.
+        '''
+        with self._lock:
+            if not self._enabled:
+                return
+            self._edges += 1
+            self._tick(True)
+
+    # ..........................................................................
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            if self._enabled:
+                self._tick(self.pir_triggered)
+
+    # ..........................................................................
+    def _tick(self, triggered):
+        '''
+        Update the count and the switch, scheduling the next tick only while
+        the count is above zero. Called with the lock held.
+        '''
+        self._ticks += 1
+        self._update(triggered)
+        if self._count > 0 and self._timer is None:
+            if self._loop is not None:
+                self._timer = self._loop.call_later(self._tick_sec, self._on_timer)
+            else:
+                self._timer = threading.Timer(self._tick_sec, self._on_timer)
+                self._timer.setDaemon(True)
+                self._timer.start()
+
+    # ..........................................................................
+    @Timers.timed('pir.update')
+    def _update(self, triggered):
+        '''
+        Increment or decrement the count, then react to its current value.
+        '''
+        _previous = self._count
+        _was_active = _previous > 0
+        if triggered:
+            if self._motion_callback:
+                self._motion_callback()
+            if self._message_bus:
+                self._message_bus.publish(Event(EventType.MOTION))
+            if self._count == 0:
+                self._count = 5 # power boost
+            elif self._count < self._count_limit:
+                self._count += 1
+        elif self._count > 0:
+            self._count -= 1
+        self._log.debug('pir sensor value: ' + Fore.YELLOW + ' {:2d}'.format(self._count))
+        if self._telemetry and self._count != _previous:
+            self._telemetry.record('pir', 'count', count=self._count)
+        if self._history and self._count > 0 and not _was_active:
+            self._history.motion()
+        if self._message_bus:
+            if self._count > 0 and not _was_active:
+                self._message_bus.publish(Event(EventType.PIR_ACTIVE, self._count))
+            elif self._count == 0 and _was_active:
+                self._message_bus.publish(Event(EventType.PIR_IDLE))
+            return
+        # okay, now react to current threshold...
+        _switch_is_on = self.switch_is_on
+        if self._count > 0 and not _switch_is_on:
+            self.turn_on_switch()
+        elif self._count == 0 and _switch_is_on:
+            self.turn_off_switch()
+
+    # ..........................................................................
+    async def _poll(self):
+        '''
+        The PIR-to-HT0740 task, used in 'poll' mode on an event loop.
+        '''
+        while self._enabled:
+            self._ticks += 1
+            self._update(self.pir_triggered)
+            await asyncio.sleep(self._tick_sec)
+
     # ..........................................................................
     def __loop(self, f_is_enabled):
         '''
-        The PIR-to-HT0740 process thread.
+        The PIR-to-HT0740 process thread, used in 'poll' mode.
         '''
         while f_is_enabled():
-            if self.pir_triggered:
-                if self._count == 0:
-                    self._count = 5 # power boost
-                elif self._count < self._count_limit:
-                    self._count += 1
-            elif self._count > 0:
-                self._count -= 1
-            self._log.debug('pir sensor value: ' + Fore.YELLOW + ' {:2d}'.format(self._count))
-            # okay, now react to current threshold...
-            _switch_is_on = self._switch.switch.state()
-            if self._count > 0 and not _switch_is_on:
-                self.turn_on_switch()
-            elif self._count == 0 and _switch_is_on:
-                self.turn_off_switch()
-            time.sleep(1.0)
+            self._ticks += 1
+            self._update(self.pir_triggered)
+            time.sleep(self._tick_sec)
         self._log.info('loop complete.')
 
+    # ..........................................................................
+    @property
+    def count(self):
+        return self._count
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns the mode, the current count, the number of edges and ticks
+        (i.e., wakeups) handled, and the I²C transactions made and avoided.
+        '''
+        return {
+            'mode':           self._mode,
+            'count':          self._count,
+            'edges':          self._edges,
+            'ticks':          self._ticks,
+            'i2c_reads':      self._i2c_reads,
+            'i2c_writes':     self._i2c_writes,
+            'reads_avoided':  self._reads_avoided,
+            'writes_avoided': self._writes_avoided,
+            'i2c_errors':     self._i2c_errors
+        }
+
+    # ..........................................................................
+    def get_status(self):
+        '''
+        Returns the current count and the last known state of the switch
+        (None if unknown), without any I²C transaction.
+        '''
+        return {
+            'count':     self._count,
+            'switch_on': self._cache['switch'][0]
+        }
 
     # ..........................................................................
     @property
     def switch_is_on(self):
         '''
-        Returns True if the switch is set on.
+        Returns True if the switch is set on, from the cache if it is valid.
         '''
-        return self._switch.switch.state()
+        _state = self._get_cached('switch')
+        if _state is not None:
+            self._reads_avoided += 1
+            return _state
+        try:
+            _state = bool(self._switch.switch.state())
+            self._i2c_reads += 1
+            self._cache['switch'] = [ _state, time.monotonic() ]
+            return _state
+        except OSError as e:
+            self._on_i2c_error('switch', e)
+            return False
 
     # ..........................................................................
     def turn_on_switch(self):
@@ -136,6 +364,10 @@ class PirSwitch(object):
         Turns on the HT0740 Switch as well as the white LED.
         '''
         self._log.info('switch ON.')
+        if self._telemetry:
+            self._telemetry.record('switch', 'on')
+        if self._history:
+            self._history.light('switch', True)
         self.switch(True)
         if self._switch_tied_to_light:
             self.light(True)
@@ -143,26 +375,62 @@ class PirSwitch(object):
     # ..........................................................................
     def turn_off_switch(self):
         '''
-        Turns off the HT0740 Switch, as well as the white LED.
+        Turns off the HT0740 Switch, as well as the white LED. This is only
+        logged and recorded if the switch was on.
         '''
-        self._log.info('switch OFF.')
+        if self.switch_is_on:
+            self._log.info('switch OFF.')
+            if self._telemetry:
+                self._telemetry.record('switch', 'off')
+            if self._history:
+                self._history.light('switch', False)
         self.switch(False)
         if self._switch_tied_to_light:
             self.light(False)
 
     # ..........................................................................
     def switch(self, enable):
-        if enable:
-            self._switch.switch.on()
-        else:
-            self._switch.switch.off()
+        self._set_output('switch', self._switch.switch, enable)
 
     # ..........................................................................
     def light(self, enable):
-        if enable:
-            self._switch.led.on()
-        else:
-            self._switch.led.off()
+        self._set_output('led', self._switch.led, enable)
+
+    # ..........................................................................
+    def _set_output(self, name, output, enable):
+        '''
+        Write the state of the output unless the cache shows it already set.
+        '''
+        _enable = bool(enable)
+        if self._get_cached(name) == _enable:
+            self._writes_avoided += 1
+            return
+        try:
+            if _enable:
+                output.on()
+            else:
+                output.off()
+            self._i2c_writes += 1
+            self._cache[name] = [ _enable, time.monotonic() ]
+        except OSError as e:
+            self._on_i2c_error(name, e)
+
+    # ..........................................................................
+    def _get_cached(self, name):
+        '''
+        Returns the cached state of the named output, None if unknown or due
+        for re-validation.
+        '''
+        _state, _validated = self._cache[name]
+        if _state is None or time.monotonic() - _validated >= self._revalidate_sec:
+            return None
+        return _state
+
+    # ..........................................................................
+    def _on_i2c_error(self, name, error):
+        self._i2c_errors += 1
+        self._cache[name] = [ None, 0.0 ] # re-read or re-write on next use
+        self._log.error('I²C error on HT0740 {}: {}'.format(name, error))
 
     # ......................................................
     @property
@@ -170,12 +438,12 @@ class PirSwitch(object):
         '''
         Returns True when the PIR sensor is turned on (logic high).
         '''
-        return GPIO.input(self._pin)
+        return self._gpio.input(self._pin)
 
     # ......................................................
     def close(self):
         self.turn_off_switch()
-        GPIO.cleanup() # clean up GPIO on normal exit
+        self._gpio.cleanup() # clean up GPIO on normal exit
         self._log.info('closed.')
 
 #EOF
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import time, threading
+from collections import deque
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+
+# ..............................................................................
+class PreRollBuffer(object):
+    '''
+    A bounded, preallocated in-memory buffer of the most recent frames, used
+    to hold the seconds of video leading up to an event.
+
+    Frames are copied end to end into a single circular bytearray; once it
+    is full the oldest frames are overwritten. Frames older than 'seconds'
+    are expired as new frames arrive.
+
+    :param seconds:   the maximum age of a buffered frame
+    :param capacity:  the size of the buffer in bytes
+    '''
+    def __init__(self, seconds, capacity):
+        self._seconds  = seconds
+        self._capacity = capacity
+        self._buffer   = bytearray(capacity)
+        self._view     = memoryview(self._buffer)
+        self._entries  = deque() # (start, length, timestamp), oldest first
+        self._head     = 0       # the next write position
+
+    # ..........................................................................
+    def __len__(self):
+        return len(self._entries)
+
+    # ..........................................................................
+    def add(self, frame, timestamp):
+        '''
+        Copy the frame into the buffer, evicting whatever frames it displaces.
+        Returns False if the frame is larger than the entire buffer.
+        '''
+        _length = len(frame)
+        if _length > self._capacity:
+            return False
+        self.expire(timestamp)
+        _position = self._head
+        if _position + _length > self._capacity:
+            # wrap: the frames from the head to the end of the buffer are the oldest
+            while self._entries and self._entries[0][0] >= _position:
+                self._entries.popleft()
+            _position = 0
+        while self._entries and _position <= self._entries[0][0] < _position + _length:
+            self._entries.popleft()
+        self._view[_position:_position + _length] = frame
+        self._entries.append(( _position, _length, timestamp ))
+        self._head = _position + _length
+        return True
+
+    # ..........................................................................
+    def expire(self, now):
+        while self._entries and now - self._entries[0][2] > self._seconds:
+            self._entries.popleft()
+
+    # ..........................................................................
+    def frames(self):
+        '''
+        Returns a list of views of the buffered frames, oldest first.
+        '''
+        return [ self._view[_start:_start + _length] for _start, _length, _ in self._entries ]
+
+    # ..........................................................................
+    def clear(self):
+        self._entries.clear()
+        self._head = 0
+
+# ..............................................................................
+class EventRecorder(object):
+    '''
+    Records video clips only around events rather than continuously.
+
+    Registered as a listener on the FrameBuffer, each committed frame is
+    kept in a bounded pre-roll buffer. When trigger() is called (by motion
+    on the PIR sensor or the door opening) a new clip file is opened, the
+    pre-roll is flushed into it and every subsequent frame is appended until
+    no trigger has been received for the quiet period, at which point the
+    clip is closed and the recorder returns to buffering.
+
+    trigger() may be called from any thread and returns immediately. Clip
+    data is handed to the FileWriter as frames arrive on the camera thread,
+    and is written to disk on the writer's own thread.
+
+    :param frames:           the FrameBuffer providing video frames
+    :param writer:           the FileWriter used to write clips
+    :param f_get_filename:   a function returning a new clip filename
+    :param preroll_sec:      the seconds of video retained before an event
+    :param preroll_bytes:    the size of the pre-roll buffer in bytes
+    :param quiet_period_sec: seconds without a trigger before a clip is closed
+    :param level:            the log level
+    '''
+    def __init__(self, frames, writer, f_get_filename, preroll_sec=3.0, preroll_bytes=8388608, quiet_period_sec=10.0, level=Level.INFO):
+        self._log = Logger('recorder', level)
+        self._frames         = frames
+        self._writer         = writer
+        self._get_filename   = f_get_filename
+        self._preroll        = PreRollBuffer(preroll_sec, preroll_bytes)
+        self._quiet_period   = quiet_period_sec
+        self._last_trigger   = 0.0
+        self._trigger_source = None
+        self._filename       = None
+        self._clips          = 0
+        self._lock           = threading.Lock()
+        self._frames.add_listener(self._on_frame)
+        self._log.info('ready: {:3.1f}s pre-roll; {:3.1f}s quiet period.'.format(preroll_sec, quiet_period_sec))
+
+    # ..........................................................................
+    @property
+    def recording(self):
+        return self._filename is not None
+
+    # ..........................................................................
+    @property
+    def clip_count(self):
+        return self._clips
+
+    # ..........................................................................
+    def trigger(self, source):
+        '''
+        Start a clip, or extend the current one, due to the named source
+        (e.g., 'pir' or 'door').
+        '''
+        with self._lock:
+            self._last_trigger = time.time()
+            self._trigger_source = source
+
+    # ..........................................................................
+    def _on_frame(self, sequence):
+        '''
+        Called on the camera thread for each committed frame.
+        '''
+        _, _frame = self._frames.latest()
+        _now = time.time()
+        with self._lock:
+            _triggered = _now - self._last_trigger <= self._quiet_period
+            _source = self._trigger_source
+        if self._filename is None:
+            if _triggered:
+                self._open_clip(_source)
+                self._writer.write(_frame)
+            else:
+                self._preroll.add(_frame, _now)
+        elif _triggered:
+            self._writer.write(_frame)
+        else:
+            self._close_clip()
+            self._preroll.add(_frame, _now)
+
+    # ..........................................................................
+    def _open_clip(self, source):
+        self._filename = self._get_filename()
+        self._writer.open(self._filename)
+        _preroll = self._preroll.frames()
+        for _frame in _preroll:
+            self._writer.write(_frame)
+        self._preroll.clear()
+        self._clips += 1
+        self._log.info(Fore.MAGENTA + 'recording clip {} on {} trigger, with {:d} pre-roll frames.'.format(
+                self._filename, source, len(_preroll)))
+
+    # ..........................................................................
+    def _close_clip(self):
+        self._writer.close_file()
+        self._log.info(Fore.MAGENTA + 'closed clip {}.'.format(self._filename))
+        self._filename = None
+
+    # ..........................................................................
+    def close(self):
+        self._frames.remove_listener(self._on_frame)
+        if self._filename is not None:
+            self._close_clip()
+        self._log.info('closed.')
+
+#EOF
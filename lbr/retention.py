@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import os, glob, time, shutil, threading
+from collections import OrderedDict
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+
+# ..............................................................................
+class RetentionManager(object):
+    '''
+    Limits the growth of the video directory by deleting the oldest clips
+    and segments first, according to three policies, any of which may be
+    disabled by setting it to zero:
+
+        max_bytes:       the total size of the indexed files
+        max_age_sec:     the age of a file, from its modification time
+        min_free_bytes:  the free space remaining on the file system
+
+    The directory is scanned once, upon construction. Thereafter files are
+    registered with add() as they are closed (a file still being written is
+    never indexed, so is never deleted) and removed with discard(). The index
+    is kept in age order with a running total, so each policy decision and
+    each deletion is constant time per file; the file system is queried for
+    free space once per enforce(), not once per file.
+
+    Methods may be called from any thread.
+
+    :param dirname:        the directory containing the video files
+    :param patterns:       a list of glob patterns of the files to manage
+    :param max_bytes:      the maximum total size of files (0 for no limit)
+    :param max_age_sec:    the maximum age of a file (0 for no limit)
+    :param min_free_bytes: the free space to maintain (0 for no limit)
+    :param level:          the log level
+    '''
+    def __init__(self, dirname, patterns, max_bytes=0, max_age_sec=0, min_free_bytes=0, level=Level.INFO):
+        self._log = Logger('retention', level)
+        self._dirname        = dirname
+        self._max_bytes      = max_bytes
+        self._max_age_sec    = max_age_sec
+        self._min_free_bytes = min_free_bytes
+        self._index          = OrderedDict() # path: ( mtime, size ), oldest first
+        self._total          = 0
+        self._deleted        = 0
+        self._reclaimed      = 0
+        self._lock           = threading.Lock()
+        self._scan(patterns)
+        self._log.info('ready: {:d} files, {:d} bytes in {}; max bytes: {:d}; max age: {:d}s; min free: {:d} bytes.'.format(
+                len(self._index), self._total, dirname, max_bytes, int(max_age_sec), min_free_bytes))
+
+    # ..........................................................................
+    def _scan(self, patterns):
+        '''
+        The one full scan of the directory, ordering the index by age.
+        '''
+        _entries = []
+        for _pattern in patterns:
+            for _path in glob.glob(os.path.join(self._dirname, _pattern)):
+                try:
+                    _stat = os.stat(_path)
+                except FileNotFoundError:
+                    continue
+                _entries.append(( _stat.st_mtime, _path, _stat.st_size ))
+        for _mtime, _path, _size in sorted(_entries):
+            self._index[_path] = ( _mtime, _size )
+            self._total += _size
+
+    # ..........................................................................
+    def __len__(self):
+        return len(self._index)
+
+    # ..........................................................................
+    @property
+    def total_bytes(self):
+        return self._total
+
+    # ..........................................................................
+    def add(self, path):
+        '''
+        Index a newly closed file as the newest, then enforce the policies.
+        If the path is already indexed its size is updated.
+        '''
+        try:
+            _stat = os.stat(path)
+        except FileNotFoundError:
+            self._log.warning('cannot index {}: file not found.'.format(path))
+            return
+        with self._lock:
+            self._remove(path)
+            self._index[path] = ( _stat.st_mtime, _stat.st_size )
+            self._total += _stat.st_size
+        self.enforce()
+
+    # ..........................................................................
+    def discard(self, path):
+        '''
+        Remove the file from the index, e.g., once it has been deleted or
+        replaced by another process. Does not delete the file.
+        '''
+        with self._lock:
+            self._remove(path)
+
+    # ..........................................................................
+    def _remove(self, path):
+        _entry = self._index.pop(path, None)
+        if _entry is not None:
+            self._total -= _entry[1]
+
+    # ..........................................................................
+    def enforce(self):
+        '''
+        Delete the oldest files until every policy is satisfied, returning
+        the number of files deleted.
+        '''
+        _now = time.time()
+        _free = shutil.disk_usage(self._dirname).free if self._min_free_bytes else 0
+        _count = 0
+        with self._lock:
+            while self._index:
+                _path, ( _mtime, _size ) = next(iter(self._index.items()))
+                if self._max_bytes and self._total > self._max_bytes:
+                    _reason = 'size'
+                elif self._max_age_sec and _now - _mtime > self._max_age_sec:
+                    _reason = 'age'
+                elif self._min_free_bytes and _free < self._min_free_bytes:
+                    _reason = 'free space'
+                else:
+                    break
+                self._index.popitem(last=False)
+                self._total -= _size
+                try:
+                    os.remove(_path)
+                    _free += _size
+                    self._deleted += 1
+                    self._reclaimed += _size
+                    _count += 1
+                    self._log.info(Fore.YELLOW + 'deleted {} ({:d} bytes) on {}.'.format(_path, _size, _reason))
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    self._log.error('could not delete {}: {}'.format(_path, e))
+        if self._min_free_bytes and _free < self._min_free_bytes:
+            self._log.warning('free space {:d} bytes is below the minimum with no files left to delete.'.format(_free))
+        return _count
+
+    # ..........................................................................
+    def get_stats(self):
+        return {
+            'files':           len(self._index),
+            'bytes':           self._total,
+            'deleted':         self._deleted,
+            'bytes_reclaimed': self._reclaimed
+        }
+
+#EOF
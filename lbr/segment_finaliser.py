@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import os, glob, queue, shutil, threading, subprocess, traceback
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+
+# ..............................................................................
+class SegmentFinaliser(object):
+    '''
+    Post-processes closed video segments on a small pool of background
+    worker threads, so that neither the camera thread nor shutdown ever
+    waits on a conversion.
+
+    Each segment is remuxed (not re-encoded) from the raw MJPEG stream into
+    an MP4 container using ffmpeg at the configured framerate. If that
+    succeeds and 'remove_source' is True the source segment is deleted. If
+    ffmpeg is not installed segments are left as they are.
+
+    The workers are daemon threads: segments still queued at exit are not
+    converted, but as each conversion writes to a temporary file first they
+    are never left half-written, and recover() will queue them again.
+
+    If provided, the 'f_on_complete' function is called on the worker thread
+    with the source and mp4 filenames after each successful conversion.
+
+    :param framerate:     the video framerate
+    :param remove_source: if True, delete each source once converted
+    :param workers:       the number of worker threads
+    :param f_on_complete: an optional function called after each conversion
+    :param level:         the log level
+    '''
+    def __init__(self, framerate, remove_source=False, workers=1, f_on_complete=None, level=Level.INFO):
+        self._log = Logger('finaliser', level)
+        self._framerate     = framerate
+        self._remove_source = remove_source
+        self._on_complete   = f_on_complete
+        self._ffmpeg        = shutil.which('ffmpeg')
+        self._queue         = queue.Queue()
+        self._converted     = 0
+        self._failed        = 0
+        self._threads       = []
+        if self._ffmpeg is None:
+            self._log.warning('ffmpeg not found: video segments will not be converted to mp4.')
+            return
+        for i in range(workers):
+            _thread = threading.Thread(target=SegmentFinaliser.__loop, args=[self], name='finaliser-{:d}'.format(i))
+            _thread.setDaemon(True)
+            _thread.start()
+            self._threads.append(_thread)
+        self._log.info('ready: {:d} workers; remove source: {}'.format(workers, remove_source))
+
+    # ..........................................................................
+    @staticmethod
+    def get_mp4_filename(filename):
+        return os.path.splitext(filename)[0] + '.mp4'
+
+    # ..........................................................................
+    @property
+    def pending(self):
+        '''
+        The number of segments waiting to be converted.
+        '''
+        return self._queue.qsize()
+
+    # ..........................................................................
+    def finalise(self, filename):
+        '''
+        Queue the closed segment for conversion. This returns immediately and
+        may be called from any thread (e.g., as a FileWriter's close callback).
+        '''
+        if self._ffmpeg is not None:
+            self._queue.put(filename)
+
+    # ..........................................................................
+    def recover(self, dirname, pattern):
+        '''
+        Queue any segments in the directory matching the glob pattern that
+        have no corresponding mp4, e.g., those left unconverted at the last
+        shutdown. Returns the number queued.
+        '''
+        _count = 0
+        for _filename in sorted(glob.glob(os.path.join(dirname, pattern))):
+            if not os.path.exists(SegmentFinaliser.get_mp4_filename(_filename)):
+                self.finalise(_filename)
+                _count += 1
+        if _count:
+            self._log.info('queued {:d} unconverted segments from {}.'.format(_count, dirname))
+        return _count
+
+    # ..........................................................................
+    def __loop(self):
+        while True:
+            _filename = self._queue.get()
+            if _filename is None:
+                break
+            try:
+                self._convert(_filename)
+            except Exception:
+                self._failed += 1
+                self._log.error('error converting {}: {}'.format(_filename, traceback.format_exc()))
+
+    # ..........................................................................
+    def _convert(self, filename):
+        if not os.path.exists(filename):
+            self._log.warning('could not convert to mp4: file {} did not exist.'.format(filename))
+            return
+        if os.path.getsize(filename) == 0:
+            os.remove(filename)
+            return
+        _mp4_filename = SegmentFinaliser.get_mp4_filename(filename)
+        _tmp_filename = _mp4_filename + '.tmp'
+        self._log.info('converting file {} to mp4...'.format(filename))
+        _result = subprocess.run([ self._ffmpeg, '-loglevel', 'error', '-hide_banner', '-nostdin', '-y',
+                '-f', 'mjpeg', '-framerate', str(self._framerate), '-i', filename,
+                '-c:v', 'copy', '-f', 'mp4', _tmp_filename ],
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if _result.returncode != 0:
+            self._failed += 1
+            if os.path.exists(_tmp_filename):
+                os.remove(_tmp_filename)
+            self._log.error('could not convert {} to mp4: {}'.format(filename, _result.stderr.decode('utf-8', 'replace').strip()))
+            return
+        os.replace(_tmp_filename, _mp4_filename)
+        self._converted += 1
+        self._log.info(Fore.MAGENTA + 'mp4 conversion complete: {}'.format(_mp4_filename))
+        if self._remove_source:
+            os.remove(filename)
+            self._log.info('removed video source {}.'.format(filename))
+        if self._on_complete:
+            self._on_complete(filename, _mp4_filename)
+
+    # ..........................................................................
+    def get_stats(self):
+        return {
+            'pending':   self.pending,
+            'converted': self._converted,
+            'failed':    self._failed
+        }
+
+    # ..........................................................................
+    def close(self):
+        '''
+        Stop the workers once they have converted the segments already queued,
+        without waiting for them to do so.
+        '''
+        _pending = self.pending
+        for _ in self._threads:
+            self._queue.put(None)
+        if _pending:
+            self._log.info('closed with {:d} segments pending conversion.'.format(_pending))
+        else:
+            self._log.info('closed.')
+
+#EOF
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import os, json, time, resource, threading
+
+from core.logger import Level, Logger
+
+JSON_TYPE    = 'application/json'
+METRICS_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# ..............................................................................
+class Status(object):
+    '''
+    Answers the '/status' (JSON) and '/metrics' (Prometheus text format)
+    resources of the streaming server with the state of the letterbox robot.
+
+    Each section of the state is a dict returned by a function registered
+    with add(), typically a component's get_status(), which only reads the
+    counters and latest state the component already keeps as it runs, so
+    that a request formats a few values but measures nothing itself. A
+    'process' section of the uptime, the thread count, the resident memory
+    and the CPU seconds used is always included.
+
+    In '/metrics' each number (or bool) of a section is a sample named
+    'lbr_<section>_<key>', a counter if the key ends in '_total', otherwise
+    a gauge; a value of None (unknown) is omitted. A list of dicts is a
+    sample per item of each of its numbers, labelled by the item's strings
+    (e.g., the stream and address of each stream client).
+
+    :param level:  the log level
+    '''
+    def __init__(self, level=Level.INFO):
+        self._log = Logger('status', level)
+        self._sections = { 'process': self._get_process_status }
+        self._started  = time.time()
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+        # statistics
+        self._requests = 0
+        self._log.info('ready.')
+
+    # ..........................................................................
+    def add(self, name, f_get_status):
+        '''
+        Add the named section, whose function returns a dict of its values.
+        '''
+        self._sections = dict(self._sections, **{ name: f_get_status })
+
+    # ..........................................................................
+    def _get_process_status(self):
+        _usage = resource.getrusage(resource.RUSAGE_SELF)
+        try:
+            with open('/proc/self/statm', 'rb') as _file:
+                _rss = int(_file.read().split()[1]) * self._page_size
+        except (OSError, IndexError, ValueError):
+            _rss = _usage.ru_maxrss * 1024 # the peak, where /proc is not available
+        return {
+            'uptime_sec':        round(time.time() - self._started, 1),
+            'threads':           threading.active_count(),
+            'resident_bytes':    _rss,
+            'cpu_seconds_total': round(_usage.ru_utime + _usage.ru_stime, 3),
+            'requests_total':    self._requests
+        }
+
+    # ..........................................................................
+    def get_status(self):
+        '''
+        Returns a dict of each section's dict of values, by name.
+        '''
+        self._requests += 1
+        _status = { 'time': round(time.time(), 3) }
+        for _name, _function in self._sections.items():
+            try:
+                _status[_name] = _function()
+            except Exception as e:
+                self._log.error('error reading {} status: {}'.format(_name, e))
+                _status[_name] = None
+        return _status
+
+    # ..........................................................................
+    def get_json(self):
+        '''
+        Returns the content type and body of the '/status' resource.
+        '''
+        return JSON_TYPE, json.dumps(self.get_status(), separators=( ',', ':' )).encode('utf-8')
+
+    # ..........................................................................
+    def get_metrics(self):
+        '''
+        Returns the content type and body of the '/metrics' resource.
+        '''
+        _metrics = {} # name: list of samples
+        for _name, _values in self.get_status().items():
+            if isinstance(_values, dict):
+                Status._add_samples(_metrics, 'lbr_' + _name, _values, '')
+                for _key, _list in _values.items():
+                    if isinstance(_list, list):
+                        for _item in _list:
+                            if isinstance(_item, dict):
+                                Status._add_samples(_metrics, 'lbr_' + _name, _item, Status._labels(_item))
+        _lines = []
+        for _name, _samples in _metrics.items():
+            _lines.append('# TYPE {} {}'.format(_name, 'counter' if _name.endswith('_total') else 'gauge'))
+            _lines.extend(_samples)
+        _lines.append('')
+        return METRICS_TYPE, '\n'.join(_lines).encode('utf-8')
+
+    # ..........................................................................
+    @staticmethod
+    def _add_samples(metrics, prefix, values, labels):
+        for _key, _value in values.items():
+            if isinstance(_value, bool):
+                _value = int(_value)
+            elif not isinstance(_value, ( int, float )):
+                continue # None, strings, lists and dicts
+            metrics.setdefault('{}_{}'.format(prefix, _key), []).append('{}_{}{} {}'.format(prefix, _key, labels, _value))
+
+    # ..........................................................................
+    @staticmethod
+    def _labels(item):
+        _labels = [ '{}="{}"'.format(_key, _value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                for _key, _value in item.items() if isinstance(_value, str) ]
+        return '{' + ','.join(_labels) + '}' if _labels else ''
+
+#EOF
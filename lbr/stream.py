@@ -0,0 +1,830 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 by Murray Altheim. All rights reserved. This file is part of
+# the Robot Operating System project and is released under the "Apache Licence,
+# Version 2.0". Please see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2019-12-23
+# modified: 2026-10-17
+#
+# The MJPEG streaming servers used by Video, split out of video.py so that
+# they don't require the picamera library. Two modes are available:
+#
+#   threaded:  a thread-per-client http.server (the original implementation)
+#   asyncio:   a single event loop fanning each frame out to all clients
+#
+# source: https://picamera.readthedocs.io/en/release-1.13/recipes2.html#web-streaming
+#
+
+import os, sys, time, socket, asyncio, threading, socketserver, logging
+from email.utils import formatdate, parsedate_to_datetime
+from http import server
+from urllib.parse import urlsplit, parse_qs
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from core.timers import Timers
+
+_SEND_TIMER = Timers.get('stream.send')
+_NEEDS_COPY = sys.version_info >= ( 3, 12 ) # asyncio transports keep a view of the data they buffer
+
+# ..............................................................................
+def get_page(width, height):
+    '''
+    Returns the HTML index page embedding the video stream.
+    '''
+    return """<!DOCTYPE html>
+<html>
+<head>
+<title>LetterBox Robot</title>
+<style>
+  body {{ margin: 1em }}
+</style>
+</head>
+<body bgcolor='black'>
+<img src="stream.mjpg" width="{width_value}" height="{height_value}" />
+</body>
+</html>
+""".format(width_value=width, height_value=height)
+
+# ..............................................................................
+class StreamClient(object):
+    '''
+    The state and counters of a single stream client.
+
+    A client always jumps to the newest frame, so its lag is the number of
+    frames committed since the last frame it was sent: a client keeping up
+    has a lag of one, and every frame it skips is counted as dropped.
+    '''
+    def __init__(self, address):
+        self.address   = address
+        self.connected = time.time()
+        self.sequence  = 0    # the newest sequence number sent
+        self.sent      = 0
+        self.bytes     = 0
+        self.dropped   = 0
+        self.lag       = 0
+        self.max_lag   = 0
+        self.overruns  = 0    # frames rewritten in the ring before or while being sent
+
+    # ..........................................................................
+    def update_lag(self, latest):
+        '''
+        Update the lag given the latest committed sequence number, returning
+        the lag in frames.
+        '''
+        self.lag = latest - self.sequence if self.sequence > 0 else 0
+        if self.lag > self.max_lag:
+            self.max_lag = self.lag
+        return self.lag
+
+    # ..........................................................................
+    def record_sent(self, sequence, size=0):
+        if self.sequence > 0 and sequence > self.sequence + 1:
+            self.dropped += sequence - self.sequence - 1
+        self.sequence = sequence
+        self.sent += 1
+        self.bytes += size
+
+    # ..........................................................................
+    def get_stats(self):
+        return {
+            'address':   '{}:{}'.format(self.address[0], self.address[1]) if self.address else None,
+            'connected': round(time.time() - self.connected, 1),
+            'sequence':  self.sequence,
+            'sent':      self.sent,
+            'bytes':     self.bytes,
+            'dropped':   self.dropped,
+            'lag':       self.lag,
+            'max_lag':   self.max_lag,
+            'overruns':  self.overruns
+        }
+
+# ..............................................................................
+class StreamClients(object):
+    '''
+    The registry of connected stream clients, and the backpressure policy
+    applied to each of them by either server.
+
+    :param queue_depth:  the number of frames that may be queued for a client
+                         (in its socket or transport buffer) before newer
+                         frames are dropped for that client
+    :param max_lag:      a client whose lag exceeds this many frames is
+                         disconnected; zero to never disconnect
+    :param framerate:    the video framerate, used to convert the lag limit
+                         into a send timeout for the threaded server
+    :param level:        the log level
+    :param f_on_add:     an optional function called (with no arguments)
+                         as each client is added, on the server's thread
+    '''
+    def __init__(self, queue_depth=2, max_lag=40, framerate=20, level=Level.INFO, f_on_add=None):
+        self._log = Logger('clients', level)
+        if queue_depth < 1:
+            raise ValueError('client queue depth must be at least one frame.')
+        self.queue_depth = queue_depth
+        self.max_lag     = max_lag
+        self.send_timeout = max_lag / framerate if max_lag > 0 else None
+        self._clients    = {}
+        self._lock       = threading.Lock()
+        self._on_add     = f_on_add
+
+    # ..........................................................................
+    def __len__(self):
+        return len(self._clients)
+
+    # ..........................................................................
+    def add(self, key, address):
+        _client = StreamClient(address)
+        with self._lock:
+            self._clients[key] = _client
+        self._log.info('added streaming client {}; {:d} connected.'.format(address, len(self._clients)))
+        if self._on_add:
+            self._on_add()
+        return _client
+
+    # ..........................................................................
+    def remove(self, key):
+        with self._lock:
+            _client = self._clients.pop(key, None)
+        if _client:
+            self._log.info('removed streaming client {}; {:d} connected; sent: {:d}; dropped: {:d}; max lag: {:d}.'.format(
+                    _client.address, len(self._clients), _client.sent, _client.dropped, _client.max_lag))
+        return _client
+
+    # ..........................................................................
+    def items(self):
+        with self._lock:
+            return list(self._clients.items())
+
+    # ..........................................................................
+    def is_lagging(self, client):
+        '''
+        Returns True if the client has fallen beyond the disconnect threshold.
+        '''
+        return self.max_lag > 0 and client.lag > self.max_lag
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns a list of per-client stats dicts.
+        '''
+        return [ _client.get_stats() for _, _client in self.items() ]
+
+# ..............................................................................
+def get_stream_size(path):
+    '''
+    Returns the requested size of a '/stream.mjpg?size=' path ('full' if
+    not given), or None if the path is not that of the stream.
+    '''
+    _url = urlsplit(path)
+    if _url.path != '/stream.mjpg':
+        return None
+    return parse_qs(_url.query).get('size', [ 'full' ])[0]
+
+# ..............................................................................
+class StreamVariant(object):
+    '''
+    One size of the video stream, with its own frames and clients.
+
+    The 'full' stream is the camera's main output and always runs. A reduced
+    size is encoded on a splitter port of its own, started by 'f_start'
+    when its first client connects (acquire()) and stopped by 'f_stop' when
+    its last client disconnects (release()). For such a variant the camera
+    records to the variant itself, which passes the writes to its output
+    (e.g., an OutputSplitter of the frames), accounting the CPU time taken
+    on the camera thread.
+
+    The bytes and CPU time of sending are accounted by the servers, so that
+    the cost of each variant may be compared.
+
+    :param name:        the name of the size, as given by '?size='
+    :param resolution:  the resolution, None for the full size
+    :param frames:      the FrameBuffer of the variant
+    :param clients:     the StreamClients registry of the variant
+    :param f_start:     a function starting the variant's encoder, None if
+                        always running
+    :param f_stop:      a function stopping the variant's encoder
+    :param output:      the output to which the variant's writes are passed
+    '''
+    def __init__(self, name, resolution, frames, clients, f_start=None, f_stop=None, output=None):
+        self.name       = name
+        self.resolution = resolution
+        self.frames     = frames
+        self.clients    = clients
+        self._output    = output
+        self._start     = f_start
+        self._stop      = f_stop
+        self._count     = 0
+        self._active    = f_start is None
+        self._lock      = threading.Lock()
+        self._starts    = 0
+        self._write_cpu = 0.0
+        self._send_cpu  = 0.0
+        self._bytes_sent = 0
+        self._started   = time.monotonic()
+
+    # ..........................................................................
+    @property
+    def active(self):
+        '''
+        True while the variant's encoder is running.
+        '''
+        return self._active
+
+    # ..........................................................................
+    def write(self, buf):
+        _start = time.thread_time()
+        _length = self._output.write(buf)
+        self._write_cpu += time.thread_time() - _start
+        return _length
+
+    # ..........................................................................
+    def acquire(self):
+        '''
+        Called as a client connects, starting the encoder for the first.
+        '''
+        with self._lock:
+            self._count += 1
+            if self._count == 1 and not self._active:
+                try:
+                    self._start(self)
+                except Exception:
+                    self._count -= 1
+                    raise
+                self._active = True
+                self._starts += 1
+
+    # ..........................................................................
+    def release(self):
+        '''
+        Called as a client disconnects, stopping the encoder after the last.
+        '''
+        with self._lock:
+            self._count -= 1
+            if self._count == 0 and self._active and self._stop is not None:
+                self._stop(self)
+                self._active = False
+
+    # ..........................................................................
+    def suspend(self):
+        '''
+        Stop the encoder if running, e.g., while the camera is reconfigured.
+        '''
+        with self._lock:
+            if self._active and self._stop is not None:
+                self._stop(self)
+
+    # ..........................................................................
+    def resume(self):
+        '''
+        Restart the encoder if it was running before suspend().
+        '''
+        with self._lock:
+            if self._active and self._start is not None:
+                self._start(self)
+
+    # ..........................................................................
+    def record_sent(self, size, cpu_sec):
+        self._bytes_sent += size
+        self._send_cpu   += cpu_sec
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns the variant's state, its frames and bytes encoded, the bytes
+        sent and the send bandwidth, and the CPU seconds spent on the
+        camera thread (reduced sizes only) and in sending.
+        '''
+        _stats = self.frames.get_stats()
+        return {
+            'resolution':  self.resolution,
+            'active':      self._active,
+            'clients':     len(self.clients),
+            'starts':      self._starts,
+            'frames':      _stats['frames'],
+            'bytes':       _stats['bytes'],
+            'bytes_sent':  self._bytes_sent,
+            'send_kbps':   8.0 * self._bytes_sent / 1000.0 / max(0.001, time.monotonic() - self._started),
+            'write_cpu_sec': self._write_cpu if self._start is not None else None,
+            'send_cpu_sec':  self._send_cpu
+        }
+
+# ..............................................................................
+def get_variants(frames, clients, variants):
+    '''
+    Returns a dict of the StreamVariants served, by name: the 'full' stream
+    of the frames and clients, plus any reduced-size variants.
+    '''
+    _variants = { 'full': StreamVariant('full', None, frames, clients) }
+    if variants:
+        _variants.update(variants)
+    return _variants
+
+# ..............................................................................
+def get_header(request, name):
+    '''
+    Returns the value of the named header (given as lowercase bytes) of the
+    raw HTTP request, None if not present.
+    '''
+    for _line in request.split(b'\r\n')[1:]:
+        _name, _, _value = _line.partition(b':')
+        if _name.strip().lower() == name:
+            return _value.strip().decode('latin-1')
+    return None
+
+# ..............................................................................
+def get_resource(resources, method, path):
+    '''
+    Returns the complete HTTP response for a further resource of the server,
+    None if there is none for the method and path. Each resource is a
+    function returning a tuple of its content type and body (as bytes), or
+    None if it is not yet available.
+    '''
+    _function = resources.get(( method, urlsplit(path).path ))
+    if _function is None:
+        return None
+    _resource = _function()
+    if _resource is None:
+        return b'HTTP/1.0 503 Service Unavailable\r\nRetry-After: 1\r\nContent-Length: 0\r\n\r\n'
+    _content_type, _body = _resource
+    return ( 'HTTP/1.0 200 OK\r\nContent-Type: {}\r\nContent-Length: {:d}\r\nCache-Control: no-cache\r\n\r\n'.format(
+            _content_type, len(_body)) ).encode('ascii') + _body
+
+# ..............................................................................
+class SnapshotCache(object):
+    '''
+    Answers '/snapshot.jpg' requests with the latest frame, straight from
+    memory and without waiting on the camera.
+
+    The frame is copied out of the FrameBuffer ring, and its responses
+    serialised, once per frame and only when first requested, so any number
+    of clients polling the same frame cost a dictionary lookup each. The
+    'ETag' is derived from the frame's sequence number (and the time the
+    cache was created, as sequence numbers restart with the camera), the
+    'Last-Modified' from the time it was committed; a repeat poll carrying
+    either in 'If-None-Match' or 'If-Modified-Since' is answered '304 Not
+    Modified' while the frame is unchanged.
+
+    With '?max_age_ms=' a client asks for a frame no older than that: if the
+    cached frame is older the request waits for the next, for up to
+    'max_wait_sec', otherwise the cached frame is returned at once.
+
+    :param frames:        the FrameBuffer of the stream
+    :param max_wait_sec:  the longest a request waits for a fresh frame
+    '''
+    def __init__(self, frames, max_wait_sec=2.0):
+        self._frames       = frames
+        self.max_wait_sec  = max_wait_sec
+        self._epoch        = '{:x}'.format(int(time.time()))
+        self._sequence     = 0
+        self._cached       = None # ( ETag, whole seconds of Last-Modified, 200 response, 304 response )
+        self._lock         = threading.Lock()
+        self._requests     = 0
+        self._not_modifieds = 0
+        self._copies       = 0
+        self._waits        = 0
+
+    # ..........................................................................
+    @staticmethod
+    def get_max_age(path):
+        '''
+        Returns the '?max_age_ms=' of the path in seconds, None if not given.
+        '''
+        _value = parse_qs(urlsplit(path).query).get('max_age_ms')
+        try:
+            return max(0, int(_value[0])) / 1000.0 if _value else None
+        except ValueError:
+            return None
+
+    # ..........................................................................
+    def is_fresh(self, max_age_sec):
+        '''
+        Returns True unless the latest frame is older than the maximum age.
+        '''
+        return max_age_sec is None or time.time() - self._frames.timestamp() <= max_age_sec
+
+    # ..........................................................................
+    @property
+    def sequence(self):
+        return self._frames.sequence
+
+    # ..........................................................................
+    def count_wait(self):
+        self._waits += 1
+
+    # ..........................................................................
+    def _update(self):
+        '''
+        Copy the latest frame and serialise its responses, if not already.
+        '''
+        _sequence, _frame = self._frames.latest()
+        if _sequence == self._sequence or _frame is None:
+            return
+        with self._lock:
+            if _sequence == self._sequence:
+                return
+            _jpeg = bytes(_frame)
+            if not self._frames.valid(_sequence): # rewritten while copying
+                return
+            _timestamp = self._frames.timestamp()
+            _etag = '"{}-{:d}"'.format(self._epoch, _sequence)
+            _headers = 'ETag: {}\r\nLast-Modified: {}\r\nCache-Control: no-cache\r\n'.format(_etag, formatdate(_timestamp, usegmt=True))
+            _ok = ( 'HTTP/1.0 200 OK\r\nContent-Type: image/jpeg\r\nContent-Length: {:d}\r\n'.format(len(_jpeg))
+                    + _headers + '\r\n' ).encode('ascii') + _jpeg
+            _not_modified = ( 'HTTP/1.0 304 Not Modified\r\n' + _headers + '\r\n' ).encode('ascii')
+            self._cached   = ( _etag, int(_timestamp), _ok, _not_modified )
+            self._sequence = _sequence
+            self._copies  += 1
+
+    # ..........................................................................
+    def respond(self, if_none_match=None, if_modified_since=None):
+        '''
+        Returns the complete HTTP response for the latest frame given the
+        request's conditional headers (if any).
+        '''
+        self._requests += 1
+        self._update()
+        _cached = self._cached
+        if _cached is None:
+            return b'HTTP/1.0 503 Service Unavailable\r\nRetry-After: 1\r\nContent-Length: 0\r\n\r\n'
+        _etag, _modified, _ok, _not_modified = _cached
+        if if_none_match is not None:
+            if _etag in if_none_match or if_none_match.strip() == '*':
+                self._not_modifieds += 1
+                return _not_modified
+        elif if_modified_since is not None:
+            try:
+                if parsedate_to_datetime(if_modified_since).timestamp() >= _modified:
+                    self._not_modifieds += 1
+                    return _not_modified
+            except (TypeError, ValueError):
+                pass
+        return _ok
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns the snapshot requests answered, how many were not modified,
+        the frames copied to answer them and the requests that waited.
+        '''
+        return {
+            'requests':     self._requests,
+            'not_modified': self._not_modifieds,
+            'copies':       self._copies,
+            'waits':        self._waits
+        }
+
+# ..............................................................................
+class StreamingHandler(server.BaseHTTPRequestHandler):
+
+    def __init__(self, socket, tup, server):
+        super().__init__(socket, tup, server)
+
+    # ..........................................................................
+    def do_GET(self):
+        _size = get_stream_size(self.path)
+        if self.path == '/':
+            self.send_response(301)
+            self.send_header('Location', '/index.html')
+            self.end_headers()
+        elif self.path == '/index.html':
+            content = self.server.page
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', len(content))
+            self.end_headers()
+            self.wfile.write(content)
+        elif self.path.startswith('/snapshot.jpg'):
+            _snapshot = self.server.snapshot
+            _max_age = SnapshotCache.get_max_age(self.path)
+            if not _snapshot.is_fresh(_max_age):
+                _snapshot.count_wait()
+                self.server.frames.wait(_snapshot.sequence, _snapshot.max_wait_sec)
+            self.wfile.write(_snapshot.respond(self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since')))
+        elif ( 'GET', urlsplit(self.path).path ) in self.server.resources:
+            self.wfile.write(get_resource(self.server.resources, 'GET', self.path))
+        elif _size is not None and _size in self.server.variants:
+            _variant = self.server.variants[_size]
+            _frames = _variant.frames
+            self.send_response(200)
+            self.send_header('Age', 0)
+            self.send_header('Cache-Control', 'no-cache, private')
+            self.send_header('Pragma', 'no-cache')
+            self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=FRAME')
+            self.end_headers()
+            _clients = _variant.clients
+            _variant.acquire()
+            _client = _clients.add(self, self.client_address)
+            try:
+                # the first write of each part never blocks; a blocked send of the rest times out
+                # once the client is too far behind (or never, with no max_lag)
+                self.connection.setblocking(False)
+                _fileno = self.connection.fileno()
+                _sndbuf_set = False
+                _sequence = _frames.sequence
+                while True:
+                    _sequence, part = _frames.wait(_client.sequence or _sequence, part=True)
+                    _client.update_lag(_sequence)
+                    if _clients.is_lagging(_client):
+                        raise TimeoutError('client fell {:d} frames behind'.format(_client.lag))
+                    if not _sndbuf_set: # bound the kernel's queue to queue_depth frames
+                        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _clients.queue_depth * len(part))
+                        _sndbuf_set = True
+                    if not _frames.valid(_sequence): # rewritten in the ring before it could be sent
+                        _client.overruns += 1
+                        continue
+                    # the boundary, headers, frame and CRLF were serialised once by the FrameBuffer.
+                    # The part is a view of its slot in the ring, which a send blocked on a slow
+                    # client could outlive, so write what the socket takes now without blocking
+                    # and send a copy of the rest.
+                    _cpu = time.thread_time()
+                    with _SEND_TIMER.time():
+                        try:
+                            _written = os.write(_fileno, part)
+                        except BlockingIOError:
+                            _written = 0
+                        _rest = bytes(part[_written:]) if _written < len(part) else None
+                        if not _frames.valid(_sequence): # rewritten before it was written or copied
+                            if _written:
+                                raise BufferError('frame {:d} rewritten while being sent'.format(_sequence))
+                            _client.overruns += 1
+                            continue
+                        if _rest:
+                            self.connection.settimeout(_clients.send_timeout)
+                            self.connection.sendall(_rest)
+                            self.connection.setblocking(False)
+                    _variant.record_sent(len(part), time.thread_time() - _cpu)
+                    _client.record_sent(_sequence, len(part))
+            except Exception as e:
+                logging.warning('removed streaming client %s: %s', self.client_address, str(e))
+            finally:
+                _clients.remove(self)
+                _variant.release()
+        else:
+            self.send_error(404)
+            self.end_headers()
+
+    # ..........................................................................
+    def do_POST(self):
+        _response = get_resource(self.server.resources, 'POST', self.path)
+        if _response is not None:
+            self.wfile.write(_response)
+        else:
+            self.send_error(404)
+            self.end_headers()
+
+# ..............................................................................
+class StreamingServer(socketserver.ThreadingMixIn, server.HTTPServer):
+    '''
+    The thread-per-client streaming server.
+
+    :param address:            the (host, port) tuple to bind
+    :param streaming_handler:  the request handler class
+    :param f_is_enabled:       a function returning True while enabled
+    :param frames:             the FrameBuffer providing video frames
+    :param page:               the encoded HTML index page
+    :param clients:            the StreamClients registry and policy
+    :param variants:           optional reduced-size StreamVariants by name,
+                               served as '/stream.mjpg?size=name'
+    :param resources:          optional further resources, by ( method, path ):
+                               functions returning ( content type, body )
+    '''
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, streaming_handler, f_is_enabled, frames, page, clients, variants=None, resources=None):
+        super().__init__(address, streaming_handler)
+        self._log = Logger('server', Level.INFO)
+        self._enabled_flag = f_is_enabled
+        self.frames = frames
+        self.page = page
+        self.clients = clients
+        self.variants = get_variants(frames, clients, variants)
+        self.resources = resources or {}
+        self.snapshot = SnapshotCache(frames)
+        self._log.info('ready.')
+
+    # ..........................................................................
+    def serve_forever(self):
+        '''
+            Handle one request at a time until the enabled flag is False.
+        '''
+        self._log.info('begin serve_forever loop.')
+        super().serve_forever(poll_interval=0.5)
+#       while self._enabled_flag():
+#           self._log.info('serve_forever handling request...')
+#           self._log.info(Fore.YELLOW + 'type Ctrl-C to exit.')
+#           self.handle_request()
+        self._log.info('exited serve_forever loop.')
+
+# ..............................................................................
+class AsyncStreamingServer(object):
+    '''
+    A streaming server that serves all clients from a single asyncio event
+    loop rather than a thread per client. When the camera commits a frame
+    the FrameBuffer notifies the loop once, which then writes that frame to
+    every connected stream client: one producer, one consumer thread.
+
+    This has the same serve_forever(), shutdown() and server_close() methods
+    as StreamingServer so that Video can use either. serve_forever() runs
+    the event loop on the calling thread until shutdown() is called from
+    another thread. Alternatively, the serve() coroutine may be run as a
+    task on an existing event loop.
+
+    :param address:       the (host, port) tuple to bind
+    :param f_is_enabled:  a function returning True while enabled
+    :param frames:        the FrameBuffer providing video frames
+    :param page:          the encoded HTML index page
+    :param clients:       the StreamClients registry and policy
+    :param level:         the log level
+    :param variants:      optional reduced-size StreamVariants by name,
+                          served as '/stream.mjpg?size=name'
+    :param resources:     optional further resources, by ( method, path ):
+                          functions returning ( content type, body )
+    '''
+    def __init__(self, address, f_is_enabled, frames, page, clients, level=Level.INFO, variants=None, resources=None):
+        self._log = Logger('async-server', level)
+        self._address      = address
+        self._enabled_flag = f_is_enabled
+        self.frames        = frames
+        self.page          = page
+        self.clients       = clients
+        self.variants      = get_variants(frames, clients, variants)
+        self.resources     = resources or {}
+        self.snapshot      = SnapshotCache(frames)
+        self._waiters      = [] # futures of snapshot requests waiting for a fresh frame
+        self._loop         = None
+        self._stopped      = None
+        self._scheduled    = set() # the names of variants with a fan-out pending
+        self._listeners    = {}    # variant name: its FrameBuffer listener
+        self._tasks        = set()
+        self._log.info('ready.')
+
+    # ..........................................................................
+    def serve_forever(self):
+        '''
+        Run the event loop on the calling thread until shutdown() is called.
+        '''
+        self._log.info('begin serve_forever loop.')
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+        try:
+            _loop.run_until_complete(self.serve())
+        finally:
+            _loop.close()
+        self._log.info('exited serve_forever loop.')
+
+    # ..........................................................................
+    async def serve(self):
+        '''
+        Serve clients on the running event loop until shutdown() is called.
+        '''
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        _server = await asyncio.start_server(self._handle, self._address[0] or None, self._address[1], reuse_address=True)
+        for _name, _variant in self.variants.items():
+            self._listeners[_name] = lambda sequence, variant=_variant: self._on_commit(variant)
+            _variant.frames.add_listener(self._listeners[_name])
+        try:
+            await self._stopped.wait()
+        finally:
+            for _name, _listener in self._listeners.items():
+                self.variants[_name].frames.remove_listener(_listener)
+            self._listeners.clear()
+            _server.close()
+            _tasks = list(self._tasks)
+            for _task in _tasks:
+                _task.cancel()
+            await asyncio.gather(*_tasks, return_exceptions=True)
+            await _server.wait_closed()
+
+    # ..........................................................................
+    def shutdown(self):
+        '''
+        Stop the event loop. This is safe to call from any thread.
+        '''
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    # ..........................................................................
+    def server_close(self):
+        pass
+
+    # ..........................................................................
+    def _on_commit(self, variant):
+        '''
+        Called on the camera thread for each frame committed to a variant.
+        Schedules a single fan-out on the event loop unless one is already
+        pending for that variant.
+        '''
+        if variant.name not in self._scheduled:
+            self._scheduled.add(variant.name)
+            try:
+                self._loop.call_soon_threadsafe(self._fan_out, variant)
+            except RuntimeError: # loop closed during shutdown
+                pass
+
+    # ..........................................................................
+    @Timers.timed('stream.fan_out')
+    def _fan_out(self, variant):
+        '''
+        Write the latest multipart part, serialised once by the FrameBuffer,
+        to every stream client with a single write. A transport's write()
+        sends immediately if it can, buffering only what the socket won't
+        take. A client that already has queue_depth frames buffered
+        skips this frame rather than slowing anyone else down, and is closed
+        once it has fallen more than max_lag frames behind.
+        '''
+        self._scheduled.discard(variant.name)
+        if variant.name == 'full' and self._waiters:
+            for _waiter in self._waiters:
+                if not _waiter.done():
+                    _waiter.set_result(True)
+            self._waiters.clear()
+        _sequence, _part = variant.frames.latest_part()
+        if _part is None:
+            return
+        _cpu = time.thread_time()
+        # the part is a view of its slot in the ring, and whatever a transport buffers is sent
+        # later, perhaps after the slot has been rewritten. Up to Python 3.11 write() copies what
+        # it buffers; from 3.12 it may keep the view, so it is given one copy shared by all clients.
+        if _NEEDS_COPY:
+            _part = bytes(_part)
+        _clients = variant.clients
+        _limit = ( _clients.queue_depth - 1 ) * len(_part)
+        _sent = 0
+        for _writer, _client in _clients.items():
+            if _client.sequence >= _sequence:
+                continue
+            if _writer.transport.get_write_buffer_size() > _limit:
+                _client.update_lag(_sequence)
+                if _clients.is_lagging(_client):
+                    self._log.warning('closing client {}: {:d} frames behind.'.format(_client.address, _client.lag))
+                    _writer.close()
+                continue
+            _writer.write(_part)
+            _client.update_lag(_sequence)
+            _client.record_sent(_sequence, len(_part))
+            _sent += len(_part)
+        variant.record_sent(_sent, time.thread_time() - _cpu)
+
+    # ..........................................................................
+    async def _handle(self, reader, writer):
+        _task = asyncio.current_task()
+        self._tasks.add(_task)
+        _variant = None
+        _clients = None
+        _acquired = False
+        try:
+            _request = await reader.readuntil(b'\r\n\r\n')
+            _method, _path = _request.split(b' ', 2)[:2] if _request.count(b' ') >= 2 else ( b'', b'' )
+            _method, _path = _method.decode('ascii', 'replace'), _path.decode('ascii', 'replace')
+            if _path == '/':
+                writer.write(b'HTTP/1.0 301 Moved Permanently\r\nLocation: /index.html\r\n\r\n')
+            elif _path.startswith('/snapshot.jpg'):
+                if not self.snapshot.is_fresh(SnapshotCache.get_max_age(_path)):
+                    self.snapshot.count_wait()
+                    _waiter = self._loop.create_future()
+                    self._waiters.append(_waiter)
+                    try:
+                        await asyncio.wait_for(_waiter, self.snapshot.max_wait_sec)
+                    except asyncio.TimeoutError:
+                        pass
+                writer.write(self.snapshot.respond(get_header(_request, b'if-none-match'), get_header(_request, b'if-modified-since')))
+            elif _path == '/index.html':
+                writer.write(b'HTTP/1.0 200 OK\r\nContent-Type: text/html\r\nContent-Length: %d\r\n\r\n' % len(self.page))
+                writer.write(self.page)
+            elif get_stream_size(_path) in self.variants:
+                _variant = self.variants[get_stream_size(_path)]
+                writer.write(b'HTTP/1.0 200 OK\r\nAge: 0\r\nCache-Control: no-cache, private\r\nPragma: no-cache\r\n'
+                        b'Content-Type: multipart/x-mixed-replace; boundary=FRAME\r\n\r\n')
+                _variant.acquire()
+                _acquired = True
+                _clients = _variant.clients
+                _clients.add(writer, writer.get_extra_info('peername'))
+                # frames are written by _fan_out(); wait here for the client to go away
+                while await reader.read(1024):
+                    pass
+            elif ( _method, urlsplit(_path).path ) in self.resources:
+                writer.write(get_resource(self.resources, _method, _path))
+            else:
+                writer.write(b'HTTP/1.0 404 Not Found\r\nContent-Length: 0\r\n\r\n')
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError) as e:
+            self._log.debug('client error: {}'.format(e))
+        except asyncio.CancelledError: # by serve() at shutdown, which needs nothing more from this task
+            pass
+        except Exception as e:
+            self._log.error('error serving {}: {}'.format(writer.get_extra_info('peername'), e))
+        finally:
+            if _clients is not None:
+                _clients.remove(writer)
+            if _acquired:
+                _variant.release()
+            self._tasks.discard(_task)
+            writer.close()
+
+#EOF
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import os, glob, json, time, threading, traceback
+from datetime import datetime as dt
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+
+# ..............................................................................
+class Telemetry(object):
+    '''
+    Appends a structured record of each event of interest (the PIR count,
+    the switch, the door, stream clients) to newline-delimited JSON files,
+    for analysis over months, alongside the console log.
+
+    Each record is a compact JSON object on a line of its own:
+
+        {"t":1792224000.123,"src":"door","ev":"closed","elapsed_sec":4.2}
+
+    being the time (seconds since the epoch), the source and the event,
+    then any numeric or string fields. record() only appends the line to a
+    batch in memory; a thread writes the batch every 'sync_sec' (or once
+    it holds 'batch_size' records), then flushes and fsyncs the file, so
+    the card is synced at most once per batch. A crash loses at most the
+    unwritten batch, and at worst leaves a partial last line, which read()
+    skips.
+
+    Files are named by the time they were started ('telemetry_<time>.jsonl'
+    in 'dirname'), and rotated once they exceed 'max_bytes'; the oldest are
+    deleted beyond 'max_files' (0 to keep them all).
+
+    record() may be called from any thread.
+
+    :param dirname:     the directory of the telemetry files
+    :param max_bytes:   the size beyond which a file is rotated
+    :param max_files:   the number of files kept (0 for no limit)
+    :param sync_sec:    the longest a record waits to be written
+    :param batch_size:  the records that are written without waiting
+    :param level:       the log level
+    '''
+    BASENAME = 'telemetry'
+
+    def __init__(self, dirname, max_bytes=4194304, max_files=0, sync_sec=10.0, batch_size=256, level=Level.INFO):
+        self._log = Logger('telemetry', level)
+        self._dirname    = dirname
+        self._max_bytes  = max_bytes
+        self._max_files  = max_files
+        self._sync_sec   = sync_sec
+        self._batch_size = batch_size
+        self._batch      = []
+        self._lock       = threading.Lock()
+        self._wake       = threading.Event()
+        self._closing    = False
+        self._file       = None # used only on the writer thread
+        self._filename   = None
+        # statistics
+        self._records    = 0
+        self._syncs      = 0
+        self._bytes      = 0
+        self._errors     = 0
+        os.makedirs(dirname, exist_ok=True)
+        self._thread = threading.Thread(target=Telemetry.__loop, args=[self], name='telemetry')
+        self._thread.setDaemon(True)
+        self._thread.start()
+        self._log.info('ready: to {}; synced every {:4.1f}s.'.format(dirname, sync_sec))
+
+    # ..........................................................................
+    def record(self, source, event, **fields):
+        '''
+        Record the event of the source, with any fields.
+        '''
+        _record = { 't': round(time.time(), 3), 'src': source, 'ev': event }
+        _record.update(fields)
+        _line = json.dumps(_record, separators=( ',', ':' )) + '\n'
+        with self._lock:
+            if self._closing:
+                return
+            self._batch.append(_line)
+            self._records += 1
+            _full = len(self._batch) >= self._batch_size
+        if _full:
+            self._wake.set()
+
+    # ..........................................................................
+    def sync(self):
+        '''
+        Write any waiting records now, without waiting for them.
+        '''
+        self._wake.set()
+
+    # ..........................................................................
+    def __loop(self):
+        while True:
+            self._wake.wait(self._sync_sec)
+            self._wake.clear()
+            with self._lock:
+                _batch, self._batch = self._batch, []
+                _closing = self._closing
+            if _batch:
+                try:
+                    self._write(''.join(_batch).encode('utf-8'))
+                except Exception:
+                    self._errors += 1
+                    self._log.error('error writing telemetry to {}: {}'.format(self._filename, traceback.format_exc()))
+                    self._close_file()
+            if _closing:
+                break
+        self._close_file()
+
+    # ..........................................................................
+    def _write(self, data):
+        '''
+        Write and sync the data, first rotating the file if it is full.
+        '''
+        if self._file is not None and self._file.tell() + len(data) > self._max_bytes:
+            self._close_file()
+        if self._file is None:
+            self._open_file()
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._syncs += 1
+        self._bytes += len(data)
+
+    # ..........................................................................
+    def _open_file(self):
+        _timestamp = dt.utcnow().strftime('%Y_%m_%dT%H_%M_%S_%f')
+        self._filename = os.path.join(self._dirname, '{}_{}.jsonl'.format(Telemetry.BASENAME, _timestamp))
+        self._file = open(self._filename, 'ab')
+        self._log.info('telemetry file: {}'.format(self._filename))
+        if self._max_files > 0:
+            for _filename in Telemetry.files(self._dirname)[:-self._max_files]:
+                os.remove(_filename)
+                self._log.info('deleted telemetry file: {}'.format(_filename))
+
+    # ..........................................................................
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    # ..........................................................................
+    def close(self, timeout=None):
+        '''
+        Write any waiting records and close the file.
+        '''
+        with self._lock:
+            self._closing = True
+        self._wake.set()
+        self._thread.join(timeout)
+        self._log.info('closed: {}'.format(self.get_stats()))
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns the number of records made, the syncs and bytes written, and
+        the errors writing them.
+        '''
+        return {
+            'records': self._records,
+            'syncs':   self._syncs,
+            'bytes':   self._bytes,
+            'errors':  self._errors
+        }
+
+    # ..........................................................................
+    @staticmethod
+    def files(dirname):
+        '''
+        Returns the telemetry files of the directory, oldest first.
+        '''
+        return sorted(glob.glob(os.path.join(dirname, '{}_*.jsonl'.format(Telemetry.BASENAME))))
+
+    # ..........................................................................
+    @staticmethod
+    def read(dirname, since=None, until=None, sources=None, events=None):
+        '''
+        A generator of the records (as dicts) of the telemetry files in the
+        directory, oldest first, optionally only those at or after 'since'
+        and before 'until' (seconds since the epoch), and of the 'sources'
+        and 'events' (collections of names). The files are read a line at a
+        time, and those ended before 'since' (i.e., followed by a file
+        started before it) or started after 'until' are not opened; lines
+        that are not whole records are skipped.
+        '''
+        def _name(epoch):
+            return os.path.join(dirname, '{}_{}.jsonl'.format(Telemetry.BASENAME, dt.utcfromtimestamp(epoch).strftime('%Y_%m_%dT%H_%M_%S_%f')))
+        _since_name = _name(since) if since is not None else None
+        _until_name = _name(until) if until is not None else None
+        _files = Telemetry.files(dirname)
+        for _index, _filename in enumerate(_files):
+            if _until_name and _filename >= _until_name:
+                break
+            if _since_name and _index + 1 < len(_files) and _files[_index + 1] <= _since_name:
+                continue
+            with open(_filename, 'rb') as _file:
+                for _line in _file:
+                    try:
+                        _record = json.loads(_line)
+                    except ValueError:
+                        continue
+                    _time = _record.get('t', 0.0)
+                    if ( since is not None and _time < since ) or ( until is not None and _time >= until ):
+                        continue
+                    if ( sources and _record.get('src') not in sources ) or ( events and _record.get('ev') not in events ):
+                        continue
+                    yield _record
+
+#EOF
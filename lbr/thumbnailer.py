@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+
+import io, time, threading
+from colorama import init, Fore, Style
+init()
+try:
+    import numpy as np
+except ImportError:
+    np = None # required only for the pixels of a thumbnail
+try:
+    from PIL import Image
+except ImportError:
+    Image = None # required by the Thumbnailer, checked as it is created
+
+from core.logger import Level, Logger
+
+# ..............................................................................
+class Thumbnailer(object):
+    '''
+    Provides reduced-resolution greyscale images (thumbnails) of the MJPEG
+    frames in a FrameBuffer, cheaply and shared between their consumers
+    (the motion and mail detectors, and '/thumb.jpg').
+
+    A full decode of a 1600x512 frame is expensive on a Pi. Instead the
+    JPEG is decoded with libjpeg's DCT scaling at 1/2, 1/4 or 1/8 of its
+    size, and only its luminance: most of the inverse DCT and all of the
+    colour conversion and upsampling are skipped.
+
+    The most recent thumbnail at each scale is cached by the sequence number
+    of its frame, so however many consumers ask for the same frame it is
+    decoded once; a consumer asking while another is decoding it waits for
+    that decode rather than making its own. The pixels are a read-only NumPy
+    array shared by every consumer. The thumbnail served as '/thumb.jpg' is
+    likewise encoded once per frame.
+
+    :param frames:   the FrameBuffer providing video frames
+    :param scale:    the default scale: 1, 2, 4 or 8 (meaning 1/1, 1/2, 1/4
+                     or 1/8 of the frame's size)
+    :param quality:  the JPEG quality of '/thumb.jpg'
+    :param level:    the log level
+    '''
+    SCALES = ( 1, 2, 4, 8 )
+
+    def __init__(self, frames, scale=8, quality=75, level=Level.INFO):
+        self._log = Logger('thumbnailer', level)
+        if Image is None:
+            raise ImportError('thumbnails require the Pillow module (install with: pip3 install --user Pillow).')
+        if scale not in Thumbnailer.SCALES:
+            raise ValueError('unsupported thumbnail scale: {} (must be 1, 2, 4 or 8).'.format(scale))
+        self.frames    = frames
+        self.scale     = scale
+        self._quality  = quality
+        self._cache    = {} # scale: ( sequence, image, pixels )
+        self._jpeg     = ( 0, None ) # ( sequence, JPEG of the default scale )
+        self._lock     = threading.Lock()
+        # statistics
+        self._requests = 0
+        self._decodes  = 0
+        self._encodes  = 0
+        self._skipped  = 0
+        self._cpu_sec  = 0.0
+        self._log.info('ready: 1/{:d} scale.'.format(scale))
+
+    # ..........................................................................
+    @staticmethod
+    def decode(jpeg, scale):
+        '''
+        Returns the JPEG (a bytes-like object or file) decoded as a greyscale
+        PIL Image at 1/scale of its size.
+        '''
+        _image = Image.open(jpeg if hasattr(jpeg, 'read') else io.BytesIO(jpeg))
+        _image.draft('L', ( _image.width // scale, _image.height // scale ))
+        _image.load()
+        return _image if _image.mode == 'L' else _image.convert('L')
+
+    # ..........................................................................
+    def _get(self, scale):
+        '''
+        Returns the cached ( sequence, image, pixels ) of the latest frame at
+        the scale, decoding it if not already. Called with the lock held.
+        '''
+        self._requests += 1
+        _cached = self._cache.get(scale)
+        _sequence, _frame = self.frames.latest()
+        if _frame is None or ( _cached and _cached[0] == _sequence ):
+            return _cached
+        _cpu = time.thread_time()
+        try:
+            _buffer = io.BytesIO(_frame) # a copy, so the slot may be rewritten
+            if not self.frames.valid(_sequence): # rewritten while copying
+                self._skipped += 1
+                return _cached
+            _image = Thumbnailer.decode(_buffer, scale)
+            _pixels = None
+            if np is not None:
+                _pixels = np.asarray(_image)
+                _pixels.setflags(write=False)
+            self._cache[scale] = _cached = ( _sequence, _image, _pixels )
+            self._decodes += 1
+            return _cached
+        finally:
+            self._cpu_sec += time.thread_time() - _cpu
+
+    # ..........................................................................
+    def latest(self, scale=None):
+        '''
+        Returns a tuple of the sequence number and the (read-only) greyscale
+        pixels of the latest frame at the scale (by default, that of the
+        Thumbnailer), or (0, None) if there is no frame. This never waits on
+        the camera, only on a decode of the same frame in progress.
+        '''
+        if np is None:
+            raise RuntimeError('thumbnail pixels require the numpy module.')
+        with self._lock:
+            _cached = self._get(scale or self.scale)
+        return ( _cached[0], _cached[2] ) if _cached else ( 0, None )
+
+    # ..........................................................................
+    def wait(self, after_sequence, timeout=None, scale=None):
+        '''
+        Blocks until a frame newer than 'after_sequence' has been committed,
+        then returns the tuple of latest(). Returns (after_sequence, None) if
+        the timeout expires first.
+        '''
+        _sequence, _frame = self.frames.wait(after_sequence, timeout)
+        if _frame is None:
+            return after_sequence, None
+        return self.latest(scale)
+
+    # ..........................................................................
+    def jpeg(self):
+        '''
+        Returns the latest thumbnail at the default scale as a JPEG, None if
+        there is no frame.
+        '''
+        with self._lock:
+            _cached = self._get(self.scale)
+            if _cached is None:
+                return None
+            _sequence, _image, _ = _cached
+            if self._jpeg[0] != _sequence:
+                _cpu = time.thread_time()
+                _buffer = io.BytesIO()
+                _image.save(_buffer, format='JPEG', quality=self._quality)
+                self._jpeg = ( _sequence, _buffer.getvalue() )
+                self._encodes += 1
+                self._cpu_sec += time.thread_time() - _cpu
+            return self._jpeg[1]
+
+    # ..........................................................................
+    def get_stats(self):
+        '''
+        Returns the number of thumbnails requested, the frames decoded and
+        encoded to answer them, those skipped as rewritten while copied, and
+        the CPU time spent.
+        '''
+        return {
+            'requests': self._requests,
+            'decodes':  self._decodes,
+            'encodes':  self._encodes,
+            'skipped':  self._skipped,
+            'cpu_sec':  self._cpu_sec
+        }
+
+#EOF
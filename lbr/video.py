@@ -7,32 +7,39 @@
 #
 # author:   Murray Altheim
 # created:  2019-12-23
-# modified: 2021-03-24
+# modified: 2026-10-17
 #
 # Once running, access the video stream from:    http://pi-address:8001/
 #
 # source: https://picamera.readthedocs.io/en/release-1.13/recipes2.html#web-streaming
 #
 
-import os, sys, time, threading, traceback, io, socket, socketserver, itertools, logging, picamera
+import os, sys, json, time, asyncio, threading, traceback, io, socket, itertools
 from pathlib import Path
-from picamera import Color
 from datetime import datetime as dt
-from threading import Condition
-from http import server
 from colorama import init, Fore, Style
 init()
-try:
-    import tzlocal
-except ImportError:
-    sys.exit("This script requires the tzlocal module\nInstall with: pip3 install --user tzlocal")
 #try:
 #    import ffmpeg
 #except ImportError:
 #    sys.exit("This script requires the ffmpeg module\nInstall with: pip3 install --user ffmpeg")
 
+from lbr.hal import Hal
 from lbr.orientation import Orientation
+from lbr.output_splitter import OutputSplitter
+from lbr.file_writer import FileWriter
+from lbr.segment_finaliser import SegmentFinaliser
+from lbr.retention import RetentionManager
+from lbr.recorder import EventRecorder
+from lbr.duty_cycle import DutyCycle
+from lbr.annotator import Annotator
+from lbr.status import Status
+from lbr.stream import get_page, StreamClients, StreamVariant, StreamingHandler, StreamingServer, AsyncStreamingServer
 from core.logger import Level, Logger
+from core.event import Event, EventType
+from core.timers import Timers
+
+_ANNOTATE_TIMER = Timers.get('video.annotate')
 
 # ..............................................................................
 class Video():
@@ -41,20 +48,57 @@ class Video():
     The Lux mode used on the other robots is not present here; the default is
     night mode since the inside of the letterbox is generally dark.
 
-    The camera image is annotated with a title and timestamp. The output filename
+    The camera image is annotated with a title and timestamp by an Annotator,
+    each second just after the wall-clock second changes, writing only the
+    camera properties that have changed. The output filename
     is timestamped and written to a './videos' directory in H.264 video format.
+    In continuous mode the output is rotated into segments upon a duration or
+    size limit; closed segments (and event clips) are converted to mp4 in the
+    background if 'convert_mp4' is set.
+
+    When run on an event loop with 'duty_cycle' set, the camera is idled
+    (dropped to the idle resolution and framerate, or stopped) while there
+    are no stream clients, the door is closed and nothing has triggered it,
+    and resumed upon a trigger, the door opening or a new stream client. In
+    'low' idle mode the pre-roll of a clip is at the idle resolution.
+
+    Reduced sizes of the stream configured as 'stream_variants' are served
+    as '/stream.mjpg?size=name', each encoded on a splitter port of its own
+    (2 and 3, so at most two) only while it has clients.
+
+    Greyscale thumbnails of the frames, decoded cheaply at a reduced scale
+    by a Thumbnailer, are served as '/thumb.jpg' and shared by the motion
+    and mail detectors. With 'motion_detect' set a MotionDetector analyses
+    a subsample of the frames; motion seen in the video is published as a
+    VIDEO_MOTION event on the MessageBus if one is provided, confirming (or
+    not) the motion reported by the PIR sensor.
+
+    With 'mail_detect' set a MailDetector compares the floor of the box to
+    a learned empty baseline after the door closes and on a slow timer; its
+    state is published as MAIL_PRESENT and MAIL_ABSENT events, and served as
+    JSON from '/mail' (a POST to '/mail/learn' learns the empty box).
+
+    If a Telemetry is provided each new stream client is recorded on it.
+
+    With 'status' set the state of the streams (the frames and bytes
+    committed by each OutputSplitter, the frame rate, the clients and their
+    lag) and of any sections added with add_status() is served as JSON from
+    '/status' and in the Prometheus text format from '/metrics'.
     '''
-    def __init__(self, config, level):
+    def __init__(self, config, level, hal=None, message_bus=None, telemetry=None):
         super().__init__()
-        global video_width, video_height, annotation_title
         self._log = Logger('video', level)
         if config is None:
             raise ValueError("no configuration provided.")
         self._config = config
+        # the camera, or its simulation
+        self._hal = hal if hal else Hal(config, level)
+        self._Color = self._hal.Color
         _config = self._config['ros'].get('video')
         self._enable_streaming   = _config.get('enable_streaming')
         self._enable_file_output = _config.get('enable_file_output')
         self._port               = _config.get('port')
+        self._server_mode        = _config.get('server', 'threaded')
         self._counter = itertools.count()
         self._server = None
 
@@ -63,6 +107,72 @@ class Video():
         self._height      = _config.get('height')
         self._resolution  = ( self._width, self._height )
         self._framerate   = _config.get('framerate')
+        self._frame_slots    = _config.get('frame_slots', 4)
+        self._frame_capacity = _config.get('frame_capacity', 262144)
+        self._clients = StreamClients(_config.get('client_queue_depth', 2), _config.get('client_max_lag', 40), self._framerate,
+                level, self._on_client_added)
+        # camera duty cycling
+        self._enable_duty_cycle = _config.get('duty_cycle', False)
+        self._idle_mode         = _config.get('idle_mode', 'low')
+        if self._idle_mode not in ( 'low', 'off' ):
+            raise ValueError('unrecognised idle mode: {}'.format(self._idle_mode))
+        self._idle_resolution   = ( _config.get('idle_width', 320), _config.get('idle_height', 240) )
+        self._idle_framerate    = _config.get('idle_framerate', 2)
+        self._idle_after_sec    = self._hal.scale(_config.get('idle_after_sec', 30.0))
+        self._idle_annotate_sec = self._hal.scale(_config.get('idle_annotate_sec', 10.0))
+        self._duty_cycle = None
+        # thumbnails of the frames, for /thumb.jpg and the detectors
+        self._enable_thumbnail  = _config.get('thumbnail', False)
+        self._thumbnail_scale   = _config.get('thumbnail_scale', 8)
+        self._thumbnail_quality = _config.get('thumbnail_quality', 75)
+        self._thumbnailer       = None
+        # motion detection in the video frames
+        self._message_bus       = message_bus
+        self._telemetry         = telemetry
+        self._enable_motion     = _config.get('motion_detect', False)
+        self._motion_sample_hz  = _config.get('motion_sample_hz', 4.0)
+        self._motion_scale      = _config.get('motion_scale', 8)
+        self._motion_roi        = _config.get('motion_roi')
+        self._motion_alpha      = _config.get('motion_alpha', 0.05)
+        self._motion_threshold  = _config.get('motion_threshold', 24)
+        self._motion_min_ratio  = _config.get('motion_min_ratio', 0.02)
+        self._motion_detector   = None
+        # mail detection in the letterbox
+        self._enable_mail        = _config.get('mail_detect', False)
+        self._mail_blocks        = tuple(_config.get('mail_blocks', [ 16, 8 ]))
+        self._mail_roi           = _config.get('mail_roi')
+        self._mail_threshold     = _config.get('mail_block_threshold', 16.0)
+        self._mail_min_ratio     = _config.get('mail_min_ratio', 0.05)
+        self._mail_debounce      = _config.get('mail_debounce', 2)
+        self._mail_settle_sec    = self._hal.scale(_config.get('mail_settle_sec', 2.0))
+        self._mail_interval_sec  = self._hal.scale(_config.get('mail_interval_sec', 600.0))
+        self._mail_baseline_file = _config.get('mail_baseline_file')
+        self._mail_detector      = None
+        self._resources = {}
+        if self._enable_thumbnail:
+            self._resources[( 'GET', '/thumb.jpg' )] = self._get_thumbnail_resource
+        if self._enable_mail:
+            self._resources[( 'GET', '/mail' )] = self._get_mail_resource
+            self._resources[( 'POST', '/mail/learn' )] = self._learn_mail
+        self._status = None
+        if _config.get('status', True):
+            self._status = Status(level)
+            self._status.add('stream', self.get_status)
+            self._resources[( 'GET', '/status' )]  = self._status.get_json
+            self._resources[( 'GET', '/metrics' )] = self._status.get_metrics
+        # reduced-size stream variants: name: StreamVariant
+        self._camera   = None
+        self._variants = {}
+        self._variant_ports = {}
+        for _port, ( _name, _size ) in enumerate(( _config.get('stream_variants') or {} ).items(), start=2):
+            if _port > 3:
+                raise ValueError('at most two stream variants are supported (on splitter ports 2 and 3).')
+            _output = OutputSplitter(None, self._frame_slots, self._frame_capacity)
+            _clients = StreamClients(_config.get('client_queue_depth', 2), _config.get('client_max_lag', 40), self._framerate,
+                    level, self._on_client_added)
+            self._variants[_name] = StreamVariant(_name, tuple(_size), _output.frames, _clients,
+                    self._start_variant, self._stop_variant, _output)
+            self._variant_ports[_name] = _port
 
         if self._enable_file_output:
             self._convert_mp4 = _config.get('convert_mp4')
@@ -70,37 +180,66 @@ class Video():
         else:
             self._convert_mp4 = False
             self._remove_h264 = False
+        self._segment_sec       = self._hal.scale(_config.get('segment_sec', 0))
+        self._segment_bytes     = _config.get('segment_bytes', 0)
+        self._finaliser_workers = _config.get('finaliser_workers', 1)
+        self._finaliser = None
+        # retention of the video directory
+        self._retention_max_bytes      = _config.get('retention_max_bytes', 0)
+        self._retention_max_age_sec    = _config.get('retention_max_age_hours', 0) * 3600.0
+        self._retention_min_free_bytes = _config.get('retention_min_free_bytes', 0)
+        self._retention = None
+        # event recording mode
+        self._record_mode      = _config.get('record_mode', 'continuous')
+        self._preroll_sec      = self._hal.scale(_config.get('preroll_sec', 3.0))
+        self._preroll_bytes    = _config.get('preroll_bytes', 8388608)
+        self._quiet_period_sec = self._hal.scale(_config.get('quiet_period_sec', 10.0))
+        self._recorder = None
+        # background disk writer
+        self._writer_block_size = _config.get('writer_block_size', 65536)
+        self._writer_blocks     = _config.get('writer_blocks', 64)
+        self._writer_policy     = _config.get('writer_policy', 'drop')
+        self._writer = None
         self._quality     = _config.get('quality')
         self._annotate    = _config.get('annotate')
         self._title       = _config.get('title')
         self._basename    = _config.get('basename')
         self._dirname     = _config.get('dirname')
-        # set globals
         self._default_night_mode = True
-        video_width       = self._width
-        video_height      = self._height
-        annotation_title  = self._title
+        self._annotator   = Annotator(self._title, self._Color, level) if self._annotate else None
         self._filename = None
         self._thread   = None
         self._killer   = None
+        self._output   = None
+        self._enabled  = False
+        self._loop     = None
+        self._task     = None
+        self._stopped  = None
 
+        if self._enable_file_output:
+            self._log.info('recording mode: {}'.format(self._record_mode))
         if self._enable_streaming:
-            self._log.info('ready: streaming on port {:d}'.format(self._port))
+            self._log.info('ready: streaming on port {:d} ({} server)'.format(self._port, self._server_mode))
         else:
             self._log.info('ready: save to file only, no streaming.')
 
     # ..........................................................................
     def set_compass(self, compass):
-        global g_compass
-        g_compass = compass # used by annotation
         self._compass = compass
+#       if self._annotator:
+#           self._annotator.set_heading(compass.get_heading_message())
 
     # ..........................................................................
-    @staticmethod
-    def get_annotation():
-        global annotation_title, g_compass
-        _heading = '' #g_compass.get_heading_message() if g_compass is not None else ''
-        return '{} {} {}'.format(annotation_title, dt.now(tzlocal.get_localzone()).strftime('%Y-%m-%d %H:%M:%S %Z'), _heading)
+    def get_annotation(self):
+        return self._annotator.get_text() if self._annotator else None
+
+    # ..........................................................................
+    def get_annotation_stats(self):
+        '''
+        Returns the annotation updates, camera properties written and texts
+        formatted, or None if not annotating.
+        '''
+        return self._annotator.get_stats() if self._annotator else None
 
     # ..........................................................................
     def is_night_mode(self):
@@ -114,6 +253,305 @@ class Video():
     def get_filename(self):
         return self._filename
 
+    # ..........................................................................
+    def _get_output_filename(self):
+        return os.path.join(self._dirname, self._basename + '_' + self._get_timestamp() + '.h264')
+
+    # ..........................................................................
+    def get_writer_stats(self):
+        '''
+        Returns the disk writer's queue depth and write latency stats, or
+        None if there is no file output.
+        '''
+        return self._writer.get_stats() if self._writer else None
+
+    # ..........................................................................
+    def get_finaliser_stats(self):
+        '''
+        Returns the pending, converted and failed counts of the mp4 segment
+        finaliser, or None if conversion is not enabled.
+        '''
+        return self._finaliser.get_stats() if self._finaliser else None
+
+    # ..........................................................................
+    def get_retention_stats(self):
+        '''
+        Returns the indexed file count and size and the deletions made by
+        the retention manager, or None if no retention policy is set.
+        '''
+        return self._retention.get_stats() if self._retention else None
+
+    # ..........................................................................
+    def get_stream_stats(self):
+        '''
+        Returns the stats of each size of the stream, by name: whether its
+        encoder is active, its clients, the frames and bytes encoded, the
+        bytes sent and bandwidth, and the CPU time spent on it.
+        '''
+        _variants = self._server.variants if self._server else self._variants
+        return { _name: _variant.get_stats() for _name, _variant in _variants.items() }
+
+    # ..........................................................................
+    def get_snapshot_stats(self):
+        '''
+        Returns the counts of '/snapshot.jpg' requests, those not modified,
+        frames copied and requests that waited, or None if not streaming.
+        '''
+        return self._server.snapshot.get_stats() if self._server else None
+
+    # ..........................................................................
+    def get_thumbnail_stats(self):
+        '''
+        Returns the thumbnails requested and the frames decoded and encoded
+        to answer them, or None if there is no Thumbnailer.
+        '''
+        return self._thumbnailer.get_stats() if self._thumbnailer else None
+
+    # ..........................................................................
+    def _get_thumbnail_resource(self):
+        _jpeg = self._thumbnailer.jpeg() if self._thumbnailer else None
+        return ( 'image/jpeg', _jpeg ) if _jpeg is not None else None
+
+    # ..........................................................................
+    def get_motion_stats(self):
+        '''
+        Returns the frames analysed and with motion, the latest motion ratio
+        and the CPU time of the motion detector, or None if not detecting.
+        '''
+        return self._motion_detector.get_stats() if self._motion_detector else None
+
+    # ..........................................................................
+    def _on_video_motion(self, ratio):
+        '''
+        Called on the motion detector's thread for each frame with motion.
+        '''
+        if self._message_bus:
+            self._message_bus.publish(Event(EventType.VIDEO_MOTION, ratio))
+
+    # ..........................................................................
+    def get_mail_stats(self):
+        '''
+        Returns the mail state, the evaluations made and the CPU time of the
+        mail detector, or None if not detecting mail.
+        '''
+        return self._mail_detector.get_stats() if self._mail_detector else None
+
+    # ..........................................................................
+    def _on_mail_changed(self, state, ratio):
+        '''
+        Called on the mail detector's thread upon each change of its state.
+        '''
+        from lbr.mail_detector import Mail
+        if self._message_bus:
+            self._message_bus.publish(Event(EventType.MAIL_PRESENT if state is Mail.PRESENT else EventType.MAIL_ABSENT, ratio))
+
+    # ..........................................................................
+    def _wake_for_mail(self):
+        if self._duty_cycle is not None:
+            self._duty_cycle.activity('mail detector')
+
+    # ..........................................................................
+    def _get_mail_resource(self):
+        _state = self._mail_detector.get_state() if self._mail_detector else { 'mail': 'unknown' }
+        return 'application/json', json.dumps(_state).encode('utf-8')
+
+    # ..........................................................................
+    def _learn_mail(self):
+        if self._mail_detector:
+            self._mail_detector.learn()
+        return self._get_mail_resource()
+
+    # ..........................................................................
+    def get_duty_cycle_stats(self):
+        '''
+        Returns whether the camera is idle, the times it has been idled and
+        resumed, and the longest resume, or None if not duty cycled.
+        '''
+        return self._duty_cycle.get_stats() if self._duty_cycle else None
+
+    # ..........................................................................
+    def enforce_retention(self):
+        '''
+        Delete the oldest video files as required by the retention policy,
+        if one is set. This is also done as each file is closed.
+        '''
+        if self._retention:
+            self._retention.enforce()
+
+    # ..........................................................................
+    def _on_file_closed(self, filename):
+        '''
+        Called on the file writer's thread as each segment or clip is closed.
+        '''
+        if self._retention:
+            self._retention.add(filename)
+        if self._finaliser:
+            self._finaliser.finalise(filename)
+
+    # ..........................................................................
+    def _on_file_converted(self, source, mp4_filename):
+        '''
+        Called on a finaliser thread as each segment is converted to mp4.
+        '''
+        if self._retention:
+            if self._remove_h264:
+                self._retention.discard(source)
+            self._retention.add(mp4_filename)
+
+    # ..........................................................................
+    def trigger(self, source):
+        '''
+        Called upon an event (PIR motion, the door opening) to start or extend
+        a recorded clip when in 'event' recording mode; otherwise ignored.
+        '''
+        if self._recorder is not None:
+            self._recorder.trigger(source)
+        if self._duty_cycle is not None:
+            self._duty_cycle.activity(source)
+
+    # ..........................................................................
+    def set_door_open(self, is_open):
+        '''
+        Called as the letterbox door opens or closes: the camera is not
+        idled while the door is open, and mail is looked for once closed.
+        '''
+        if self._duty_cycle is not None:
+            self._duty_cycle.set_door_open(is_open)
+        if self._mail_detector is not None:
+            self._mail_detector.set_door_open(is_open)
+
+    # ..........................................................................
+    def _on_client_added(self):
+        if self._telemetry:
+            self._telemetry.record('stream', 'connect', clients=len(self._clients)
+                    + sum(len(_variant.clients) for _variant in self._variants.values()))
+        if self._duty_cycle is not None:
+            self._duty_cycle.activity('stream client')
+
+    # ..........................................................................
+    def _is_busy(self):
+        '''
+        Returns True while the camera is needed regardless of any activity:
+        a client is streaming or a clip is being recorded.
+        '''
+        return len(self._clients) > 0 or any(len(_variant.clients) for _variant in self._variants.values()) \
+                or ( self._recorder is not None and self._recorder.recording )
+
+    # ..........................................................................
+    def _set_idle(self, camera, output, idle):
+        '''
+        Idle or resume the camera. Its resolution and framerate may only be
+        changed while not recording, so recording (including that of any
+        stream variants) is stopped first.
+        '''
+        for _variant in self._variants.values():
+            _variant.suspend()
+        if camera.recording:
+            camera.stop_recording()
+        if idle and self._idle_mode == 'off':
+            self._log.info('camera stopped.')
+            return
+        camera.resolution = self._idle_resolution if idle else self._resolution
+        camera.framerate  = self._idle_framerate if idle else self._framerate
+        if self._annotate:
+            self._annotator.invalidate()
+            self._annotator.update(camera, self.is_night_mode())
+        self._start_recording(camera, output)
+        for _variant in self._variants.values():
+            _variant.resume()
+        self._log.info('camera {} at {}x{}, {}fps.'.format('idle' if idle else 'active',
+                camera.resolution[0], camera.resolution[1], camera.framerate))
+
+    # ..........................................................................
+    def _start_recording(self, camera, output, **kwargs):
+        if self._quality > 0:
+            # values 1 (highest quality) to 40 (lowest quality), with typical values between 20 and 25
+            camera.start_recording(output, format='mjpeg', quality=self._quality, **kwargs)
+        else:
+            camera.start_recording(output, format='mjpeg', **kwargs)
+
+    # ..........................................................................
+    def _start_variant(self, variant):
+        '''
+        Start encoding the stream variant, resized, on its splitter port.
+        Called as its first client connects.
+        '''
+        if self._camera is None:
+            raise RuntimeError('the camera is not running.')
+        self._start_recording(self._camera, variant, splitter_port=self._variant_ports[variant.name], resize=variant.resolution)
+        self._log.info('started {} stream at {}x{}.'.format(variant.name, variant.resolution[0], variant.resolution[1]))
+
+    # ..........................................................................
+    def _stop_variant(self, variant):
+        '''
+        Stop encoding the stream variant. Called as its last client disconnects.
+        '''
+        if self._camera is not None and not self._camera.closed:
+            self._camera.stop_recording(splitter_port=self._variant_ports[variant.name])
+            self._log.info('stopped {} stream.'.format(variant.name))
+
+    # ..........................................................................
+    def get_client_stats(self):
+        '''
+        Returns a list of the sent, dropped and lag counters of each
+        connected stream client.
+        '''
+        return self._clients.get_stats()
+
+    # ..........................................................................
+    def add_resource(self, method, path, function):
+        '''
+        Add a further resource of the streaming server: a function returning
+        a tuple of its content type and body (as bytes), or None if it is
+        not yet available.
+        '''
+        self._resources[( method, path )] = function
+
+    # ..........................................................................
+    def add_status(self, name, f_get_status):
+        '''
+        Add the named section, whose function returns a dict of its values,
+        to those served from '/status' and '/metrics' (if 'status' is set).
+        '''
+        if self._status:
+            self._status.add(name, f_get_status)
+
+    # ..........................................................................
+    def get_status(self):
+        '''
+        Returns the frames and bytes committed, the frame rate, bytes per
+        frame and number of clients of each stream, and the lag and counters
+        of each client, read from the counters kept as frames are written
+        and sent.
+        '''
+        _variants = self._server.variants if self._server else self._variants
+        _streams = []
+        _clients = []
+        for _name, _variant in _variants.items():
+            _stats = _variant.frames.get_stats()
+            _fps, _bytes_per_frame = _variant.frames.get_rate()
+            _streams.append({
+                'stream':          _name,
+                'active':          _variant.active,
+                'frames_total':    _stats['frames'],
+                'bytes_total':     _stats['bytes'],
+                'fps':             round(_fps, 2),
+                'bytes_per_frame': _bytes_per_frame,
+                'clients':         len(_variant.clients)
+            })
+            for _, _client in _variant.clients.items():
+                _clients.append({
+                    'stream':                _name,
+                    'address':               '{}:{}'.format(_client.address[0], _client.address[1]) if _client.address else '',
+                    'client_lag':            _client.lag,
+                    'client_max_lag':        _client.max_lag,
+                    'client_sent_total':     _client.sent,
+                    'client_bytes_total':    _client.bytes,
+                    'client_dropped_total':  _client.dropped,
+                    'client_overruns_total': _client.overruns
+                })
+        return { 'clients': len(_clients), 'streams': _streams, 'stream_clients': _clients }
+
     # ..........................................................................
     def get_ip_address(self):
         _socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -128,40 +566,41 @@ class Video():
 
     # ..........................................................................
     def _start(self, output_splitter, f_is_enabled):
-        global output # necessary for access from StreamingHandler, passed as type
-        output = output_splitter
         self._output = output_splitter
         self._filename = output_splitter.get_filename()
         if self._enable_streaming:
             self._log.info('starting video with capture to file: {}'.format(output_splitter.get_filename()))
         else:
             self._log.info('starting capture to file: {}'.format(output_splitter.get_filename()))
-        with picamera.PiCamera(resolution=self._resolution, framerate=self._framerate) as camera:
+        with self._hal.create_camera(self._resolution, self._framerate) as camera:
+            self._camera = camera
             self._log.info('camera framerate: {}'.format(camera.framerate))
             self._log.info('camera ISO: {}'.format(camera.iso))
             self._log.info('camera mode: {}'.format(camera.exposure_mode))
             self._log.info('camera shutter speed: {}'.format(camera.shutter_speed))
             if self._annotate:
                 camera.annotate_text_size = 12
-                self.set_night_mode(camera, self.is_night_mode())
-#               camera.annotate_text = Video.get_annotation() # initial text
+                self._annotator.update(camera, self.is_night_mode())
                 # start video annotation thread
                 self._annot = threading.Thread(target=Video._annotate, args=[self, camera, f_is_enabled ])
                 self._annot.setDaemon(True)
                 self._annot.start()
             if self._quality > 0:
-                # values 1 (highest quality) to 40 (lowest quality), with typical values between 20 and 25
                 self._log.info('camera quality: {}'.format(self._quality))
-                camera.start_recording(output_splitter, format='mjpeg', quality=self._quality)
-            else:
-                camera.start_recording(output_splitter, format='mjpeg')
+            self._start_recording(camera, output_splitter)
             # ............
             try:
                 if self._enable_streaming:
                     if self._server is None:
                         self._log.info('starting streaming server...')
                         address = ('', self._port)
-                        self._server = StreamingServer(address, StreamingHandler, f_is_enabled)
+                        _page = get_page(self._width, self._height).encode('utf-8')
+                        if self._server_mode == 'asyncio':
+                            self._server = AsyncStreamingServer(address, f_is_enabled, output_splitter.frames, _page, self._clients,
+                                    variants=self._variants, resources=self._resources)
+                        else:
+                            self._server = StreamingServer(address, StreamingHandler, f_is_enabled, output_splitter.frames, _page, self._clients,
+                                    self._variants, self._resources)
                         self._killer = lambda: self.close(camera, output_splitter)
                         self._server.serve_forever()
                     else:
@@ -184,55 +623,51 @@ class Video():
             Update the video annotation every second.
         '''
         self._camera = camera
-        _count = 0
         while f_is_enabled():
-#           _count = next(self._counter)
-            self._camera.annotate_text = Video.get_annotation()
-#           if ( _count % 5 ) == 0: # every five seconds
-            self.set_night_mode(camera, self.is_night_mode())
-            time.sleep(1.0)
+            with _ANNOTATE_TIMER.time():
+                self._annotator.update(camera, self.is_night_mode())
+            time.sleep(self._annotator.delay())
+
+    # ..........................................................................
+    async def _annotate_async(self, camera):
+        '''
+            Update the video annotation every second, as a task; while the
+            camera is idle only every 'idle_annotate_sec', or not at all if
+            it is stopped.
+        '''
+        while self._enabled:
+            _idle = self._duty_cycle is not None and self._duty_cycle.idle
+            if not _idle or self._idle_mode == 'low':
+                with _ANNOTATE_TIMER.time():
+                    self._annotator.update(camera, self.is_night_mode())
+            await asyncio.sleep(self._idle_annotate_sec if _idle else self._annotator.delay())
 
     # ..........................................................................
     def set_night_mode(self, camera, enabled):
-        # NOTE: setting 'iso' overrides exposure mode
+        '''
+        Sets night or day mode on the camera, writing only the properties
+        that have changed. NOTE: setting 'iso' overrides exposure mode.
+        '''
         _compass_calibrated = False # True if self._compass and self._compass.is_calibrated() else False
-        if enabled:
-            self._log.debug('night mode.')
-#           camera.exposure_mode = 'nightpreview'
-            '''
-                off
-                auto: use automatic exposure mode
-                night: select setting for night shooting
-                nightpreview:
-                backlight: select setting for backlit subject
-                spotlight:
-                sports: select setting for sports (fast shutter etc.)
-                snow: select setting optimised for snowy scenery
-                beach: select setting optimised for beach
-                verylong: select setting for long exposures
-                fixedfps: constrain fps to a fixed value
-                antishake: antishake mode
-                fireworks: select setting optimised for fireworks
-
-                source: https://www.raspberrypi.org/documentation/raspbian/applications/camera.md
-            '''
-            camera.iso = 800
-            camera.led = False
-            camera.annotate_foreground = Color.from_string('#ffdada')
-            if _compass_calibrated:
-                camera.annotate_background = Color.from_string('#440000')
-            else:
-                camera.annotate_background = Color.from_string('#440088')
-        else:
-            self._log.debug('day mode.')
-            camera.iso = 100
-#           camera.exposure_mode = 'off'
-            camera.led = True
-            camera.annotate_foreground = Color.from_string('#111111')
-            if _compass_calibrated:
-                camera.annotate_background = Color.from_string('#ffffff')
-            else:
-                camera.annotate_background = Color.from_string('#ffff00')
+#       camera.exposure_mode = 'nightpreview' if enabled else 'off'
+        '''
+            off
+            auto: use automatic exposure mode
+            night: select setting for night shooting
+            nightpreview:
+            backlight: select setting for backlit subject
+            spotlight:
+            sports: select setting for sports (fast shutter etc.)
+            snow: select setting optimised for snowy scenery
+            beach: select setting optimised for beach
+            verylong: select setting for long exposures
+            fixedfps: constrain fps to a fixed value
+            antishake: antishake mode
+            fireworks: select setting optimised for fireworks
+
+            source: https://www.raspberrypi.org/documentation/raspbian/applications/camera.md
+        '''
+        self._annotator.set_mode(camera, enabled, _compass_calibrated)
 
     # ..........................................................................
     def is_enabled(self):
@@ -241,30 +676,109 @@ class Video():
     # ..........................................................................
     @property
     def active(self):
-        return self._thread is not None
+        return self._thread is not None or self._task is not None
 
     # ..........................................................................
     def start(self):
-        if self._thread is not None:
+        if self._thread is not None or self._task is not None:
             self._log.info('video already started.')
             return
         self._log.info('start.')
+        if self._enable_duty_cycle:
+            self._log.warning('the camera is duty cycled only when run on an event loop.')
         self._enabled = True
-        if not os.path.isdir(self._dirname):
-            os.makedirs(self._dirname)
-        if self._enable_file_output:
-            self._filename = os.path.join(self._dirname, self._basename + '_' + self._get_timestamp() + '.h264')
-        else:
-            self._filename = None
-        _output = OutputSplitter(self._filename)
+        _output = self._open_output()
         self._thread = threading.Thread(target=Video._start, args=[self, _output, lambda: self.is_enabled(), ])
         self._thread.setDaemon(True)
         self._thread.start()
         _ip = self.get_ip_address()
         self._log.info(Fore.MAGENTA + Style.BRIGHT + 'video started on:\thttp://{}:{:d}/'.format(_ip, self._port))
 
+    # ..........................................................................
+    def _open_output(self):
+        '''
+        Create the output splitter and, if writing to file, the file writer,
+        segment finaliser, retention manager and event recorder behind it.
+        '''
+        if not os.path.isdir(self._dirname):
+            os.makedirs(self._dirname)
+        if self._enable_file_output and ( self._retention_max_bytes or self._retention_max_age_sec or self._retention_min_free_bytes ):
+            if self._retention is None:
+                self._retention = RetentionManager(self._dirname, [ self._basename + '_*.h264', self._basename + '_*.mp4' ],
+                        self._retention_max_bytes, self._retention_max_age_sec, self._retention_min_free_bytes)
+            self._retention.enforce()
+        if self._convert_mp4:
+            self._finaliser = SegmentFinaliser(self._framerate, self._remove_h264, self._finaliser_workers, self._on_file_converted)
+            self._finaliser.recover(self._dirname, self._basename + '_*.h264')
+        if self._enable_file_output:
+            self._writer = FileWriter(self._writer_block_size, self._writer_blocks, self._writer_policy, f_on_close=self._on_file_closed)
+        if self._enable_file_output and self._record_mode == 'continuous':
+            self._filename = self._get_output_filename()
+            _output = OutputSplitter(self._filename, self._frame_slots, self._frame_capacity, self._writer,
+                    self._segment_sec, self._segment_bytes, self._get_output_filename)
+        else:
+            self._filename = None
+            _output = OutputSplitter(None, self._frame_slots, self._frame_capacity)
+        if self._enable_file_output and self._record_mode == 'event':
+            self._recorder = EventRecorder(_output.frames, self._writer, self._get_output_filename,
+                    self._preroll_sec, self._preroll_bytes, self._quiet_period_sec)
+        if self._enable_thumbnail or self._enable_motion or self._enable_mail:
+            from lbr.thumbnailer import Thumbnailer
+            try:
+                self._thumbnailer = Thumbnailer(_output.frames, self._thumbnail_scale, self._thumbnail_quality)
+            except ImportError as e:
+                self._log.error('thumbnails and the motion and mail detectors are disabled: {}'.format(e))
+                self._enable_thumbnail = self._enable_motion = self._enable_mail = False
+        if self._enable_motion:
+            from lbr.motion_detector import MotionDetector
+            self._motion_detector = MotionDetector(self._thumbnailer, self._motion_sample_hz, self._motion_scale, self._motion_roi,
+                    self._motion_alpha, self._motion_threshold, self._motion_min_ratio, self._on_video_motion)
+            self._motion_detector.start()
+        if self._enable_mail:
+            from lbr.mail_detector import MailDetector
+            self._mail_detector = MailDetector(self._thumbnailer, self._thumbnail_scale, self._mail_blocks, self._mail_roi, self._mail_threshold,
+                    self._mail_min_ratio, self._mail_debounce, self._mail_settle_sec, self._mail_interval_sec, self._mail_baseline_file,
+                    self._on_mail_changed, self._wake_for_mail)
+            self._mail_detector.start()
+        self._output = _output
+        return _output
+
+    # ..........................................................................
+    def _close_output(self):
+        '''
+        Close the motion and mail detectors, event recorder, output splitter,
+        file writer and segment finaliser, in that order.
+        '''
+        if self._motion_detector is not None:
+            self._motion_detector.close()
+        if self._mail_detector is not None:
+            self._mail_detector.close()
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+        if self._output is not None:
+            print(Fore.GREEN + 'flushing and closing...' + Style.RESET_ALL)
+            self._filename = self._output.get_filename()
+            self._output.flush()
+            self._output.close()
+            self._output = None
+            print(Fore.GREEN + 'closed.' + Style.RESET_ALL)
+        if self._writer is not None:
+            self._writer.close(timeout=5.0)
+            self._log.info('file writer: {}'.format(self._writer.get_stats()))
+            self._writer = None
+        if self._finaliser is not None:
+            # the final segment was queued as the writer closed it; conversion continues in the background
+            self._finaliser.close()
+            self._finaliser = None
+
     # ..........................................................................
     def stop(self):
+        if self._task is not None:
+            # running on an event loop: run() completes the shutdown
+            self._enabled = False
+            self._loop.call_soon_threadsafe(self._stopped.set)
+            return
         if self._thread is None:
             self._log.info('video already stopped.')
             return
@@ -278,33 +792,84 @@ class Video():
         else:
             print(Fore.GREEN + 'NO KILLER.' + Style.RESET_ALL)
 
-        if self._output is not None:
-            print(Fore.GREEN + 'flushing and closing...' + Style.RESET_ALL)
-            self._output.flush()
-            self._output.close()
-            self._output = None
-            print(Fore.GREEN + 'closed.' + Style.RESET_ALL)
+        self._close_output()
         self._log.info('joining thread...')
         self._thread.join(timeout=1.0)
         self._thread = None
-        if self._convert_mp4:
-            self._convert_to_mp4()
         self._log.info('stopped.')
 
     # ..........................................................................
-    def _convert_to_mp4(self):
-        raise Exception('unsupported')
-        if os.path.exists(self._filename):
-            self._log.info('converting file {} to mp4...'.format(self._filename))
-            _mp4_filename = Path(self._filename).stem + ".mp4"
-            os.system('ffmpeg -loglevel panic -hide_banner -r {:d} -i {:s} -vcodec copy {:s}'.format(\
-                    self._framerate, self._filename, _mp4_filename))
-            self._log.info('mp4 conversion complete.')
-            if self._remove_h264:
-                os.remove(self._filename)
-                self._log.info('removed h264 video source.')
-        else:
-            self._log.warning('could not convert to mp4: file {} did not exist.'.format(self._filename))
+    async def run(self):
+        '''
+        The asyncio alternative to start(): runs the camera on the running
+        event loop until stop() is called, without threads of its own. The
+        annotation is a task, and in 'asyncio' server mode so is the streaming
+        server (a 'threaded' server still runs on an executor thread).
+
+        Upon stop() everything is shut down in order, each step completing
+        before the next: the server and its clients, the duty cycle, the
+        annotation, the camera, then the output and anything writing files.
+        '''
+        if self._thread is not None or self._task is not None:
+            self._log.info('video already started.')
+            return
+        self._loop    = asyncio.get_running_loop()
+        self._task    = asyncio.current_task()
+        self._stopped = asyncio.Event()
+        self._enabled = True
+        _output = self._open_output()
+        _annotation_task = None
+        _duty_cycle_task = None
+        _server_task = None
+        _server_future = None
+        try:
+            with self._hal.create_camera(self._resolution, self._framerate) as camera:
+                self._camera = camera
+                self._log.info('camera framerate: {}; ISO: {}; mode: {}'.format(camera.framerate, camera.iso, camera.exposure_mode))
+                if self._annotate:
+                    camera.annotate_text_size = 12
+                    self._annotator.update(camera, self.is_night_mode())
+                    _annotation_task = self._loop.create_task(self._annotate_async(camera))
+                self._start_recording(camera, _output)
+                if self._enable_duty_cycle:
+                    self._duty_cycle = DutyCycle(lambda idle: self._set_idle(camera, _output, idle), self._is_busy, self._idle_after_sec)
+                    _duty_cycle_task = self._loop.create_task(self._duty_cycle.run())
+                if self._enable_streaming:
+                    _address = ('', self._port)
+                    _page = get_page(self._width, self._height).encode('utf-8')
+                    if self._server_mode == 'asyncio':
+                        self._server = AsyncStreamingServer(_address, self.is_enabled, _output.frames, _page, self._clients,
+                                variants=self._variants, resources=self._resources)
+                        _server_task = self._loop.create_task(self._server.serve())
+                    else:
+                        self._server = StreamingServer(_address, StreamingHandler, self.is_enabled, _output.frames, _page, self._clients,
+                                self._variants, self._resources)
+                        _server_future = self._loop.run_in_executor(None, self._server.serve_forever)
+                    self._log.info(Fore.MAGENTA + Style.BRIGHT + 'video started on:\thttp://{}:{:d}/'.format(self.get_ip_address(), self._port))
+                await self._stopped.wait()
+                self._log.info('stopping video capture on file: {}'.format(_output.get_filename()))
+                # ordered shutdown
+                if _server_task is not None:
+                    self._server.shutdown()
+                    await _server_task
+                elif _server_future is not None:
+                    await self._loop.run_in_executor(None, self._server.shutdown)
+                    await _server_future
+                    self._server.server_close()
+                self._server = None
+                if _duty_cycle_task is not None:
+                    self._duty_cycle.stop()
+                    await _duty_cycle_task
+                    self._log.info('duty cycle: {}'.format(self._duty_cycle.get_stats()))
+                if _annotation_task is not None:
+                    _annotation_task.cancel()
+                    await asyncio.gather(_annotation_task, return_exceptions=True)
+                if camera.recording:
+                    camera.stop_recording()
+        finally:
+            await self._loop.run_in_executor(None, self._close_output)
+            self._task = None
+            self._log.info('stopped.')
 
     # ..........................................................................
     def close(self, camera, output):
@@ -328,147 +893,4 @@ class Video():
             self._log.info('server shut down.')
         self._log.info(Fore.MAGENTA + Style.BRIGHT + 'video closed.')
 
-# ..............................................................................
-class OutputSplitter(object):
-    '''
-        An output (as far as picamera is concerned), is just a filename or an object
-        which implements a write() method (and optionally the flush() and close() methods)
-
-        If the filename parameter is None no file is written.
-    '''
-    def __init__(self, filename):
-        self.frame = None
-        self.buffer = io.BytesIO()
-        self._log = Logger('output', Level.INFO)
-        self._filename = filename
-        if self._filename:
-            self._output_file = io.open(filename, 'wb')
-            self._log.info(Fore.MAGENTA + 'output file: {}'.format(filename))
-        else:
-            self._output_file = None
-            self._log.info(Fore.MAGENTA + 'no output file generated from video.')
-        self._condition = Condition()
-        self._log.info('ready.')
-
-    def get_filename(self):
-        return self._filename
-
-    def write(self, buf):
-        if buf.startswith(b'\xff\xd8'):
-            # new frame, copy existing buffer's content and notify all clients it's available
-            self.buffer.truncate()
-            with self._condition:
-                self.frame = self.buffer.getvalue()
-                self._condition.notify_all()
-            self.buffer.seek(0)
-        if self._output_file and not self._output_file.closed:
-            self._output_file.write(buf)
-        return self.buffer.write(buf)
-
-    def flush(self):
-        self._log.debug('flushing...')
-        if self._output_file and not self._output_file.closed:
-            self._output_file.flush()
-        if not self.buffer.closed:
-            self.buffer.flush()
-        self._log.debug('flushed.')
-
-    def close(self):
-        self._log.info('closing...')
-        if self._output_file and not self._output_file.closed:
-            self._output_file.close()
-        if not self.buffer.closed:
-            self.buffer.close()
-        self._log.info('closed.')
-
-
-# ..............................................................................
-class StreamingHandler(server.BaseHTTPRequestHandler):
-
-    def __init__(self, socket, tup, server):
-        super().__init__(socket, tup, server)
-
-    # ..........................................................................
-    def get_page(self):
-        global video_width, video_height
-        return """<!DOCTYPE html>
-<html>
-<head>
-<title>LetterBox Robot</title>
-<style>
-  body {{ margin: 1em }}
-</style>
-</head>
-<body bgcolor='black'>
-<img src="stream.mjpg" width="{width_value}" height="{height_value}" />
-</body>
-</html>
-""".format(width_value=video_width, height_value=video_height)
-
-    # ..........................................................................
-    def do_GET(self):
-        global output
-        _output = output
-        if self.path == '/':
-            self.send_response(301)
-            self.send_header('Location', '/index.html')
-            self.end_headers()
-        elif self.path == '/index.html':
-            content = self.get_page().encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/html')
-            self.send_header('Content-Length', len(content))
-            self.end_headers()
-            self.wfile.write(content)
-        elif self.path == '/stream.mjpg':
-            self.send_response(200)
-            self.send_header('Age', 0)
-            self.send_header('Cache-Control', 'no-cache, private')
-            self.send_header('Pragma', 'no-cache')
-            self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=FRAME')
-            self.end_headers()
-            try:
-                while True:
-                    with _output._condition:
-                        _output._condition.wait()
-                        frame = _output.frame
-                    self.wfile.write(b'--FRAME\r\n')
-                    self.send_header('Content-Type', 'image/jpeg')
-                    self.send_header('Content-Length', len(frame))
-                    self.end_headers()
-                    self.wfile.write(frame)
-                    self.wfile.write(b'\r\n')
-            except Exception as e:
-                logging.warning('removed streaming client %s: %s', self.client_address, str(e))
-        else:
-            self.send_error(404)
-            self.end_headers()
-
-# ..............................................................................
-class StreamingServer(socketserver.ThreadingMixIn, server.HTTPServer):
-    allow_reuse_address = True
-    daemon_threads = True
-
-    def __init__(self, address, streaming_handler, f_is_enabled):
-        super().__init__(address, streaming_handler)
-        self._log = Logger('server', Level.INFO)
-        self._enabled_flag = f_is_enabled
-        self._log.info('ready.')
-
-    # ..........................................................................
-    def serve_forever(self):
-        '''
-            Handle one request at a time until the enabled flag is False.
-        '''
-        self._log.info('begin serve_forever loop.')
-        super().serve_forever(poll_interval=0.5)
-#       while self._enabled_flag():
-#           self._log.info('serve_forever handling request...')
-#           self._log.info(Fore.YELLOW + 'type Ctrl-C to exit.')
-#           self.handle_request()
-        self._log.info('exited serve_forever loop.')
-
-
-
-
 #EOF
@@ -7,7 +7,7 @@
 #
 # author:   Murray Altheim
 # created:  2020-08-01
-# modified: 2021-06-20
+# modified: 2026-10-17
 #
 # Daemon for the Letterbox Robot (lbrd). This also uses the lbrd.service.
 #
@@ -19,14 +19,23 @@ try:
     import daemon
     from daemon import pidfile
 except Exception:
-    sys.exit("This script requires the python-daemon module.\nInstall with: pip3 install --user python-daemon")
+    daemon = None # required only to run as a daemon
 from pathlib import Path
-import os, time, traceback
+import os, json, time, signal, asyncio, traceback
 from datetime import datetime
 
 from core.config_loader import ConfigLoader
+from core.event import Event, EventType
+from core.message_bus import MessageBus
+from lbr.hal import Hal
 from lbr.pir_switch import PirSwitch
+from lbr.mag_switch import Door, MagneticSwitch
+from lbr.controller import Controller
+from lbr.telemetry import Telemetry
+from lbr.history import History
 from core.logger import Logger, Level
+from core.timers import Timers
+from core.profiler import SamplingProfiler
 
 PIDFILE = '/home/pi/letterbox-robot/.lbrd.pid'
 
@@ -38,6 +47,32 @@ def shutdown(signum, frame):  # signum and frame are mandatory
 class LetterboxRobotDaemon():
     '''
     The daemon controlling the Letterbox Robot (PirSwitch) application.
+
+    The run() coroutine runs everything on a single asyncio event loop: the
+    PIR is driven by loop callbacks, the camera's annotation and streaming
+    server are tasks, and callbacks from hardware threads (GPIO edges, the
+    door switch) are passed to the loop with call_soon_threadsafe(). The
+    enable() and close() methods instead run each device on its own threads.
+
+    If 'use_message_bus' is configured the devices are not wired directly
+    to each other: the PIR, the door switch and a housekeeping timer
+    publish events on a MessageBus, and the Controller subscribes to them,
+    driving the HT0740 switch, the light and the camera.
+
+    If 'telemetry' is configured the PIR count, the switch, the door and
+    stream clients are recorded to JSON-lines files for later analysis. If
+    'history' is configured the PIR, door and light are also kept in an
+    SQLite database with per-minute, hour and day rollups.
+
+    The PIR count, the switch and the door are included in the '/status'
+    and '/metrics' resources of the video streaming server.
+
+    The hot paths are timed by Timers, enabled from startup if 'timing' is
+    configured, or while profiling. If 'profile' is configured a SIGUSR1, or
+    a POST to '/profile/start' then to '/profile/stop' on the streaming
+    server, starts and stops a SamplingProfiler, which writes the stacks
+    sampled as a flamegraph file; '/profile' returns its state and the
+    timings.
     '''
     def __init__(self, config, level):
         self._log = Logger("lbrd", level)
@@ -46,11 +81,65 @@ class LetterboxRobotDaemon():
             raise ValueError('no configuration provided.')
         self._log.info('configuration provided.')
         self._config = config
-#       _toggle_pin  = self._config.get('toggle_pin')
-        # TODO
-        _pin = 24
-        _i2c_address = 0x38
-        self._pir = PirSwitch(_pin, _i2c_address, Level.INFO)
+        _config = self._config['ros'].get('lbrd')
+        # the hardware, or its simulation
+        self._hal = Hal(self._config, level)
+        # structured records of activity, if configured
+        self._telemetry = None
+        if _config.get('telemetry'):
+            self._telemetry = Telemetry(_config.get('telemetry_dir', 'telemetry'), _config.get('telemetry_max_bytes', 4194304),
+                    _config.get('telemetry_max_files', 0), _config.get('telemetry_sync_sec', 10.0), level=level)
+        self._history = None
+        if _config.get('history'):
+            self._history = History(_config.get('history_file', 'history.db'), _config.get('history_sync_sec', 30.0),
+                    _config.get('history_retention'), level)
+        # timing of the hot paths, and the profiler
+        if _config.get('timing'):
+            Timers.enable(True)
+        self._profiler = None
+        if _config.get('profile'):
+            self._profiler = SamplingProfiler(_config.get('profile_dir', 'profiles'), _config.get('profile_interval_sec', 0.01), level)
+        # the message bus, if used, connecting the sensors to the controller
+        self._bus = None
+        if _config.get('use_message_bus'):
+            self._bus = MessageBus(_config.get('message_bus_size', 100), level)
+            self._bus.publish_every(self._hal.scale(_config.get('housekeeping_sec', 60.0)), EventType.TICK)
+        # the camera, triggered to record by motion or the door opening
+        self._video = None
+        if _config.get('enable_video'):
+            from lbr.video import Video
+            self._video = Video(self._config, level, self._hal, self._bus, self._telemetry)
+        self._light = None
+        if _config.get('enable_light'):
+            from lbr.light import Light
+            self._light = Light(self._config, level, self._hal.gpio, self._history)
+        _pin = _config.get('pir_pin')
+        _i2c_address = _config.get('switch_address')
+        self._pir = PirSwitch(_pin, _i2c_address, level=level, motion_callback=None if self._bus else self._motion_detected,
+                mode=_config.get('pir_mode', 'poll'), gpio=self._hal.gpio, switch=self._hal.create_switch(_i2c_address),
+                tick_sec=self._hal.scale(1.0), revalidate_sec=self._hal.scale(_config.get('switch_revalidate_sec', 60.0)),
+                message_bus=self._bus, telemetry=self._telemetry, history=self._history)
+        self._door = None
+        if _config.get('enable_door'):
+            self._door = MagneticSwitch(_config.get('door_pin'), self._on_door_callback, level, self._hal.gpio)
+        if self._video:
+            self._video.add_status('pir', self._pir.get_status)
+            if self._door:
+                self._video.add_status('door', self._door.get_status)
+            self._video.add_status('timing', Timers.get_status)
+            if self._profiler:
+                self._video.add_resource('GET', '/profile', self._get_profile)
+                self._video.add_resource('POST', '/profile/start', self._start_profile)
+                self._video.add_resource('POST', '/profile/stop', self._stop_profile)
+        self._controller = None
+        if self._bus:
+            _confirm_sec = self._hal.scale(_config.get('confirm_motion_sec', 0.0))
+            if _confirm_sec > 0.0 and not ( self._video and self._config['ros']['video'].get('motion_detect') ):
+                self._log.warning('pir motion cannot be confirmed without video motion detection: not required.')
+                _confirm_sec = 0.0
+            self._controller = Controller(self._bus, self._pir, self._light, self._video, level, _confirm_sec)
+        self._loop = None
+        self._stop_event = None
 
         # OS considerations ..........................
         _rosd_mask = os.umask(0)
@@ -68,6 +157,57 @@ class LetterboxRobotDaemon():
     def _get_timestamp(self):
         return datetime.utcfromtimestamp(datetime.utcnow().timestamp()).isoformat()
 
+    # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
+    def _motion_detected(self):
+        if self._video:
+            self._video.trigger('pir')
+
+    # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
+    def _on_door_callback(self, state, elapsed_sec):
+        '''
+        Called on the GPIO library's thread; published on the message bus if
+        used, otherwise passed to the event loop if running.
+        '''
+        if self._telemetry:
+            self._telemetry.record('door', 'open' if state is Door.OPEN else 'closed', elapsed_sec=round(elapsed_sec, 3))
+        if self._history:
+            self._history.door(state is Door.OPEN, elapsed_sec)
+        if self._bus:
+            self._bus.publish(Event(EventType.DOOR_OPEN if state is Door.OPEN else EventType.DOOR_CLOSED, elapsed_sec))
+        elif self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._door_changed, state, elapsed_sec)
+            except RuntimeError: # loop closed during shutdown
+                pass
+        else:
+            self._door_changed(state, elapsed_sec)
+
+    # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
+    def _door_changed(self, state, elapsed_sec):
+        # a closing door also extends the clip, to capture the quiet period after it
+        if self._video:
+            self._video.set_door_open(state is Door.OPEN)
+            self._video.trigger('door {}'.format(state.name))
+
+    # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
+    def _get_profile(self):
+        _profile = { 'profiler': self._profiler.get_stats(), 'timing': Timers.enabled, 'timers': Timers.get_stats() }
+        return 'application/json', json.dumps(_profile).encode('utf-8')
+
+    # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
+    def _start_profile(self):
+        self._profiler.start()
+        return self._get_profile()
+
+    # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
+    def _stop_profile(self):
+        '''
+        Stop the profiler, returning the collapsed stacks it wrote.
+        '''
+        if self._profiler.stop() is None:
+            return None # not started
+        return 'text/plain; charset=utf-8', self._profiler.get_collapsed().encode('utf-8')
+
     # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
     def _set_pi_leds(self, enable):
         '''
@@ -91,8 +231,77 @@ class LetterboxRobotDaemon():
             self._log.warning('could not change state of LEDs: does not appear to be a Raspberry Pi.')
 
     # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
+    async def run(self):
+        '''
+        Run the daemon on the running event loop until stop() is called or
+        a SIGTERM or SIGINT is received, then shut down in order: inputs
+        first so that nothing new is triggered, then the message bus once
+        it has dispatched the events already published, then the camera and
+        its files, then the switch.
+        '''
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        for _signal in ( signal.SIGTERM, signal.SIGINT ):
+            try:
+                self._loop.add_signal_handler(_signal, self._stop_event.set)
+            except (ValueError, RuntimeError): # not on the main thread
+                pass
+        if self._profiler:
+            try:
+                self._loop.add_signal_handler(signal.SIGUSR1, self._profiler.toggle)
+            except (ValueError, RuntimeError):
+                pass
+        _bus_task = None
+        if self._bus:
+            _bus_task = self._loop.create_task(self._bus.run())
+            await asyncio.sleep(0) # let the bus start on the loop before the inputs do
+        _video_task = self._loop.create_task(self._video.run()) if self._video else None
+        self._pir.enable(self._loop)
+        self._hal.start()
+        self._log.info('🍏 letterbox robot daemon enabled at: {}'.format(self._get_timestamp()))
+        try:
+            await self._stop_event.wait()
+        finally:
+            self._log.info('shutting down...')
+            self._hal.close()
+            self._pir.disable()
+            if self._door:
+                self._door.close()
+            if _bus_task:
+                self._bus.stop()
+                await _bus_task
+            if _video_task:
+                self._video.stop()
+                await _video_task
+            self._pir.close()
+            if self._light:
+                self._light.close()
+            if self._telemetry:
+                self._telemetry.close()
+            if self._history:
+                self._history.close()
+            if self._profiler:
+                self._profiler.stop()
+            self._set_pi_leds(True)
+            self._loop = None
+            self._log.info('🍎 letterbox robot daemon closed at: {}'.format(self._get_timestamp()))
+
+    # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
+    def stop(self):
+        '''
+        Stop run(). This is safe to call from any thread.
+        '''
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
     def enable(self):
+        if self._bus:
+            self._bus.start()
+        if self._video:
+            self._video.start()
         self._pir.enable()
+        self._hal.start()
         self._log.info('🍏 letterbox robot daemon enabled at: {}'.format(self._get_timestamp()))
 
     # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
@@ -101,8 +310,23 @@ class LetterboxRobotDaemon():
 
     # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
     def close(self):
+        self._hal.close()
         self._pir.disable()
+        if self._door:
+            self._door.close()
+        if self._bus:
+            self._bus.close()
+        if self._video:
+            self._video.stop()
         self._pir.close()
+        if self._light:
+            self._light.close()
+        if self._telemetry:
+            self._telemetry.close()
+        if self._history:
+            self._history.close()
+        if self._profiler:
+            self._profiler.stop()
         self._set_pi_leds(True)
         self._log.info('🍎 letterbox robot daemon closed at: {}'.format(self._get_timestamp()))
 
@@ -118,37 +342,35 @@ def main():
         _loader = ConfigLoader(Level.INFO)
         filename = 'config.yaml'
         _config = _loader.configure(filename)
+        if _config['ros'].get('lbrd').get('log_queue', False):
+            Logger.start_queue(_config['ros'].get('lbrd').get('log_queue_size', 10000))
         _daemon = LetterboxRobotDaemon(_config, Level.INFO)
-        _daemon.enable()
-        while True:
-            _log.debug('main loop...')
-            time.sleep(5.0)
+        # runs until SIGTERM or SIGINT, then closes the daemon
+        asyncio.run(_daemon.run())
 
     except KeyboardInterrupt:
         _log.info("caught Ctrl-C.")
     except Exception:
-        print('error starting lbrd daemon: {}'.format(traceback.format_exc()))
+        print('error running lbrd daemon: {}'.format(traceback.format_exc()))
     finally:
-        _log.info("closing...")
-        if _daemon:
-            try:
-                _daemon.close()
-            except Exception:
-                print('error closing lbrd daemon.')
+        Logger.stop_queue()
         print('lbrd complete.')
 
 # ┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈
-with daemon.DaemonContext(
-    stdout=sys.stdout,
-    stderr=sys.stderr,
-#   chroot_directory=None,
-    working_directory='/home/pi/letterbox-robot',
-    umask=0o002,
-    pidfile=pidfile.TimeoutPIDLockFile(PIDFILE), ) as context:
-#   signal_map={
-#       signal.SIGTERM: shutdown,
-#       signal.SIGTSTP: shutdown
-#   }) as context:
-    main()
+if __name__== "__main__":
+    if daemon is None:
+        sys.exit("This script requires the python-daemon module.\nInstall with: pip3 install --user python-daemon")
+    with daemon.DaemonContext(
+        stdout=sys.stdout,
+        stderr=sys.stderr,
+#       chroot_directory=None,
+        working_directory='/home/pi/letterbox-robot',
+        umask=0o002,
+        pidfile=pidfile.TimeoutPIDLockFile(PIDFILE), ) as context:
+#       signal_map={
+#           signal.SIGTERM: shutdown,
+#           signal.SIGTSTP: shutdown
+#       }) as context:
+        main()
 
 #EOF
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Benchmarks the whole letterbox robot daemon off the Pi, using the 'sim'
+# hardware backend: the PIR and door follow the scripted traces in the
+# configuration, the HT0740 counts its I²C transactions and the camera emits
+# synthetic frames, all at a multiple of real time. Event-mode video clips are
+# written to a temporary directory, and the camera is duty cycled (idled while
+# nothing needs it) unless --no-duty-cycle is given. With --confirm-motion the
+# PIR must be confirmed by motion detected in the video. Telemetry and the
+# history are written to a temporary directory and summarised. By default the daemon runs on a
+# single asyncio event loop; with --threaded each device runs its own
+# threads, e.g.:
+#
+#   % python3 lbrd_bench.py --time-scale 10 --duration 120
+#   % python3 lbrd_bench.py --time-scale 10 --duration 120 --threaded
+#
+
+import os, sys, time, shutil, asyncio, argparse, resource, tempfile, threading
+from colorama import init, Fore, Style
+init()
+
+from core.config_loader import ConfigLoader
+from core.logger import Level, Logger
+from lbr.telemetry import Telemetry
+from lbr.history import History
+from lbrd import LetterboxRobotDaemon
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='benchmark the letterbox robot daemon with simulated hardware.')
+    _parser.add_argument('--time-scale', type=float, default=10.0, help='multiple of real time')
+    _parser.add_argument('--duration',   type=float, default=120.0, help='simulated seconds to run')
+    _parser.add_argument('--no-video',   action='store_true', help='disable the camera')
+    _parser.add_argument('--threaded',   action='store_true', help='run each device on its own threads rather than one event loop')
+    _parser.add_argument('--streaming',  action='store_true', help='enable the (asyncio) streaming server on port 8001')
+    _parser.add_argument('--no-duty-cycle', action='store_true', help='keep the camera at full resolution and framerate throughout')
+    _parser.add_argument('--confirm-motion', action='store_true', help='detect motion in the video, required to confirm the PIR')
+    _args = _parser.parse_args(argv)
+
+    _log = Logger('lbrd-bench', Level.INFO)
+    _config = ConfigLoader(Level.WARN).configure('config.yaml')
+    _config['ros']['hal']['backend']    = 'sim'
+    _config['ros']['hal']['time_scale'] = _args.time_scale
+    _config['ros']['lbrd']['enable_door']  = True
+    _config['ros']['lbrd']['enable_video'] = not _args.no_video
+    _dirname = tempfile.mkdtemp()
+    _telemetry_dirname = tempfile.mkdtemp()
+    _config['ros']['lbrd']['telemetry']     = True
+    _config['ros']['lbrd']['telemetry_dir'] = _telemetry_dirname
+    _config['ros']['lbrd']['history']       = True
+    _config['ros']['lbrd']['history_file']  = os.path.join(_telemetry_dirname, 'history.db')
+    _video_config = _config['ros']['video']
+    _video_config['enable_streaming']   = _args.streaming
+    _video_config['server']             = 'asyncio'
+    _video_config['enable_file_output'] = True
+    _video_config['record_mode']        = 'event'
+    _video_config['convert_mp4']        = False
+    _video_config['dirname']            = _dirname
+    _video_config['duty_cycle']         = not _args.no_duty_cycle
+    _video_config['motion_detect']      = _args.confirm_motion
+    if _args.confirm_motion:
+        _config['ros']['lbrd']['confirm_motion_sec'] = 3.0
+
+    _daemon = LetterboxRobotDaemon(_config, Level.WARN)
+    _real_duration = _args.duration / _args.time_scale
+    _log.info('running {:5.1f} simulated seconds at {:4.1f}x ({:5.1f}s), {}...'.format(_args.duration, _args.time_scale, _real_duration,
+            'threaded' if _args.threaded else 'on one event loop'))
+    _threads = 0
+    _usage_start = resource.getrusage(resource.RUSAGE_SELF)
+    _start = time.perf_counter()
+    if _args.threaded:
+        _daemon.enable()
+        while time.perf_counter() - _start < _real_duration:
+            time.sleep(0.1)
+            _threads = max(_threads, threading.active_count())
+        _elapsed = time.perf_counter() - _start
+        _pir_stats = _daemon._pir.get_stats()
+        _duty_stats = None
+        _daemon.close()
+    else:
+        async def _run():
+            nonlocal _threads, _elapsed, _pir_stats, _duty_stats
+            _task = asyncio.get_running_loop().create_task(_daemon.run())
+            while time.perf_counter() - _start < _real_duration:
+                await asyncio.sleep(0.1)
+                _threads = max(_threads, threading.active_count())
+            _elapsed = time.perf_counter() - _start
+            _pir_stats = _daemon._pir.get_stats()
+            _duty_stats = _daemon._video.get_duty_cycle_stats() if _daemon._video else None
+            _daemon.stop()
+            await _task
+        _elapsed = 0.0
+        _pir_stats = None
+        _duty_stats = None
+        asyncio.run(_run())
+    _shutdown = time.perf_counter() - _start - _elapsed
+    _usage = resource.getrusage(resource.RUSAGE_SELF)
+    _cpu = ( _usage.ru_utime + _usage.ru_stime ) - ( _usage_start.ru_utime + _usage_start.ru_stime )
+    _switches = ( _usage.ru_nvcsw + _usage.ru_nivcsw ) - ( _usage_start.ru_nvcsw + _usage_start.ru_nivcsw )
+    _hal = _daemon._hal
+
+    _log.info('elapsed: {:5.2f}s; cpu: {:5.2f}s ({:4.1f}% of one core); max threads: {:d}; shutdown: {:5.3f}s'.format(
+            _elapsed, _cpu, 100.0 * _cpu / _elapsed, _threads, _shutdown))
+    _log.info('context switches: {:d} ({:5.1f}/s); max resident memory: {:5.1f}MB'.format(
+            _switches, _switches / _elapsed, _usage.ru_maxrss / 1024.0))
+    _log.info('pir: {:d} edges, {:d} ticks; HT0740: {:d} I²C transactions ({:d} reads, {:d} writes avoided).'.format(
+            _pir_stats['edges'], _pir_stats['ticks'], sum(_switch.transactions for _switch in _hal.switches),
+            _pir_stats['reads_avoided'], _pir_stats['writes_avoided']))
+    if _daemon._bus is not None:
+        _bus_stats = _daemon._bus.get_stats()
+        _log.info('message bus: {:d} events published, {:d} dispatched ({:d} coalesced, {:d} dropped).'.format(
+                _bus_stats['published'], _bus_stats['dispatched'], _bus_stats['coalesced'], _bus_stats['dropped']))
+    if _hal.camera is not None:
+        _clips = sorted(os.listdir(_dirname))
+        _frames = _hal.camera.frames
+        _log.info('camera: {:d} frames ({:5.1f} simulated fps); clips recorded: {:d} ({:d} bytes).'.format(
+                _frames, _frames / _args.duration, len(_clips), sum(os.path.getsize(os.path.join(_dirname, _clip)) for _clip in _clips)))
+    _motion_stats = _daemon._video.get_motion_stats() if _daemon._video else None
+    if _motion_stats:
+        _log.info('video motion: {:d} frames analysed, {:d} with motion; cpu {:5.3f}s ({:4.2f}% of one core).'.format(
+                _motion_stats['samples'], _motion_stats['motion'], _motion_stats['cpu_sec'], _motion_stats['cpu_percent']))
+    if _daemon._controller is not None and _args.confirm_motion:
+        _controller_stats = _daemon._controller.get_stats()
+        _log.info('pir triggers: {:d} confirmed by video, {:d} rejected.'.format(_controller_stats['confirmed'], _controller_stats['rejected']))
+    if _duty_stats:
+        _log.info('camera duty cycle: idle {:4.1f}% of the time; idled {:d} times, resumed {:d}; max resume: {:5.1f}ms.'.format(
+                100.0 * _duty_stats['idle_sec'] / _elapsed, _duty_stats['idled'], _duty_stats['resumed'], 1000.0 * _duty_stats['max_resume_sec']))
+    _records = {}
+    for _record in Telemetry.read(_telemetry_dirname):
+        _key = '{} {}'.format(_record['src'], _record['ev'])
+        _records[_key] = _records.get(_key, 0) + 1
+    _log.info('telemetry: {:d} records: {}.'.format(sum(_records.values()), ', '.join('{} {:d}'.format(_key, _count)
+            for _key, _count in sorted(_records.items()))))
+    _history = History(os.path.join(_telemetry_dirname, 'history.db'), level=Level.WARN)
+    _hours = _history.get_rollups('hour')
+    _history.close()
+    _log.info('history: {:d} hourly rollups; {:d} motion, {:d} door opens ({:4.1f}s open), light on {:4.1f}s.'.format(len(_hours),
+            sum(_hour['motion'] for _hour in _hours), sum(_hour['door_opens'] for _hour in _hours),
+            sum(_hour['open_sec'] for _hour in _hours), sum(_hour['light_on_sec'] for _hour in _hours)))
+    shutil.rmtree(_dirname)
+    shutil.rmtree(_telemetry_dirname)
+    _log.info(Fore.GREEN + 'complete.')
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Benchmarks the Logger: the calls per second of a message suppressed by the
+# level (e.g., a per-tick debug() at INFO), as now and as formerly (formatted
+# under the mutex and then dropped), and of an enabled message written on
+# the calling thread and in queue mode, from one and from several threads,
+# and the messages of such a flood dropped by the bounded queue. Messages
+# are written to /dev/null so that the console is not measured, e.g.:
+#
+#   % python3 logger_bench.py --calls 200000
+#
+
+import os, sys, time, logging, argparse, threading
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+
+# ..............................................................................
+def rate(f_call, calls, threads=1):
+    '''
+    Returns the calls per second of the function made 'calls' times on each
+    of 'threads' threads.
+    '''
+    def _run():
+        for _ in range(calls):
+            f_call()
+    _threads = [ threading.Thread(target=_run) for _ in range(threads) ]
+    _start = time.perf_counter()
+    for _thread in _threads:
+        _thread.start()
+    for _thread in _threads:
+        _thread.join()
+    return calls * threads / ( time.perf_counter() - _start )
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='benchmark the logger.')
+    _parser.add_argument('--calls',   type=int, default=100000, help='calls made for each measurement')
+    _parser.add_argument('--threads', type=int, default=4, help='threads logging concurrently')
+    _parser.add_argument('--bound',   type=int, default=10000, help='the bound of the log queue when flooded')
+    _args = _parser.parse_args(argv)
+    _log = Logger('logger-bench', Level.INFO)
+
+    _devnull = open(os.devnull, 'w')
+    _logger = Logger('bench-target', Level.INFO)
+    _logger._sh.setStream(_devnull)
+    _value = 0.5
+
+    # a suppressed message
+    _lock = threading.Lock()
+    _inner = logging.getLogger('bench-target')
+    def _former_debug():
+        with _lock:
+            _inner.debug('{}{} : {}{}'.format(Fore.BLUE, 'DEBUG', 'pir sensor value: {}'.format(_value), Style.RESET_ALL))
+    _former = rate(_former_debug, _args.calls)
+    _now = rate(lambda: _logger.debug('pir sensor value: {}'.format(_value)), _args.calls)
+    _log.info('suppressed debug():   {:10,.0f} calls/s formerly, {:10,.0f} calls/s now ({:4.1f}x).'.format(_former, _now, _now / _former))
+
+    # an enabled message
+    for _threads in ( 1, _args.threads ):
+        _direct = rate(lambda: _logger.info('pir sensor value: {}'.format(_value)), _args.calls // _threads, _threads)
+        Logger.start_queue(_args.calls) # room for every message
+        _start = time.perf_counter()
+        _queued = rate(lambda: _logger.info('pir sensor value: {}'.format(_value)), _args.calls // _threads, _threads)
+        Logger.stop_queue()
+        _drained = _args.calls / ( time.perf_counter() - _start )
+        _log.info('enabled info(), {:d} thread{}: {:10,.0f} calls/s direct, {:10,.0f} calls/s queued ({:10,.0f}/s written).'.format(
+                _threads, ' ' if _threads == 1 else 's', _direct, _queued, _drained))
+
+    # a flood of messages against the bounded queue
+    _dropped = Logger.dropped()
+    Logger.start_queue(_args.bound)
+    rate(lambda: _logger.info('pir sensor value: {}'.format(_value)), _args.calls // _args.threads, _args.threads)
+    Logger.stop_queue()
+    _log.info('a flood of {:,d} messages on a queue of {:,d}: {:,d} dropped.'.format(_args.calls, _args.bound, Logger.dropped() - _dropped))
+
+    _devnull.close()
+    _log.info(Fore.GREEN + 'complete.')
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the MailDetector against synthetic frames of the letterbox floor: that
+# the empty box is learned, that mail is detected (debounced) after the door
+# closes, that a change of light is not taken as mail, that the baseline is
+# saved and reloaded, and that the state is served over HTTP by the streaming
+# server ('/mail', and a POST to '/mail/learn'). Reports the CPU time of an
+# evaluation. This does not require a camera, e.g.:
+#
+#   % python3 mail_detector_test.py --server asyncio
+#   % python3 mail_detector_test.py --server threaded
+#
+
+import io, os, sys, json, time, random, argparse, tempfile, threading
+from colorama import init, Fore, Style
+init()
+from PIL import Image, ImageDraw
+
+from core.logger import Level, Logger
+from lbr.frame_buffer import FrameBuffer
+from lbr.mail_detector import Mail, MailDetector
+from lbr.thumbnailer import Thumbnailer
+from lbr.stream import get_page, StreamClients, StreamingHandler, StreamingServer, AsyncStreamingServer
+from test_support import Checker, request, wait_for
+
+WIDTH, HEIGHT = 1600, 512
+
+# ..............................................................................
+def render(mail=False, light=0):
+    '''
+    Returns a JPEG of the floor of the letterbox: a textured gradient, with
+    an envelope on it if 'mail', brightened by 'light'.
+    '''
+    _random = random.Random(1)
+    _image = Image.linear_gradient('L').resize(( WIDTH, HEIGHT )).point(lambda v: 40 + v // 3)
+    _draw = ImageDraw.Draw(_image)
+    for _ in range(200):
+        _x, _y = _random.randrange(WIDTH), _random.randrange(HEIGHT)
+        _draw.ellipse([ _x, _y, _x + 12, _y + 12 ], fill=_random.randrange(30, 90))
+    if mail:
+        _draw.rectangle([ 500, 150, 900, 380 ], fill=220)
+    if light:
+        _image = _image.point(lambda v: min(255, v + light))
+    _buffer = io.BytesIO()
+    _image.convert('RGB').save(_buffer, format='JPEG', quality=85)
+    return _buffer.getvalue()
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='test the mail detector.')
+    _parser.add_argument('--server', choices=['threaded', 'asyncio'], default='asyncio', help='the server mode to test')
+    _parser.add_argument('--port',   type=int, default=18004, help='local port for the test server')
+    _args = _parser.parse_args(argv)
+    _log = Logger('mail-test', Level.INFO)
+
+    _scenes = { 'empty': render(), 'mail': render(mail=True), 'bright': render(light=40), 'bright-mail': render(mail=True, light=40) }
+    _scene = 'empty'
+    _enabled = True
+    _frames = FrameBuffer(4, 262144, Level.WARN)
+    def _produce():
+        while _enabled:
+            _frames.append(_scenes[_scene])
+            _frames.commit()
+            time.sleep(0.05)
+    threading.Thread(target=_produce, daemon=True).start()
+
+    _dirname = tempfile.mkdtemp()
+    _baseline_file = os.path.join(_dirname, 'mail_baseline.npz')
+    _changes = []
+    _thumbnailer = Thumbnailer(_frames, level=Level.WARN)
+    _detector = MailDetector(_thumbnailer, settle_sec=0.2, interval_sec=0.5, baseline_file=_baseline_file,
+            f_on_change=lambda state, ratio: _changes.append(state), level=Level.WARN)
+    _detector.start()
+
+    _resources = {
+        ( 'GET', '/mail' ):         lambda: ( 'application/json', json.dumps(_detector.get_state()).encode('utf-8') ),
+        ( 'POST', '/mail/learn' ):  lambda: ( _detector.learn(), ( 'application/json', json.dumps(_detector.get_state()).encode('utf-8') ) )[1]
+    }
+    _clients = StreamClients(2, 40, 20, Level.WARN)
+    _page = get_page(WIDTH, HEIGHT).encode('utf-8')
+    if _args.server == 'asyncio':
+        _server = AsyncStreamingServer(('127.0.0.1', _args.port), lambda: _enabled, _frames, _page, _clients, Level.WARN, resources=_resources)
+    else:
+        _server = StreamingServer(('127.0.0.1', _args.port), StreamingHandler, lambda: _enabled, _frames, _page, _clients, resources=_resources)
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+
+    _checker = Checker(_log)
+    _check = _checker.check
+
+    def _door_cycle(scene):
+        nonlocal _scene
+        _detector.set_door_open(True)
+        time.sleep(0.1)
+        _scene = scene
+        _detector.set_door_open(False)
+
+    _check(wait_for(lambda: _detector.state is Mail.ABSENT, 2.0) and os.path.isfile(_baseline_file),
+            'the empty letterbox was learned and saved.')
+    _door_cycle('mail')
+    _check(wait_for(lambda: _detector.state is Mail.PRESENT, 2.0), 'mail was detected after the door closed.')
+    _check(_changes == [ Mail.ABSENT, Mail.PRESENT ], 'each change of state was reported once.')
+    _status, _response, _body = request(_args.port, 'GET', '/mail')
+    _state = json.loads(_body) if _status == 200 else {}
+    _check(_response.getheader('Content-Type') == 'application/json' and _state.get('mail') == 'present', 'the state is served at /mail: {}'.format(_state))
+    _door_cycle('bright')
+    _check(wait_for(lambda: _detector.state is Mail.ABSENT, 2.0), 'the mail was collected, the box now more brightly lit.')
+    time.sleep(1.5) # a few slow evaluations
+    _check(_detector.state is Mail.ABSENT, 'a change of light is not taken as mail.')
+    _door_cycle('bright-mail')
+    _check(wait_for(lambda: _detector.state is Mail.PRESENT, 2.0), 'mail was detected in the brighter box.')
+
+    # a change between evaluations that does not persist is debounced
+    _stats = _detector.get_stats()
+    _door_cycle('bright')
+    time.sleep(0.25)
+    _scene = 'bright-mail'
+    time.sleep(1.0)
+    _check(_detector.state is Mail.PRESENT, 'a single differing evaluation does not change the state.')
+
+    _status, _, _ = request(_args.port, 'POST', '/mail/learn')
+    _check(_status == 200 and wait_for(lambda: _detector.state is Mail.ABSENT, 2.0), 'a POST to /mail/learn re-learned the box as empty.')
+    _status, _, _ = request(_args.port, 'POST', '/mail')
+    _check(_status == 404, 'other methods are not found.')
+
+    _stats = _detector.get_stats()
+    _log.info('{:d} evaluations ({:d} unavailable), {:d} changes; cpu {:5.3f}s, {:5.2f}ms per evaluation.'.format(_stats['evaluations'],
+            _stats['unavailable'], _stats['changes'], _stats['cpu_sec'], 1000.0 * _stats['cpu_sec'] / max(1, _stats['evaluations'])))
+    _detector.close()
+
+    _reloaded = MailDetector(_thumbnailer, baseline_file=_baseline_file, level=Level.WARN)
+    _check(not _reloaded.get_state()['learning'], 'the baseline was reloaded from its file.')
+
+    _enabled = False
+    _server.shutdown()
+    _server.server_close()
+    os.remove(_baseline_file)
+    os.rmdir(_dirname)
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Benchmarks the MessageBus: the throughput of events published on the loop,
+# with and without many subscribers to other event types (which, as dispatch
+# is indexed by type, should make no difference), and the latency from
+# publishing on another thread (as the PIR and door do) to dispatch on the
+# loop, as the median, p99 and maximum. This does not require the Pi, e.g.:
+#
+#   % python3 message_bus_bench.py --events 200000
+#
+
+import sys, time, asyncio, argparse
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from core.event import Event, EventType
+from core.message_bus import MessageBus
+
+# ..............................................................................
+def throughput(events, unrelated):
+    '''
+    Returns the events per second published and dispatched on the loop,
+    with one subscriber to the published types and 'unrelated' subscribers
+    to each of the other types.
+    '''
+    _bus = MessageBus(maxsize=events, level=Level.WARN)
+    _received = 0
+    def _on_event(event):
+        nonlocal _received
+        _received += 1
+    _types = [ EventType.DOOR_OPEN, EventType.PIR_ACTIVE ] # non-coalescing, so every event is dispatched
+    _bus.subscribe(_types, _on_event)
+    _others = [ _type for _type in EventType if _type not in _types ]
+    for i in range(unrelated):
+        _bus.subscribe(_others, lambda event: None)
+    async def _run():
+        _task = asyncio.get_running_loop().create_task(_bus.run())
+        await asyncio.sleep(0)
+        _start = time.perf_counter()
+        for i in range(events):
+            _bus.publish(Event(_types[i % 2]))
+            if i % 50 == 49:
+                await asyncio.sleep(0)
+        _bus.stop()
+        await _task
+        return time.perf_counter() - _start
+    _elapsed = asyncio.run(_run())
+    return _received / _elapsed, _received
+
+# ..............................................................................
+def latency(events, rate_hz):
+    '''
+    Returns the sorted latencies in seconds from publishing on a separate
+    thread, at the rate, to dispatch on the loop.
+    '''
+    _bus = MessageBus(level=Level.WARN)
+    _latencies = []
+    _bus.subscribe([ EventType.DOOR_OPEN, EventType.PIR_ACTIVE ],
+            lambda event: _latencies.append(time.monotonic() - event.timestamp))
+    _bus.start()
+    _period = 1.0 / rate_hz
+    _next = time.perf_counter()
+    for i in range(events):
+        _bus.publish(Event(EventType.DOOR_OPEN if i % 2 else EventType.PIR_ACTIVE))
+        _next += _period
+        _delay = _next - time.perf_counter()
+        if _delay > 0:
+            time.sleep(_delay)
+    _bus.close()
+    return sorted(_latencies)
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='benchmark the message bus.')
+    _parser.add_argument('--events',     type=int,   default=100000, help='events published for throughput')
+    _parser.add_argument('--unrelated',  type=int,   default=100, help='subscribers to other event types')
+    _parser.add_argument('--latency-events', type=int, default=2000, help='events published for latency')
+    _parser.add_argument('--rate',       type=float, default=1000.0, help='rate of publication for latency (Hz)')
+    _args = _parser.parse_args(argv)
+    _log = Logger('bus-bench', Level.INFO)
+
+    _rate, _count = throughput(_args.events, 0)
+    _log.info('throughput:  {:9.0f} events/s ({:d} dispatched), 1 subscriber.'.format(_rate, _count))
+    _unrelated_rate, _count = throughput(_args.events, _args.unrelated)
+    _log.info('throughput:  {:9.0f} events/s ({:d} dispatched), 1 subscriber plus {:d} to other types.'.format(
+            _unrelated_rate, _count, _args.unrelated))
+    _latencies = latency(_args.latency_events, _args.rate)
+    _n = len(_latencies)
+    _log.info('latency:     median {:6.3f}ms; p99 {:6.3f}ms; max {:6.3f}ms ({:d} events at {:5.0f}Hz from another thread).'.format(
+            1000.0 * _latencies[_n // 2], 1000.0 * _latencies[min(_n - 1, int(_n * 0.99))], 1000.0 * _latencies[-1], _n, _args.rate))
+    _log.info(Fore.GREEN + 'complete.')
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
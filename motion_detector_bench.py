@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Benchmarks the video MotionDetector over recorded frames: an MJPEG recording
+# (as written by Video, e.g., 'videos/lbr_*.h264') if given, otherwise frames
+# of the simulated camera at the configured resolution, a bar moving across a
+# still background. Reports the CPU time of decoding (as a thumbnail) and
+# analysing a frame at each scale, then runs the detector on its thread
+# against a FrameBuffer fed at the configured framerate and checks that it
+# holds under 10% of one core at the configured sample rate, e.g.:
+#
+#   % python3 motion_detector_bench.py
+#   % python3 motion_detector_bench.py --file videos/lbr_2026_10_17T10_00_00_000000.h264
+#
+
+import sys, time, argparse
+import numpy as np
+from colorama import init, Fore, Style
+init()
+
+from core.config_loader import ConfigLoader
+from core.logger import Level, Logger
+from lbr.frame_buffer import FrameBuffer
+from lbr.hal import SimCamera
+from lbr.motion_detector import MotionDetector
+from lbr.thumbnailer import Thumbnailer
+
+CPU_LIMIT_PERCENT = 10.0
+
+# ..............................................................................
+def read_frames(filename):
+    '''
+    Returns the JPEG frames of an MJPEG recording.
+    '''
+    with open(filename, 'rb') as _file:
+        _data = _file.read()
+    _frames = []
+    _start = _data.find(b'\xff\xd8')
+    while _start >= 0:
+        _end = _data.find(b'\xff\xd9', _start)
+        if _end < 0:
+            break
+        _frames.append(_data[_start:_end + 2])
+        _start = _data.find(b'\xff\xd8', _end + 2)
+    return _frames
+
+# ..............................................................................
+def time_analysis(frames, scale, repeats):
+    '''
+    Returns the mean CPU seconds taken to decode and analyse a frame at the
+    scale, and the mean motion ratio of the frames after the first.
+    '''
+    _detector = MotionDetector(None, scale=scale, level=Level.WARN)
+    _ratios = []
+    _cpu = time.thread_time()
+    for _ in range(repeats):
+        for _frame in frames:
+            _ratios.append(_detector.analyse(np.asarray(Thumbnailer.decode(_frame, scale))))
+    _cpu = time.thread_time() - _cpu
+    return _cpu / ( repeats * len(frames) ), sum(_ratios[1:]) / max(1, len(_ratios) - 1)
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='benchmark the video motion detector.')
+    _parser.add_argument('--file',    help='an MJPEG recording to use (default: simulated camera frames)')
+    _parser.add_argument('--seconds', type=float, default=10.0, help='seconds to run the detector live')
+    _parser.add_argument('--repeats', type=int, default=5, help='times each frame is analysed when timing')
+    _args = _parser.parse_args(argv)
+
+    _log = Logger('motion-bench', Level.INFO)
+    _config = ConfigLoader(Level.WARN).configure('config.yaml')['ros']['video']
+    _framerate = _config.get('framerate')
+    _sample_hz = _config.get('motion_sample_hz', 4.0)
+    _scale     = _config.get('motion_scale', 8)
+    if _args.file:
+        _frames = read_frames(_args.file)
+        _source = '{} ({:d} frames)'.format(_args.file, len(_frames))
+    else:
+        _resolution = ( _config.get('width'), _config.get('height') )
+        _frames = SimCamera.render_frames(_resolution, 32)
+        _source = 'simulated {}x{} frames'.format(*_resolution)
+    if len(_frames) < 2:
+        _log.error('not enough frames in {}.'.format(_source))
+        sys.exit(1)
+    _log.info('analysing {}: {:5.1f}KB/frame; {:4.1f} samples/s of {:d}fps.'.format(_source,
+            sum(len(_frame) for _frame in _frames) / len(_frames) / 1024.0, _sample_hz, _framerate))
+
+    # the cost of a frame at each scale
+    _log.info('scale    cpu/frame    at {:4.1f}/s    at {:d}fps    motion    still'.format(_sample_hz, _framerate))
+    for _each_scale in ( 1, 2, 4, 8 ):
+        _cpu, _ratio = time_analysis(_frames, _each_scale, _args.repeats)
+        _, _still = time_analysis([ _frames[0] ] * 8, _each_scale, 1)
+        _log.info('  1/{:d}    {:7.2f}ms    {:9.1f}%    {:8.1f}%    {:5.1f}%   {:5.1f}%'.format(_each_scale, 1000.0 * _cpu,
+                100.0 * _cpu * _sample_hz, 100.0 * _cpu * _framerate, 100.0 * _ratio, 100.0 * _still)
+                + ( Fore.CYAN + '  (configured)' if _each_scale == _scale else '' ))
+
+    # the detector running live against a frame buffer fed at the framerate
+    _buffer = FrameBuffer(_config.get('frame_slots', 4), _config.get('frame_capacity', 262144), Level.WARN)
+    _thumbnailer = Thumbnailer(_buffer, _scale, level=Level.WARN)
+    _detector = MotionDetector(_thumbnailer, _sample_hz, _scale, _config.get('motion_roi'), _config.get('motion_alpha', 0.05),
+            _config.get('motion_threshold', 24), _config.get('motion_min_ratio', 0.02), level=Level.WARN)
+    _detector.start()
+    _start = time.monotonic()
+    _count = 0
+    while time.monotonic() - _start < _args.seconds:
+        _buffer.append(_frames[_count % len(_frames)])
+        _buffer.commit()
+        _count += 1
+        time.sleep(max(0.0, _start + _count / _framerate - time.monotonic()))
+    _stats = _detector.get_stats()
+    _detector.close()
+    _log.info('live: {:d} frames, {:d} analysed ({:d} with motion, {:d} skipped, {:d} errors); cpu {:5.3f}s, {:4.2f}% of one core.'.format(
+            _count, _stats['samples'], _stats['motion'], _stats['skipped'], _stats['errors'], _stats['cpu_sec'], _stats['cpu_percent']))
+    if _stats['cpu_percent'] >= CPU_LIMIT_PERCENT:
+        _log.error('the detector used {:4.2f}% of one core, over the {:4.1f}% budget.'.format(_stats['cpu_percent'], CPU_LIMIT_PERCENT))
+        sys.exit(1)
+    _log.info(Fore.GREEN + 'within the {:4.1f}% budget.'.format(CPU_LIMIT_PERCENT))
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
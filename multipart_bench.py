@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Compares the per-frame cost of delivering a frame to N simulated stream
+# clients, the original way (each client formats the boundary and headers via
+# send_header()/end_headers() and makes four writes), against sending the
+# multipart part pre-serialised by the FrameBuffer with a single write.
+#
+# Each simulated client writes to /dev/null so the syscalls are real but no
+# reader is needed, e.g.:
+#
+#   % python3 multipart_bench.py --clients 1 4 16 32
+#
+
+import os, sys, time, argparse
+from http import server
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from lbr.frame_buffer import FrameBuffer
+
+# ..............................................................................
+class NullSink(object):
+    '''
+    A write-only file that writes to /dev/null, counting its write calls.
+    '''
+    def __init__(self):
+        self._fd = os.open(os.devnull, os.O_WRONLY)
+        self.calls = 0
+
+    def write(self, data):
+        self.calls += 1
+        return os.write(self._fd, data)
+
+    def sendall(self, data):
+        self.write(data)
+
+    def close(self):
+        os.close(self._fd)
+
+# ..............................................................................
+class LegacyClient(server.BaseHTTPRequestHandler):
+    '''
+    A request handler that is never connected, used to run the original
+    per-client frame path through the standard library's header methods.
+    '''
+    def __init__(self, sink):
+        self.wfile = sink
+        self.request_version = 'HTTP/1.0'
+
+    def send_frame(self, frame):
+        self.wfile.write(b'--FRAME\r\n')
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', len(frame))
+        self.end_headers()
+        self.wfile.write(frame)
+        self.wfile.write(b'\r\n')
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='benchmark multipart frame delivery.')
+    _parser.add_argument('--clients',    type=int, nargs='+', default=[1, 4, 8, 16, 32], help='client counts to measure')
+    _parser.add_argument('--frames',     type=int, default=2000, help='frames per measurement')
+    _parser.add_argument('--frame-size', type=int, default=102400, help='synthetic JPEG size in bytes')
+    _args = _parser.parse_args(argv)
+
+    _log = Logger('mp-bench', Level.INFO)
+    _frames = FrameBuffer(4, _args.frame_size, Level.WARN)
+    _frames.append(b'\xff\xd8' + os.urandom(_args.frame_size - 4).replace(b'\xff', b'\x00') + b'\xff\xd9')
+    _frames.commit()
+    _, _frame = _frames.latest()
+    _, _part = _frames.latest_part()
+
+    _log.info(Fore.WHITE + '{:>8} {:>16} {:>16} {:>16} {:>16} {:>9}'.format(
+            'clients', 'old µs/frame', 'new µs/frame', 'old writes/frm', 'new writes/frm', 'speedup'))
+    for _count in _args.clients:
+        _sinks = [ NullSink() for _ in range(_count) ]
+        # original: four writes and header formatting per client per frame
+        _legacy = [ LegacyClient(_sink) for _sink in _sinks ]
+        _start = time.perf_counter()
+        for _ in range(_args.frames):
+            for _client in _legacy:
+                _client.send_frame(_frame)
+        _old_time = ( time.perf_counter() - _start ) / _args.frames
+        _old_calls = sum(_sink.calls for _sink in _sinks) / _args.frames
+        for _sink in _sinks:
+            _sink.calls = 0
+        # pre-serialised: one write of the shared part per client per frame
+        _start = time.perf_counter()
+        for _ in range(_args.frames):
+            for _sink in _sinks:
+                _sink.sendall(_part)
+        _new_time = ( time.perf_counter() - _start ) / _args.frames
+        _new_calls = sum(_sink.calls for _sink in _sinks) / _args.frames
+        for _sink in _sinks:
+            _sink.close()
+        _log.info('{:>8d} {:>16.2f} {:>16.2f} {:>16.1f} {:>16.1f} {:>8.2f}x'.format(_count,
+                1e6 * _old_time, 1e6 * _new_time, _old_calls, _new_calls, _old_time / _new_time))
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the PirSwitch in 'poll' and 'interrupt' modes off the Pi, using the
+# FakeGPIO and FakeHT0740 backends, with ticks shortened to 50ms. Compares
+# the latency from the PIR going high to the switch turning on, the number
+# of wakeups made while nothing moves, and the I²C transactions made with
+# and without the switch state cache.
+#
+#   % python3 pir_test.py
+#
+
+import sys, time
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from lbr.fake_gpio import FakeGPIO
+from lbr.fake_ht0740 import FakeHT0740
+from lbr.pir_switch import PirSwitch
+from test_support import time_until, wait_for
+
+PIN      = 24
+TICK_SEC = 0.05
+
+# ..............................................................................
+def run(mode, log, revalidate_sec=60.0):
+    '''
+    Run one scenario, returning (latency, idle ticks, motions, switch off,
+    I²C transactions).
+    '''
+    _gpio = FakeGPIO()
+    _switch = FakeHT0740()
+    _motions = []
+    _pir = PirSwitch(PIN, 0x38, level=Level.WARN, motion_callback=lambda: _motions.append(time.time()),
+            mode=mode, gpio=_gpio, switch=_switch, tick_sec=TICK_SEC, revalidate_sec=revalidate_sec)
+    _pir.enable()
+    # idle: count the wakeups over 20 ticks
+    time.sleep(20 * TICK_SEC)
+    _idle_ticks = _pir.get_stats()['ticks']
+    # motion: time from the PIR going high to the switch turning on
+    time.sleep(TICK_SEC * 0.37) # don't align with the polling loop
+    _gpio.set_input(PIN, 1)
+    _latency = time_until(lambda: _switch.switch.is_on, 2.0, 0.0005)
+    time.sleep(3 * TICK_SEC)
+    _gpio.set_input(PIN, 0)
+    # decay: the switch turns off once the count reaches zero, then all is quiet
+    _off = wait_for(lambda: not _switch.switch.is_on, 30 * TICK_SEC, 0.0005)
+    _ticks = _pir.get_stats()['ticks']
+    time.sleep(10 * TICK_SEC)
+    _after_ticks = _pir.get_stats()['ticks'] - _ticks
+    _pir.disable()
+    _pir.close()
+    _stats = _pir.get_stats()
+    log.info('{:<10} {:<8} latency: {:>8}; idle wakeups in 20 ticks: {:2d}; after decay: {:2d}; motions: {:d}; switch off: {}'.format(mode,
+            'cached' if revalidate_sec else 'uncached', '{:6.2f}ms'.format(1000.0 * _latency) if _latency is not None else 'timeout',
+            _idle_ticks, _after_ticks, len(_motions), _off))
+    log.info('{:<19} I²C transactions: {:3d}; reads avoided: {:3d}; writes avoided: {:3d}'.format('',
+            _switch.transactions, _stats['reads_avoided'], _stats['writes_avoided']))
+    return _latency, _idle_ticks + _after_ticks, len(_motions), _off, _switch.transactions
+
+# main .........................................................................
+def main(argv):
+    _log = Logger('pir-test', Level.INFO)
+    _failures = 0
+    _, _, _, _, _uncached_transactions = run('poll', _log, 0.0)
+    _, _, _, _, _poll_transactions = run('poll', _log)
+    _latency, _idle, _motions, _off, _transactions = run('interrupt', _log)
+    if _poll_transactions >= _uncached_transactions / 4:
+        _log.error('FAIL: the switch state cache did not reduce I²C transactions.')
+        _failures += 1
+    # enable, one read to fill the cache, then the switch and LED on and off
+    if _transactions > 6:
+        _log.error('FAIL: interrupt mode made {:d} I²C transactions for a single motion.'.format(_transactions))
+        _failures += 1
+    if _latency is None or _latency > 0.005:
+        _log.error('FAIL: interrupt mode did not turn the switch on within 5ms.')
+        _failures += 1
+    if _idle != 0:
+        _log.error('FAIL: interrupt mode woke {:d} times with no motion.'.format(_idle))
+        _failures += 1
+    if _motions < 2 or not _off:
+        _log.error('FAIL: interrupt mode did not track motion and decay to off.')
+        _failures += 1
+    if _failures:
+        _log.error('{:d} failures.'.format(_failures))
+        sys.exit(1)
+    _log.info(Fore.GREEN + 'passed.')
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
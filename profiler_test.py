@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the Timers and the SamplingProfiler: that the histograms read their
+# percentiles to within their precision, that the hot paths of Video (with
+# the simulated camera), the PirSwitch and the MagneticSwitch are timed only
+# while enabled, and that the profiler, started and stopped over HTTP, writes
+# collapsed stacks. Reports the cost of a timed call, enabled and disabled,
+# and of the profiler, e.g.:
+#
+#   % python3 profiler_test.py
+#   % python3 profiler_test.py --server threaded
+#
+
+import os, re, sys, time, random, shutil, asyncio, argparse, tempfile, threading, http.client
+from colorama import init, Fore, Style
+init()
+
+from core.config_loader import ConfigLoader
+from core.logger import Level, Logger
+from core.timers import Histogram, Timers
+from core.profiler import SamplingProfiler
+from lbr.hal import Hal
+from lbr.fake_gpio import FakeGPIO
+from lbr.fake_ht0740 import FakeHT0740
+from lbr.pir_switch import PirSwitch
+from lbr.mag_switch import MagneticSwitch
+from lbr.output_splitter import OutputSplitter
+from lbr.video import Video
+from test_support import Checker, request
+
+PIR_PIN  = 15
+DOOR_PIN = 16
+STACK    = re.compile(r'^[^;]+(;[^;]+)+ [0-9]+$')
+
+# ..............................................................................
+def cost(function, count):
+    '''
+    Returns the mean time of a call of the function, in nanoseconds.
+    '''
+    _start = time.perf_counter_ns()
+    for _ in range(count):
+        function()
+    return ( time.perf_counter_ns() - _start ) / count
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='test the timers and the sampling profiler.')
+    _parser.add_argument('--server',  choices=['threaded', 'asyncio'], default='asyncio', help='the server mode to test')
+    _parser.add_argument('--port',    type=int, default=18007, help='local port for the test server')
+    _parser.add_argument('--seconds', type=float, default=2.0, help='seconds to profile')
+    _parser.add_argument('--calls',   type=int, default=200000, help='calls made when timing the cost of a timer')
+    _args = _parser.parse_args(argv)
+    _log = Logger('profile-test', Level.INFO)
+    _dirname = tempfile.mkdtemp()
+
+    _checker = Checker(_log)
+    _check = _checker.check
+
+    # the precision of the histogram
+    _histogram = Histogram()
+    _random = random.Random(1)
+    _values = sorted(int(_random.lognormvariate(11.0, 1.5)) for _ in range(100000))
+    for _value in _values:
+        _histogram.record(_value)
+    _errors = [ abs(_read - _values[int(len(_values) * _percentile / 100) - 1]) / _values[int(len(_values) * _percentile / 100) - 1]
+            for _percentile, _read in zip(( 50, 90, 99, 99.9 ), _histogram.percentiles(50, 90, 99, 99.9)) ]
+    _check(max(_errors) < 1.0 / Histogram.SUB_BUCKETS, 'the percentiles are read to within {:4.1f}% (worst {:4.2f}%).'.format(
+            100.0 / Histogram.SUB_BUCKETS, 100.0 * max(_errors)))
+    _check(_histogram.max == _values[-1] and _histogram.count == len(_values), 'the count and maximum are exact.')
+
+    # the cost of a timer, disabled and enabled
+    _timer = Timers.get('test.block')
+    def _plain():
+        pass
+    _decorated = Timers.timed('test.call')(_plain)
+    def _block():
+        with _timer.time():
+            pass
+    _base = cost(_plain, _args.calls)
+    _disabled = ( cost(_decorated, _args.calls) - _base, cost(_block, _args.calls) - _base )
+    Timers.enable(True)
+    _enabled = ( cost(_decorated, _args.calls) - _base, cost(_block, _args.calls) - _base )
+    Timers.enable(False)
+    _check(Timers.get('test.call').histogram.count == _args.calls and _timer.histogram.count == _args.calls,
+            'only the calls made while enabled were timed.')
+    _log.info('timer cost: decorator {:5.0f}ns, block {:5.0f}ns disabled; {:5.0f}ns, {:5.0f}ns enabled.'.format(
+            _disabled[0], _disabled[1], _enabled[0], _enabled[1]))
+
+    # the hot paths
+    _config = ConfigLoader(Level.WARN).configure('config.yaml')
+    _config['ros']['hal']['backend'] = 'sim'
+    _video_config = _config['ros']['video']
+    _video_config['enable_streaming']   = True
+    _video_config['enable_file_output'] = False
+    _video_config['duty_cycle']         = False
+    _video_config['server']             = _args.server
+    _video_config['port']               = _args.port
+    _gpio = FakeGPIO()
+    _pir = PirSwitch(PIR_PIN, 0x38, level=Level.WARN, gpio=_gpio, switch=FakeHT0740(), tick_sec=0.05)
+    _gpio.set_input(DOOR_PIN, 0) # closed
+    _door = MagneticSwitch(DOOR_PIN, lambda state, elapsed_sec: None, Level.WARN, _gpio)
+    _profiler = SamplingProfiler(_dirname, 0.01, Level.WARN)
+    _video = Video(_config, Level.WARN, Hal(_config, Level.WARN))
+    _video.add_resource('POST', '/profile/start', lambda: ( 'text/plain', b'started' ) if _profiler.start() else None)
+    _video.add_resource('POST', '/profile/stop', lambda: ( 'text/plain', _profiler.get_collapsed().encode('utf-8') ) if _profiler.stop() else None)
+    _thread = threading.Thread(target=lambda: asyncio.run(_video.run()), daemon=True)
+    _thread.start()
+    _pir.enable()
+    time.sleep(1.0)
+    _check(Timers.get_stats() == { 'test.block': _timer.get_stats(), 'test.call': Timers.get('test.call').get_stats() },
+            'nothing was timed while disabled.')
+
+    _check(request(_args.port, 'POST', '/profile/stop')[0] == 503, 'a profile not started cannot be stopped.')
+    _code, _, _body = request(_args.port, 'POST', '/profile/start')
+    _check(_code == 200 and _body == b'started' and Timers.enabled, 'the profiler started, enabling the timers.')
+    _check(request(_args.port, 'POST', '/profile/start')[0] == 503, 'the profiler cannot be started twice.')
+    _client = http.client.HTTPConnection('127.0.0.1', _args.port, timeout=5.0)
+    _client.request('GET', '/stream.mjpg')
+    _response = _client.getresponse()
+    _gpio.set_input(PIR_PIN, 1)
+    _gpio.set_input(DOOR_PIN, 1)
+    _end = time.time() + _args.seconds
+    def _busy(): # a thread to be found in the samples
+        while time.time() < _end:
+            sum(range(1000))
+    _busy_thread = threading.Thread(target=_busy, name='busy')
+    _busy_thread.start()
+    while time.time() < _end:
+        _response.read(65536)
+    _busy_thread.join()
+    _gpio.set_input(PIR_PIN, 0)
+    _gpio.set_input(DOOR_PIN, 0)
+    _code, _, _body = request(_args.port, 'POST', '/profile/stop')
+    _client.close()
+    _lines = _body.decode('utf-8').splitlines()
+    _check(_code == 200 and not Timers.enabled and _lines and all(STACK.match(_line) for _line in _lines),
+            'the profiler stopped, returning {:d} collapsed stacks, and disabled the timers.'.format(len(_lines)))
+    _stats = _profiler.get_stats()
+    _check(os.path.exists(_stats['filename']) and open(_stats['filename']).read() == _body.decode('utf-8'),
+            'the stacks were written to {}.'.format(os.path.basename(_stats['filename'])))
+    _busy_samples = sum(int(_line.rsplit(' ', 1)[1]) for _line in _lines if _line.startswith('busy;') and 'profiler_test.py:main.<locals>._busy' in _line)
+    _check(_busy_samples > _stats['samples'] / 2, 'a busy thread was found in {:d} of {:d} samples.'.format(_busy_samples, _stats['samples']))
+    _timers = Timers.get_stats()
+    _sends = 'stream.fan_out' if _args.server == 'asyncio' else 'stream.send'
+    _check(all(_timers.get(_name, {}).get('count', 0) > 0 for _name in ( 'splitter.write', _sends, 'video.annotate', 'pir.update', 'door.callback' )),
+            'the frames, sends, annotation, PIR and door were timed.')
+    for _name, _stats_ in _timers.items():
+        if not _name.startswith('test.'):
+            _log.info('{:<16} {:6d} calls; mean {:8.2f}µs; p50 {:8.2f}µs; p99 {:8.2f}µs; max {:8.2f}µs.'.format(_name,
+                    _stats_['count'], _stats_['mean_us'], _stats_['p50_us'], _stats_['p99_us'], _stats_['max_us']))
+    _log.info('profiler: {:d} samples of {:d} stacks in {:4.1f}s, {:5.3f}s CPU ({:4.2f}% of a core).'.format(_stats['samples'],
+            _stats['stacks'], _args.seconds, _stats['cpu_sec'], 100.0 * _stats['cpu_sec'] / _args.seconds))
+
+    # the cost to the camera thread of the timer on a frame's chunks, disabled
+    _splitter = OutputSplitter(None, 4, 262144)
+    _chunk = b'\xff\xd8' + bytes(16384)
+    _write = OutputSplitter.write.__wrapped__
+    _plain_ns = cost(lambda: _write(_splitter, _chunk), _args.calls // 10)
+    _timed_ns = cost(lambda: _splitter.write(_chunk), _args.calls // 10)
+    _log.info('OutputSplitter.write: {:5.2f}µs untimed, {:5.2f}µs with timing disabled.'.format(_plain_ns / 1000.0, _timed_ns / 1000.0))
+
+    _pir.disable()
+    _pir.close()
+    _door.close()
+    _video.stop()
+    _thread.join()
+    shutil.rmtree(_dirname)
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the PreRollBuffer's wrap-around and its eviction by bytes and by
+# seconds, and the EventRecorder's clips: opened on a trigger with the
+# pre-roll, extended by each further trigger and closed after the quiet
+# period. Frames are committed to a FrameBuffer by hand and clips written to
+# a fake FileWriter, so this does not require a camera.
+#
+#   % python3 recorder_test.py
+#
+
+import sys, time, random
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from lbr.frame_buffer import FrameBuffer
+from lbr.recorder import PreRollBuffer, EventRecorder
+from test_support import Checker
+
+QUIET_SEC = 0.3
+
+# ..............................................................................
+class FakeWriter(object):
+    '''
+    Stands in for the FileWriter, keeping the frames written to each clip.
+    '''
+    def __init__(self):
+        self.clips  = [] # (filename, [frames])
+        self.closed = 0
+
+    def open(self, filename):
+        self.clips.append(( filename, [] ))
+
+    def write(self, frame):
+        self.clips[-1][1].append(bytes(frame))
+
+    def close_file(self):
+        self.closed += 1
+
+# ..............................................................................
+def frame(number, size=32):
+    '''
+    Returns a synthetic JPEG of the size, its body filled with the number.
+    '''
+    return b'\xff\xd8' + bytes([ number % 256 ]) * ( size - 4 ) + b'\xff\xd9'
+
+# main .........................................................................
+def main(argv):
+    _log = Logger('recorder-test', Level.INFO)
+    _checker = Checker(_log)
+    _check = _checker.check
+
+    # wrap-around: the frames at the end of the buffer are the oldest, overwritten in turn
+    _preroll = PreRollBuffer(60.0, 1000)
+    for i in range(5):
+        _preroll.add(frame(i, 300), float(i))
+    _check([ bytes(_frame) for _frame in _preroll.frames() ] == [ frame(i, 300) for i in ( 2, 3, 4 ) ],
+            'after wrapping, the three newest frames are held intact, oldest first.')
+    _check(not _preroll.add(frame(0, 1001), 5.0) and len(_preroll) == 3, 'a frame larger than the buffer is refused.')
+
+    # eviction by bytes: whatever the sizes, the newest frames that fit are kept
+    _random = random.Random(1)
+    _preroll = PreRollBuffer(60.0, 4096)
+    _added = []
+    _ok = True
+    for i in range(500):
+        _added.append(frame(i, _random.randint(16, 1024)))
+        _preroll.add(_added[-1], float(i))
+        _held = [ bytes(_frame) for _frame in _preroll.frames() ]
+        _bytes = sum(len(_frame) for _frame in _held)
+        # once full, at most a frame is lost to the end of the buffer on wrapping, and one making room
+        _ok = _ok and _held == _added[len(_added) - len(_held):] and _bytes <= 4096 \
+                and ( _bytes >= 4096 - 2 * 1024 or i < 8 )
+    _check(_ok, 'frames of random sizes were evicted oldest first, never exceeding the buffer.')
+
+    # eviction by seconds: frames older than the pre-roll are expired as frames arrive
+    _preroll = PreRollBuffer(1.0, 4096)
+    for i in range(5):
+        _preroll.add(frame(i), 0.5 * i)
+    _check([ bytes(_frame) for _frame in _preroll.frames() ] == [ frame(i) for i in ( 2, 3, 4 ) ],
+            'frames more than a second older than the newest were expired.')
+    _preroll.expire(10.0)
+    _check(len(_preroll) == 0, 'all frames were expired once the buffer went quiet.')
+
+    # the event recorder
+    _frames = FrameBuffer(4, 1024, Level.WARN)
+    _writer = FakeWriter()
+    _filenames = iter([ 'clip_1.mjpg', 'clip_2.mjpg' ])
+    _recorder = EventRecorder(_frames, _writer, lambda: next(_filenames), preroll_sec=60.0, preroll_bytes=4096,
+            quiet_period_sec=QUIET_SEC, level=Level.WARN)
+    _number = 0
+    def _commit():
+        nonlocal _number
+        _number += 1
+        _frames.append(frame(_number))
+        _frames.commit()
+        return frame(_number)
+
+    for _ in range(5):
+        _commit()
+    _check(not _recorder.recording and _writer.clips == [], 'nothing was recorded before a trigger.')
+    _recorder.trigger('pir')
+    _commit()
+    _check(_recorder.recording and _writer.clips == [ ( 'clip_1.mjpg', [ frame(i) for i in range(1, 7) ] ) ],
+            'a trigger opened a clip with the five pre-roll frames before the next.')
+
+    # re-triggered within the quiet period, the clip is extended well beyond it
+    _start = time.time()
+    while time.time() - _start < 3 * QUIET_SEC:
+        _recorder.trigger('door')
+        for _ in range(4):
+            time.sleep(QUIET_SEC / 8)
+            _commit()
+    _check(_recorder.recording and len(_writer.clips) == 1 and _writer.clips[0][1][-1] == frame(_number)
+            and len(_writer.clips[0][1]) == _number, 'each trigger extended the clip, every frame written to it.')
+
+    # once quiet, the next frame closes the clip and starts a new pre-roll
+    time.sleep(QUIET_SEC * 1.5)
+    _quiet = _commit()
+    _check(not _recorder.recording and _writer.closed == 1 and len(_writer.clips[0][1]) == _number - 1,
+            'the clip was closed by the first frame after the quiet period.')
+    _recorder.trigger('pir')
+    _commit()
+    _check(_recorder.recording and _recorder.clip_count == 2 and _writer.clips[1] == ( 'clip_2.mjpg', [ _quiet, frame(_number) ] ),
+            'the next trigger opened a new clip with the frame kept since.')
+    _recorder.close()
+    _commit()
+    _check(_writer.closed == 2 and len(_writer.clips[1][1]) == 2, 'closing the recorder closed the clip and stopped it listening.')
+
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the RetentionManager's size, age and free space policies against a
+# temporary directory of synthetic video files. This does not require a camera.
+#
+#   % python3 retention_test.py
+#
+
+import os, sys, time, shutil, tempfile
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from lbr.retention import RetentionManager
+from test_support import Checker
+
+PATTERNS = [ 'vid_*.h264', 'vid_*.mp4' ]
+
+# ..............................................................................
+def create_files(dirname, count, size, age_step_sec=60.0, extension='h264'):
+    '''
+    Create 'count' files of 'size' bytes, each 'age_step_sec' older than the
+    next, returning their paths oldest first.
+    '''
+    _now = time.time()
+    _paths = []
+    for i in range(count):
+        _path = os.path.join(dirname, 'vid_{:03d}.{}'.format(i, extension))
+        with open(_path, 'wb') as _file:
+            _file.write(b'\x00' * size)
+        _mtime = _now - ( count - i ) * age_step_sec
+        os.utime(_path, ( _mtime, _mtime ))
+        _paths.append(_path)
+    return _paths
+
+# ..............................................................................
+def remaining(paths):
+    return [ os.path.basename(_path) for _path in paths if os.path.exists(_path) ]
+
+# main .........................................................................
+def main(argv):
+    _log = Logger('retention-test', Level.INFO)
+    _checker = Checker(_log)
+    _check = _checker.check
+
+    # max bytes: the oldest files go first, on the initial enforce and as files are added
+    _dirname = tempfile.mkdtemp()
+    _paths = create_files(_dirname, 10, 1000)
+    _other = os.path.join(_dirname, 'notes.txt')
+    with open(_other, 'wb') as _file:
+        _file.write(b'\x00' * 100000)
+    _retention = RetentionManager(_dirname, PATTERNS, max_bytes=5500, level=Level.WARN)
+    _check(len(_retention) == 10 and _retention.total_bytes == 10000, 'initial scan indexed 10 files of 10000 bytes.')
+    _retention.enforce()
+    _check(remaining(_paths) == [ 'vid_{:03d}.h264'.format(i) for i in range(5, 10) ], 'max bytes deleted the five oldest files.')
+    _new = create_files(_dirname, 1, 1000, 0.0, 'mp4')[0]
+    _retention.add(_new)
+    _check(not os.path.exists(_paths[5]) and os.path.exists(_new), 'adding a file deleted the oldest remaining file.')
+    _check(os.path.exists(_other), 'a file not matching the patterns was not deleted.')
+    _check(_retention.get_stats()['deleted'] == 6 and _retention.total_bytes == 5000, 'index totals agree with the deletions.')
+    shutil.rmtree(_dirname)
+
+    # max age: files older than the limit are deleted, newer ones kept
+    _dirname = tempfile.mkdtemp()
+    _paths = create_files(_dirname, 10, 1000, 3600.0) # 10 hours to 1 hour old
+    _retention = RetentionManager(_dirname, PATTERNS, max_age_sec=5.5 * 3600.0, level=Level.WARN)
+    _retention.enforce()
+    _check(remaining(_paths) == [ 'vid_{:03d}.h264'.format(i) for i in range(5, 10) ], 'max age deleted files older than 5.5 hours.')
+    shutil.rmtree(_dirname)
+
+    # min free space: delete just enough to bring free space up to the minimum
+    _dirname = tempfile.mkdtemp()
+    _paths = create_files(_dirname, 10, 1000)
+    _free = shutil.disk_usage(_dirname).free
+    _retention = RetentionManager(_dirname, PATTERNS, min_free_bytes=_free + 3500, level=Level.WARN)
+    _retention.enforce()
+    _check(len(remaining(_paths)) == 6 and remaining(_paths)[0] == 'vid_004.h264', 'min free space deleted the four oldest files.')
+
+    # a file still being written is not indexed, so never deleted
+    _writing = os.path.join(_dirname, 'vid_999.h264')
+    with open(_writing, 'wb') as _file:
+        _file.write(b'\x00' * 1000)
+        _retention.discard(_paths[9])
+        _retention.enforce()
+        _check(os.path.exists(_writing) and os.path.exists(_paths[9]), 'unindexed files were not deleted.')
+    shutil.rmtree(_dirname)
+
+    # cost: enforce() on a large index is proportional to the files deleted, not indexed
+    _dirname = tempfile.mkdtemp()
+    create_files(_dirname, 2000, 10)
+    _retention = RetentionManager(_dirname, PATTERNS, max_bytes=20000, level=Level.WARN)
+    _start = time.perf_counter()
+    for _ in range(1000):
+        _retention.enforce()
+    _elapsed = ( time.perf_counter() - _start ) / 1000
+    _check(_elapsed < 0.001, 'enforce() with 2000 indexed files and nothing to delete took {:5.1f}µs.'.format(1e6 * _elapsed))
+    shutil.rmtree(_dirname)
+
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
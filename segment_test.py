@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests segmented video output: synthetic frames, written in chunks through
+# an OutputSplitter and FileWriter, are rotated into segments by size and by
+# duration, each segment starting on a frame's SOI marker. The segments are
+# then converted by the SegmentFinaliser using a stub ffmpeg placed first on
+# the PATH, checking the conversion through a '.tmp' file, a failed
+# conversion and recover() re-queuing unconverted segments. This requires
+# neither a camera nor ffmpeg.
+#
+#   % python3 segment_test.py
+#
+
+import os, sys, glob, time, random, shutil, tempfile
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from lbr.file_writer import FileWriter
+from lbr.output_splitter import OutputSplitter
+from lbr.segment_finaliser import SegmentFinaliser
+from test_support import Checker, wait_for
+
+SEGMENT_BYTES = 20000
+MAX_FRAME     = 5000
+CHUNK         = 1024
+
+# a stand-in for ffmpeg: 'converts' the input by prefixing it, failing on a corrupt input after a partial write
+STUB_FFMPEG = '''#!{}
+import sys
+_args = sys.argv[1:]
+if _args[_args.index('-c:v') + 1] != 'copy' or not _args[-1].endswith('.mp4.tmp'):
+    sys.exit(2)
+with open(_args[_args.index('-i') + 1], 'rb') as _file:
+    _data = _file.read()
+with open(_args[-1], 'wb') as _file:
+    _file.write(b'mp4:' + _data[:len(_data) // 2])
+    if b'corrupt' in _data:
+        sys.stderr.write('invalid data found when processing input')
+        sys.exit(1)
+    _file.write(_data[len(_data) // 2:])
+'''
+
+# ..............................................................................
+def write_frames(splitter, random_, count, period_sec=0.0):
+    '''
+    Write the count of synthetic JPEG frames of random sizes to the splitter
+    in chunks, only the first chunk of each beginning with the SOI marker.
+    Returns all the bytes written.
+    '''
+    _data = bytearray()
+    for _ in range(count):
+        _frame = b'\xff\xd8' + bytes(random_.randrange(255) for _ in range(random_.randint(100, MAX_FRAME - 4))) + b'\xff\xd9'
+        for _start in range(0, len(_frame), CHUNK):
+            splitter.write(_frame[_start:_start + CHUNK])
+        _data += _frame
+        if period_sec:
+            time.sleep(period_sec)
+    return bytes(_data)
+
+# ..............................................................................
+def read(filename):
+    with open(filename, 'rb') as _file:
+        return _file.read()
+
+# ..............................................................................
+def segment(dirname, random_, count, period_sec=0.0, **limits):
+    '''
+    Write the frames to segments in the directory with the limits, returning
+    the bytes written, the segment filenames in order and those closed.
+    '''
+    _closed = []
+    _filenames = [ os.path.join(dirname, 'seg_{:03d}.mjpg'.format(i)) for i in range(1000) ]
+    _next = iter(_filenames[1:])
+    _writer = FileWriter(4096, 64, 'block', f_on_close=_closed.append, level=Level.WARN)
+    _splitter = OutputSplitter(_filenames[0], 4, 8192, _writer, f_get_filename=lambda: next(_next), **limits)
+    _data = write_frames(_splitter, random_, count, period_sec)
+    _splitter.close()
+    _writer.close()
+    return _data, _filenames[:_splitter.segment_count], _closed
+
+# main .........................................................................
+def main(argv):
+    _log = Logger('segment-test', Level.INFO)
+    _checker = Checker(_log)
+    _check = _checker.check
+    _random = random.Random(1)
+    _dirname = tempfile.mkdtemp()
+
+    # rotation by size: each segment is cut at the first frame after the limit
+    _data, _segments, _closed = segment(_dirname, _random, 100, segment_bytes=SEGMENT_BYTES)
+    _contents = [ read(_filename) for _filename in _segments ]
+    _check(len(_segments) > 5 and _closed == _segments, '{:d} segments were written and closed in turn.'.format(len(_segments)))
+    _check(b''.join(_contents) == _data, 'the segments hold every byte written, in order.')
+    _check(all(_content.startswith(b'\xff\xd8') and _content.endswith(b'\xff\xd9') for _content in _contents),
+            'every segment begins on an SOI and ends on an EOI marker.')
+    _check(all(SEGMENT_BYTES <= len(_content) < SEGMENT_BYTES + MAX_FRAME for _content in _contents[:-1]),
+            'every segment but the last reached the size limit by less than a frame.')
+
+    # rotation by duration
+    _timed_dirname = os.path.join(_dirname, 'timed')
+    os.mkdir(_timed_dirname)
+    _timed_data, _timed, _ = segment(_timed_dirname, _random, 50, 0.02, segment_sec=0.2)
+    _timed_contents = [ read(_filename) for _filename in _timed ]
+    _check(4 <= len(_timed) <= 7 and b''.join(_timed_contents) == _timed_data
+            and all(_content.startswith(b'\xff\xd8') for _content in _timed_contents),
+            'a second of frames was cut into {:d} segments of 0.2s, each beginning on an SOI marker.'.format(len(_timed)))
+
+    # conversion by the finaliser
+    _bin_dirname = os.path.join(_dirname, 'bin')
+    os.mkdir(_bin_dirname)
+    _stub = os.path.join(_bin_dirname, 'ffmpeg')
+    with open(_stub, 'w') as _file:
+        _file.write(STUB_FFMPEG.format(sys.executable))
+    os.chmod(_stub, 0o755)
+    os.environ['PATH'] = _bin_dirname + os.pathsep + os.environ.get('PATH', '')
+    _corrupt = os.path.join(_dirname, 'seg_900.mjpg')
+    _empty = os.path.join(_dirname, 'seg_901.mjpg')
+    with open(_corrupt, 'wb') as _file:
+        _file.write(b'\xff\xd8corrupt\xff\xd9')
+    open(_empty, 'wb').close()
+    with open(SegmentFinaliser.get_mp4_filename(_segments[0]), 'wb') as _file: # already converted
+        _file.write(b'mp4:')
+    _completed = []
+    _finaliser = SegmentFinaliser(20, remove_source=True, workers=2, f_on_complete=lambda source, mp4: _completed.append(source),
+            level=Level.WARN)
+    _queued = _finaliser.recover(_dirname, 'seg_*.mjpg')
+    _check(_queued == len(_segments) + 1, 'recover() queued the {:d} unconverted segments.'.format(_queued))
+    _check(wait_for(lambda: len(_completed) == len(_segments) - 1 and _finaliser.get_stats()['failed'] == 1
+            and not os.path.exists(_empty), 10.0),
+            'the segments were converted: {}.'.format(_finaliser.get_stats()))
+    _check(all(read(SegmentFinaliser.get_mp4_filename(_filename)) == b'mp4:' + _content and not os.path.exists(_filename)
+            for _filename, _content in zip(_segments[1:], _contents[1:])), 'each mp4 holds its segment, whose source was removed.')
+    _check(os.path.exists(_segments[0]) and not os.path.exists(_empty), 'a converted segment was skipped and an empty one removed.')
+    _check(os.path.exists(_corrupt) and not os.path.exists(SegmentFinaliser.get_mp4_filename(_corrupt)),
+            'a failed conversion left its source and no mp4.')
+    _check(not glob.glob(os.path.join(_dirname, '*.tmp')), 'no temporary file was left behind.')
+    _check(_finaliser.recover(_dirname, 'seg_*.mjpg') == 1, 'recover() queued only the failed segment again.')
+    _finaliser.close()
+    shutil.rmtree(_dirname)
+
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the '/snapshot.jpg' endpoint of both streaming servers, fed synthetic
+# frames at a low framerate so that frames change slowly: the conditional GET
+# headers, '304 Not Modified' for repeat polls, '?max_age_ms=' waiting for a
+# fresh frame, and the cost of polling an unchanged frame. This does not
+# require a camera, e.g.:
+#
+#   % python3 snapshot_test.py --server asyncio
+#   % python3 snapshot_test.py --server threaded
+#
+
+import os, sys, time, argparse, threading
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from lbr.frame_buffer import FrameBuffer
+from lbr.stream import get_page, StreamClients, StreamingHandler, StreamingServer, AsyncStreamingServer
+from test_support import Checker, get
+
+FRAMERATE = 2
+
+# ..............................................................................
+def produce(frames, f_is_enabled):
+    _body = os.urandom(50000).replace(b'\xff', b'\x00')
+    while f_is_enabled():
+        frames.append(b'\xff\xd8' + _body + b'\xff\xd9')
+        frames.commit()
+        time.sleep(1.0 / FRAMERATE)
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='test the snapshot endpoint.')
+    _parser.add_argument('--server', choices=['threaded', 'asyncio'], default='asyncio', help='the server mode to test')
+    _parser.add_argument('--port',   type=int, default=18003, help='local port for the test server')
+    _parser.add_argument('--polls',  type=int, default=500, help='conditional polls made to measure their cost')
+    _args = _parser.parse_args(argv)
+    _log = Logger('snapshot-test', Level.INFO)
+
+    _enabled = True
+    _frames = FrameBuffer(4, 65536, Level.WARN)
+    _clients = StreamClients(2, 40, FRAMERATE, Level.WARN)
+    _page = get_page(640, 480).encode('utf-8')
+    if _args.server == 'asyncio':
+        _server = AsyncStreamingServer(('127.0.0.1', _args.port), lambda: _enabled, _frames, _page, _clients, Level.WARN)
+    else:
+        _server = StreamingServer(('127.0.0.1', _args.port), StreamingHandler, lambda: _enabled, _frames, _page, _clients)
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    time.sleep(0.3)
+
+    _checker = Checker(_log)
+    _check = _checker.check
+
+    _status, _, _ = get(_args.port, '/snapshot.jpg')
+    _check(_status == 503, 'no snapshot is available before the first frame.')
+    threading.Thread(target=produce, args=[_frames, lambda: _enabled], daemon=True).start()
+    time.sleep(0.1)
+
+    _status, _response, _body = get(_args.port, '/snapshot.jpg')
+    _etag, _modified = _response.getheader('ETag'), _response.getheader('Last-Modified')
+    _check(_status == 200 and _body.startswith(b'\xff\xd8') and _body.endswith(b'\xff\xd9'), 'the snapshot is the latest JPEG.')
+    _check(_etag is not None and _modified is not None, 'the snapshot has ETag {} and Last-Modified {}.'.format(_etag, _modified))
+    _status, _, _body = get(_args.port, '/snapshot.jpg', { 'If-None-Match': _etag })
+    _check(_status == 304 and not _body, 'a repeat poll with If-None-Match is not modified.')
+    _status, _, _ = get(_args.port, '/snapshot.jpg', { 'If-Modified-Since': _modified })
+    _check(_status == 304, 'a repeat poll with If-Modified-Since is not modified.')
+
+    # the cost of polling an unchanged frame
+    _copies = _server.snapshot.get_stats()['copies']
+    _sequence = _frames.sequence
+    _start = time.perf_counter()
+    _cpu = time.process_time()
+    _not_modified = 0
+    for _ in range(_args.polls):
+        _status, _response, _ = get(_args.port, '/snapshot.jpg', { 'If-None-Match': _etag })
+        if _status == 304:
+            _not_modified += 1
+        else:
+            _etag = _response.getheader('ETag')
+    _elapsed = time.perf_counter() - _start
+    _new_frames = _frames.sequence - _sequence
+    _copies = _server.snapshot.get_stats()['copies'] - _copies
+    _log.info('{:d} polls in {:5.2f}s ({:6.0f}/s, {:5.3f}ms cpu each incl. client): {:d} not modified; {:d} new frames, {:d} copied.'.format(
+            _args.polls, _elapsed, _args.polls / _elapsed, 1000.0 * ( time.process_time() - _cpu ) / _args.polls, _not_modified, _new_frames, _copies))
+    _check(_copies <= _new_frames + 1, 'each frame was copied at most once however often polled.')
+
+    # max age: a cached frame older than the limit waits for the next
+    time.sleep(0.2)
+    _sequence = _frames.sequence
+    _start = time.perf_counter()
+    _status, _response, _ = get(_args.port, '/snapshot.jpg?max_age_ms=50')
+    _waited = time.perf_counter() - _start
+    _check(_status == 200 and _frames.sequence > _sequence and _response.getheader('ETag').endswith('-{:d}"'.format(_frames.sequence)),
+            'max_age_ms waited {:5.1f}ms for a fresh frame.'.format(1000.0 * _waited))
+    _start = time.perf_counter()
+    _status, _, _ = get(_args.port, '/snapshot.jpg?max_age_ms=5000')
+    _check(_status == 200 and time.perf_counter() - _start < 0.1, 'a frame younger than max_age_ms is returned at once.')
+    _log.info('snapshot stats: {}'.format(_server.snapshot.get_stats()))
+
+    _enabled = False
+    _server.shutdown()
+    _server.server_close()
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
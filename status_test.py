@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the '/status' and '/metrics' resources of Video with the simulated
+# camera, a PirSwitch and a MagneticSwitch on a FakeGPIO: that they report
+# the frame rate, bytes per frame, the clients and their lag, the PIR count
+# and switch, and the door, that the metrics are well-formed Prometheus text,
+# and reports the time and CPU taken to answer a scrape, e.g.:
+#
+#   % python3 status_test.py
+#   % python3 status_test.py --server threaded
+#
+
+import re, sys, json, time, socket, asyncio, argparse, threading
+from colorama import init, Fore, Style
+init()
+
+from core.config_loader import ConfigLoader
+from core.logger import Level, Logger
+from lbr.hal import Hal
+from lbr.fake_gpio import FakeGPIO
+from lbr.fake_ht0740 import FakeHT0740
+from lbr.pir_switch import PirSwitch
+from lbr.mag_switch import MagneticSwitch
+from lbr.video import Video
+from test_support import Checker, get, wait_for
+
+PIR_PIN  = 15
+DOOR_PIN = 16
+SAMPLE   = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? -?[0-9.e+-]+$')
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='test the status and metrics of the video server.')
+    _parser.add_argument('--server',   choices=['threaded', 'asyncio'], default='asyncio', help='the server mode to test')
+    _parser.add_argument('--port',     type=int, default=18006, help='local port for the test server')
+    _parser.add_argument('--requests', type=int, default=200, help='scrapes made when timing')
+    _args = _parser.parse_args(argv)
+
+    _log = Logger('status-test', Level.INFO)
+    _config = ConfigLoader(Level.WARN).configure('config.yaml')
+    _config['ros']['hal']['backend'] = 'sim'
+    _video_config = _config['ros']['video']
+    _video_config['enable_streaming']   = True
+    _video_config['enable_file_output'] = False
+    _video_config['duty_cycle']         = False
+    _video_config['server']             = _args.server
+    _video_config['port']               = _args.port
+    _video_config['status']             = True
+    _framerate = _video_config['framerate']
+
+    _gpio = FakeGPIO()
+    _switch = FakeHT0740()
+    _pir = PirSwitch(PIR_PIN, 0x38, level=Level.WARN, gpio=_gpio, switch=_switch, tick_sec=0.05)
+    _gpio.set_input(DOOR_PIN, 0) # closed
+    _door = MagneticSwitch(DOOR_PIN, lambda state, elapsed_sec: None, Level.WARN, _gpio)
+    _video = Video(_config, Level.WARN, Hal(_config, Level.WARN))
+    _video.add_status('pir', _pir.get_status)
+    _video.add_status('door', _door.get_status)
+    _thread = threading.Thread(target=lambda: asyncio.run(_video.run()), daemon=True)
+    _thread.start()
+    _pir.enable()
+    time.sleep(1.5)
+
+    _checker = Checker(_log)
+    _check = _checker.check
+
+    def _status():
+        return json.loads(get(_args.port, '/status')[2])
+
+    _code, _response, _body = get(_args.port, '/status')
+    _status_0 = json.loads(_body)
+    _full = _status_0['stream']['streams'][0]
+    _check(_code == 200 and _response.getheader('Content-Type') == 'application/json', 'the status is served as JSON.')
+    _check(_full['stream'] == 'full' and abs(_full['fps'] - _framerate) < _framerate * 0.25 and _full['bytes_per_frame'] > 0,
+            'the full stream runs at {:5.1f}fps (of {:d}), {:d} bytes per frame.'.format(_full['fps'], _framerate, _full['bytes_per_frame']))
+    _check(_status_0['pir']['count'] == 0 and not _status_0['pir']['switch_on'] and not _status_0['door']['open'] and _status_0['stream']['clients'] == 0,
+            'the PIR is quiet, the door closed and no one streaming.')
+    _check(_status_0['process']['threads'] > 1 and _status_0['process']['resident_bytes'] > 1 << 20,
+            'the threads ({:d}) and resident memory ({:d}KB) are reported.'.format(_status_0['process']['threads'],
+            _status_0['process']['resident_bytes'] // 1024))
+
+    # a client, motion and the door opening
+    _client = socket.create_connection(( '127.0.0.1', _args.port ))
+    _client.sendall(b'GET /stream.mjpg HTTP/1.1\r\nHost: localhost\r\n\r\n')
+    _gpio.set_input(PIR_PIN, 1)
+    _gpio.set_input(DOOR_PIN, 1)
+    _check(wait_for(lambda: _status()['pir']['switch_on'], 1.0), 'the PIR turned the switch on.')
+    time.sleep(0.5)
+    _status_1 = _status()
+    _clients = _status_1['stream']['stream_clients']
+    _check(_status_1['stream']['clients'] == 1 and len(_clients) == 1 and _clients[0]['client_sent_total'] > 0
+            and _clients[0]['client_lag'] >= 0, 'the client is reported with its lag ({:d} frames).'.format(_clients[0]['client_lag']))
+    _check(_status_1['pir']['count'] > 0 and _status_1['door'] == { 'open': True, 'open_sec': _status_1['door']['open_sec'], 'opens_total': 1 },
+            'the PIR count ({:d}) and the open door are reported.'.format(_status_1['pir']['count']))
+    _check(_status_1['stream']['streams'][0]['frames_total'] > _full['frames_total'], 'the frames committed are counted.')
+
+    # the metrics
+    _code, _response, _body = get(_args.port, '/metrics')
+    _lines = _body.decode('utf-8').splitlines()
+    _samples = { _line.split(' ')[0]: float(_line.split(' ')[1]) for _line in _lines if not _line.startswith('#') }
+    _check(_code == 200 and _response.getheader('Content-Type').startswith('text/plain; version=0.0.4'), 'the metrics are served as Prometheus text.')
+    _check(all(SAMPLE.match(_line) for _line in _lines if not _line.startswith('#')), 'every sample is well-formed.')
+    _check(len([ _line for _line in _lines if _line.startswith('# TYPE') ]) == len(set(_name.split('{')[0] for _name in _samples)),
+            'each metric is typed once.')
+    _check('# TYPE lbr_stream_frames_total counter' in _lines and '# TYPE lbr_stream_fps gauge' in _lines, 'counters and gauges are typed.')
+    _check(_samples.get('lbr_door_open') == 1.0 and _samples.get('lbr_pir_switch_on') == 1.0 and _samples.get('lbr_pir_count', 0) > 0
+            and _samples.get('lbr_stream_fps{stream="full"}', 0) > 0 and 'lbr_process_resident_bytes' in _samples,
+            'the door, PIR, frame rate and memory are sampled.')
+    _check(any(_name.startswith('lbr_stream_client_lag{stream="full",address="127.0.0.1:') for _name in _samples),
+            'the client lag is labelled by stream and address.')
+    _client.close()
+
+    # the cost of a scrape
+    _cpu = time.process_time()
+    _start = time.perf_counter()
+    for _ in range(_args.requests):
+        get(_args.port, '/metrics')
+    _elapsed = time.perf_counter() - _start
+    _cpu = time.process_time() - _cpu
+    _log.info('{} server: {:d} scrapes of {:d} bytes, {:5.2f}ms each, {:5.2f}ms CPU (client and server).'.format(_args.server,
+            _args.requests, len(_body), 1000.0 * _elapsed / _args.requests, 1000.0 * _cpu / _args.requests))
+
+    _pir.disable()
+    _pir.close()
+    _door.close()
+    _video.stop()
+    _thread.join()
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
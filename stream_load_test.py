@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Load tests the MJPEG streaming server with a growing number of local client
+# sockets, reporting per-client frame latency and the server's total CPU use
+# at each step. The server runs in a child process fed by synthetic frames of
+# varying size at the configured framerate, so this does not require a camera.
+# Each part received is checked against its Content-Length and checksum. The
+# final steps stream to a single client reading more slowly than the stream,
+# first as configured and then never disconnected (a client_max_lag of 0),
+# whose parts must also arrive intact, e.g.:
+#
+#   % python3 stream_load_test.py --server asyncio
+#   % python3 stream_load_test.py --server threaded --clients 1 2 4 8 16 32
+#   % python3 stream_load_test.py --server threaded --clients 1 --slow-rate 0.1
+#
+
+import os, sys, time, zlib, random, struct, socket, selectors, resource, threading, argparse, multiprocessing
+from colorama import init, Fore, Style
+init()
+
+from core.config_loader import ConfigLoader
+from core.logger import Level, Logger
+from lbr.frame_buffer import FrameBuffer
+from lbr.stream import get_page, StreamClients, StreamingHandler, StreamingServer, AsyncStreamingServer
+
+# ..............................................................................
+def produce(frames, framerate, frame_size, f_is_enabled):
+    '''
+    Write synthetic JPEG frames of between half and the whole frame size to
+    the FrameBuffer at the framerate, each carrying its send time and the
+    CRC-32 of its body immediately after the SOI marker.
+    '''
+    _pool = os.urandom(2 * frame_size).replace(b'\xff', b'\x00')
+    _random = random.Random(1)
+    _period = 1.0 / framerate
+    _next = time.perf_counter()
+    while f_is_enabled():
+        _offset = _random.randrange(frame_size)
+        _body = _pool[_offset:_offset + _random.randint(frame_size // 2, frame_size)]
+        frames.append(b'\xff\xd8' + struct.pack('<dI', time.time(), zlib.crc32(_body)) + _body + b'\xff\xd9')
+        frames.commit()
+        _next += _period
+        _delay = _next - time.perf_counter()
+        if _delay > 0.0:
+            time.sleep(_delay)
+
+# ..............................................................................
+def serve(mode, port, width, height, framerate, frame_size, max_lag, pipe):
+    '''
+    The server process: runs the producer and streaming server, answering
+    each message on the pipe with its cumulative CPU time in seconds, its
+    thread count, the total frames dropped and overrun across all clients,
+    and the number of clients.
+    '''
+    _enabled = True
+    _frames = FrameBuffer(4, frame_size + 64, Level.WARN)
+    _page = get_page(width, height).encode('utf-8')
+    _clients = StreamClients(2, max_lag, framerate, Level.WARN)
+    if mode == 'asyncio':
+        _server = AsyncStreamingServer(('127.0.0.1', port), lambda: _enabled, _frames, _page, _clients, Level.WARN)
+    else:
+        _server = StreamingServer(('127.0.0.1', port), StreamingHandler, lambda: _enabled, _frames, _page, _clients)
+    threading.Thread(target=produce, args=[_frames, framerate, frame_size, lambda: _enabled], daemon=True).start()
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    pipe.send(True)
+    while pipe.recv():
+        _usage = resource.getrusage(resource.RUSAGE_SELF)
+        _stats = _clients.get_stats()
+        pipe.send(( _usage.ru_utime + _usage.ru_stime, threading.active_count(),
+                sum(_client['dropped'] for _client in _stats), sum(_client['overruns'] for _client in _stats), len(_stats) ))
+    _enabled = False
+    _server.shutdown()
+    _server.server_close()
+
+# ..............................................................................
+class Client(object):
+    '''
+    A stream client that parses the multipart response, records the latency
+    of each frame received and counts the parts whose body doesn't match its
+    Content-Length (its JPEG markers, checksum and trailing CRLF), skipping
+    to the next boundary after any such part. Non-blocking unless 'rcvbuf'
+    (the socket's receive buffer size) is given for a slow reader.
+    '''
+    def __init__(self, port, rcvbuf=0):
+        self.socket = socket.create_connection(('127.0.0.1', port))
+        if rcvbuf:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self.socket.sendall(b'GET /stream.mjpg HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        self.socket.setblocking(rcvbuf > 0)
+        self._data = bytearray()
+        self._headers_read = False
+        self.latencies = []
+        self.parts = 0
+        self.errors = 0
+
+    def receive(self, size=1 << 20):
+        _chunk = self.socket.recv(size)
+        if not _chunk:
+            raise ConnectionError('server closed connection')
+        self._data += _chunk
+        if not self._headers_read:
+            _end = self._data.find(b'\r\n\r\n')
+            if _end < 0:
+                return
+            del self._data[:_end + 4]
+            self._headers_read = True
+        while True:
+            _end = self._data.find(b'\r\n\r\n')
+            if _end < 0:
+                return
+            _length = int(self._data[:_end].split(b'Content-Length: ')[1].split(b'\r\n')[0])
+            _start = _end + 4
+            if len(self._data) < _start + _length + 2:
+                return
+            self.parts += 1
+            _sent, _crc = struct.unpack('<dI', self._data[_start + 2:_start + 14])
+            if ( not self._data.startswith(b'--FRAME\r\n') or self._data[_start:_start + 2] != b'\xff\xd8'
+                    or self._data[_start + _length - 2:_start + _length + 2] != b'\xff\xd9\r\n'
+                    or zlib.crc32(self._data[_start + 14:_start + _length - 2]) != _crc ):
+                self.errors += 1
+                _next = self._data.find(b'--FRAME\r\n', 1)
+                del self._data[:_next if _next > 0 else len(self._data)]
+                continue
+            self.latencies.append(time.time() - _sent)
+            del self._data[:_start + _length + 2]
+
+    def close(self):
+        self.socket.close()
+
+# ..............................................................................
+def read_slowly(client, rate, seconds):
+    '''
+    Read from the client at the rate (bytes per second) for the seconds.
+    '''
+    _chunk = 4096
+    _end = time.time() + seconds
+    _next = time.perf_counter()
+    while time.time() < _end:
+        client.receive(_chunk)
+        _next += _chunk / rate
+        _delay = _next - time.perf_counter()
+        if _delay > 0.0:
+            time.sleep(_delay)
+
+# ..............................................................................
+def start_server(mode, port, width, height, framerate, frame_size, max_lag):
+    '''
+    Start the server process, returning it and its end of the pipe once the
+    server is ready.
+    '''
+    _pipe, _child_pipe = multiprocessing.Pipe()
+    _process = multiprocessing.Process(target=serve, args=[mode, port, width, height, framerate, frame_size, max_lag, _child_pipe],
+            daemon=True)
+    _process.start()
+    _pipe.recv()
+    time.sleep(0.5)
+    return _process, _pipe
+
+# ..............................................................................
+def stop_server(process, pipe):
+    pipe.send(False)
+    process.join(timeout=2.0)
+
+# ..............................................................................
+def stream_slowly(log, pipe, port, rate, seconds, label):
+    '''
+    Stream to a single client reading at the rate (bytes per second) for the
+    seconds, its frames rewritten in the ring while being sent, returning
+    the client once closed. Waits first for the server to remove any
+    earlier clients, whose counts would otherwise be lost from the totals.
+    '''
+    _end = time.time() + 5.0
+    while time.time() < _end:
+        pipe.send(True)
+        if pipe.recv()[4] == 0:
+            break
+        time.sleep(0.1)
+    _slow = Client(port, rcvbuf=16384)
+    pipe.send(True)
+    _, _, _dropped_start, _overruns_start, _ = pipe.recv()
+    try:
+        read_slowly(_slow, rate, seconds)
+    except ConnectionError as e:
+        log.error('slow client {}: {}'.format(label, e))
+        _slow.errors += 1
+    pipe.send(True)
+    _, _, _dropped_end, _overruns_end, _ = pipe.recv()
+    _slow.close()
+    log.info('slow client {} at {:5.1f}KB/s: {:d} parts, {:d} bad; {:d} dropped, {:d} overruns.'.format(label, rate / 1024.0,
+            _slow.parts, _slow.errors, _dropped_end - _dropped_start, _overruns_end - _overruns_start))
+    return _slow
+
+# ..............................................................................
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    _sorted = sorted(values)
+    return _sorted[min(len(_sorted) - 1, int(pct / 100.0 * len(_sorted)))]
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='load test the MJPEG streaming server.')
+    _parser.add_argument('--server',     choices=['threaded', 'asyncio'], default='asyncio', help='the server mode to test')
+    _parser.add_argument('--clients',    type=int, nargs='+', default=[1, 2, 4, 8, 12, 16, 24], help='client counts to step through')
+    _parser.add_argument('--seconds',    type=float, default=5.0, help='duration of each step')
+    _parser.add_argument('--port',       type=int, default=18001, help='local port for the test server')
+    _parser.add_argument('--frame-size', type=int, default=0, help='largest synthetic JPEG size in bytes (default: width x height / 8)')
+    _parser.add_argument('--slow-rate',  type=float, default=0.3, help='read rate of the slow client, as a fraction of the stream\'s')
+    _args = _parser.parse_args(argv)
+
+    _log = Logger('load-test', Level.INFO)
+    _config = ConfigLoader(Level.WARN).configure('config.yaml')['ros'].get('video')
+    _width, _height, _framerate = _config.get('width'), _config.get('height'), _config.get('framerate')
+    _frame_size = _args.frame_size if _args.frame_size > 0 else _width * _height // 8
+    _log.info('{} server; {:d} byte frames @ {:d}fps; {:4.1f}s per step.'.format(_args.server, _frame_size, _framerate, _args.seconds))
+
+    _process, _pipe = start_server(_args.server, _args.port, _width, _height, _framerate, _frame_size, 40)
+
+    _log.info(Fore.WHITE + '{:>8} {:>10} {:>12} {:>12} {:>12} {:>10} {:>9} {:>9}'.format(
+            'clients', 'fps/client', 'mean (ms)', 'p95 (ms)', 'max (ms)', 'cpu (%)', 'threads', 'dropped'))
+    _clients = []
+    _selector = selectors.DefaultSelector()
+    try:
+        for _count in _args.clients:
+            while len(_clients) < _count:
+                _client = Client(_args.port)
+                _selector.register(_client.socket, selectors.EVENT_READ, _client)
+                _clients.append(_client)
+            # settle, then measure
+            _settle = time.time() + 0.5
+            while time.time() < _settle:
+                for _key, _ in _selector.select(0.1):
+                    _key.data.receive()
+            for _client in _clients:
+                _client.latencies.clear()
+            _pipe.send(True)
+            _cpu_start, _, _dropped_start, _, _ = _pipe.recv()
+            _start = time.time()
+            while time.time() - _start < _args.seconds:
+                for _key, _ in _selector.select(0.1):
+                    _key.data.receive()
+            _pipe.send(True)
+            _cpu_end, _threads, _dropped_end, _, _ = _pipe.recv()
+            _elapsed = time.time() - _start
+            _latencies = [ _latency for _client in _clients for _latency in _client.latencies ]
+            _log.info('{:>8d} {:>10.1f} {:>12.2f} {:>12.2f} {:>12.2f} {:>10.1f} {:>9d} {:>9d}'.format(_count,
+                    len(_latencies) / _count / _elapsed,
+                    1000.0 * sum(_latencies) / max(1, len(_latencies)),
+                    1000.0 * percentile(_latencies, 95),
+                    1000.0 * max(_latencies, default=0.0),
+                    100.0 * ( _cpu_end - _cpu_start ) / _elapsed, _threads, _dropped_end - _dropped_start))
+        for _client in _clients:
+            _client.close()
+        _errors = sum(_client.errors for _client in _clients)
+
+        # a client reading more slowly than the stream, then the same never disconnected
+        _rate = _args.slow_rate * _framerate * 0.75 * _frame_size
+        _slow = [ stream_slowly(_log, _pipe, _args.port, _rate, _args.seconds, '(max lag 40)') ]
+        stop_server(_process, _pipe)
+        _process, _pipe = start_server(_args.server, _args.port + 1, _width, _height, _framerate, _frame_size, 0)
+        _slow.append(stream_slowly(_log, _pipe, _args.port + 1, _rate, _args.seconds, '(max lag 0)'))
+        _errors += sum(_client.errors for _client in _slow)
+    finally:
+        for _client in _clients:
+            _client.close()
+        stop_server(_process, _pipe)
+    if _errors or not all(_client.parts for _client in _slow):
+        _log.error('{:d} parts did not match their Content-Length.'.format(_errors))
+        sys.exit(1)
+    _log.info('complete.')
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
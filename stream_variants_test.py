@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the reduced-size stream variants ('/stream.mjpg?size=') of Video with
+# the simulated camera, in both server modes: that a variant's encoder runs
+# only while it has clients, and that its frames are smaller. Reports the
+# bandwidth and CPU time of each size, e.g.:
+#
+#   % python3 stream_variants_test.py
+#   % python3 stream_variants_test.py --server threaded
+#
+
+import sys, time, socket, asyncio, argparse, threading
+from colorama import init, Fore, Style
+init()
+
+from core.config_loader import ConfigLoader
+from core.logger import Level, Logger
+from lbr.hal import Hal
+from lbr.video import Video
+from test_support import Checker, wait_for
+
+# ..............................................................................
+class Client(object):
+    '''
+    A stream client reading on a thread of its own, counting the frames
+    and bytes received.
+    '''
+    def __init__(self, port, size):
+        self.frames = 0
+        self.bytes  = 0
+        self.status = None
+        self._socket = socket.create_connection(('127.0.0.1', port))
+        self._socket.sendall('GET /stream.mjpg?size={} HTTP/1.1\r\nHost: localhost\r\n\r\n'.format(size).encode('ascii'))
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self._thread.start()
+
+    def _receive(self):
+        try:
+            while True:
+                _chunk = self._socket.recv(1 << 20)
+                if not _chunk:
+                    return
+                if self.status is None:
+                    self.status = _chunk.split(b' ', 2)[1].decode('ascii')
+                self.bytes  += len(_chunk)
+                self.frames += _chunk.count(b'--FRAME')
+        except OSError:
+            pass
+
+    def close(self):
+        self._socket.close()
+        self._thread.join()
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='test the stream variants.')
+    _parser.add_argument('--server',  choices=['threaded', 'asyncio'], default='asyncio', help='the server mode to test')
+    _parser.add_argument('--seconds', type=float, default=3.0, help='seconds to stream each step')
+    _parser.add_argument('--port',    type=int, default=18002, help='local port for the test server')
+    _args = _parser.parse_args(argv)
+
+    _log = Logger('variants-test', Level.INFO)
+    _config = ConfigLoader(Level.WARN).configure('config.yaml')
+    _config['ros']['hal']['backend'] = 'sim'
+    _video_config = _config['ros']['video']
+    _video_config['enable_streaming']   = True
+    _video_config['enable_file_output'] = False
+    _video_config['duty_cycle']         = False
+    _video_config['server']             = _args.server
+    _video_config['port']               = _args.port
+    _video = Video(_config, Level.WARN, Hal(_config, Level.WARN))
+    _thread = threading.Thread(target=lambda: asyncio.run(_video.run()), daemon=True)
+    _thread.start()
+    time.sleep(1.0)
+
+    _checker = Checker(_log)
+    _check = _checker.check
+
+    def _active():
+        return { _name: _stats['active'] for _name, _stats in _video.get_stream_stats().items() }
+
+    _check(_active() == { 'full': True, 'small': False, 'medium': False }, 'no reduced-size encoder runs without clients.')
+    _unknown = Client(_args.port, 'huge')
+    time.sleep(0.5)
+    _check(_unknown.status == '404', 'an unknown size is not found.')
+    _unknown.close()
+
+    _small = [ Client(_args.port, 'small'), Client(_args.port, 'small') ]
+    _full  = Client(_args.port, 'full')
+    _check(wait_for(lambda: _active()['small'], 1.0), 'the small encoder started with its first client.')
+    time.sleep(_args.seconds)
+    _check(_active()['small'] and not _active()['medium'], 'only the watched sizes are encoded.')
+    _small[0].close()
+    time.sleep(0.5)
+    _check(_active()['small'], 'the small encoder kept running for its remaining client.')
+    _small[1].close()
+    _check(wait_for(lambda: not _active()['small'], 1.0), 'the small encoder stopped with its last client.')
+    _full.close()
+
+    _stats = _video.get_stream_stats()
+    for _name, _variant in _stats.items():
+        _log.info('{:<6} {:>9}: {:4d} frames, {:7.1f}KB/frame; sent {:8.1f}KB ({:7.1f}kbps); started {:d} times; cpu: write {}, send {:6.3f}s.'.format(
+                _name, '{}x{}'.format(*_variant['resolution']) if _variant['resolution'] else 'full', _variant['frames'],
+                _variant['bytes'] / max(1, _variant['frames']) / 1024.0, _variant['bytes_sent'] / 1024.0, _variant['send_kbps'],
+                _variant['starts'], '{:6.3f}s'.format(_variant['write_cpu_sec']) if _variant['write_cpu_sec'] is not None else '     -',
+                _variant['send_cpu_sec']))
+    _check(_small[1].frames > 0 and _full.frames > 0, 'the clients received frames.')
+    _check(_stats['small']['bytes'] / max(1, _stats['small']['frames']) < _stats['full']['bytes'] / max(1, _stats['full']['frames']) / 4,
+            'small frames are a fraction of the size of full frames.')
+    _check(_stats['medium']['frames'] == 0, 'the medium size was never encoded.')
+
+    _video.stop()
+    _thread.join()
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
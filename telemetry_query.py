@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Reads the telemetry recorded by lbrd (see 'telemetry' in config.yaml),
+# streaming the records of the files rather than loading them, optionally
+# filtered by time, source and event. Prints the records as JSON lines, or
+# with --daily the number of each source and event per day, e.g.:
+#
+#   % python3 telemetry_query.py --source door --since 2026-10-01
+#   % python3 telemetry_query.py --daily --days 30
+#
+
+import sys, json, time, argparse
+from datetime import datetime as dt
+
+from lbr.telemetry import Telemetry
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='read the letterbox robot telemetry.')
+    _parser.add_argument('--dir',    default='telemetry', help='the directory of the telemetry files')
+    _parser.add_argument('--since',  help='the earliest local date or time, e.g., 2026-10-01 or 2026-10-01T08:00')
+    _parser.add_argument('--until',  help='the local date or time before which to stop')
+    _parser.add_argument('--days',   type=float, help='only the last this many days')
+    _parser.add_argument('--source', action='append', help='only records of this source (pir, switch, door, stream); may be repeated')
+    _parser.add_argument('--event',  action='append', help='only records of this event (e.g., open); may be repeated')
+    _parser.add_argument('--daily',  action='store_true', help='print the number of each source and event per day')
+    _args = _parser.parse_args(argv)
+
+    _since = dt.fromisoformat(_args.since).timestamp() if _args.since else None
+    _until = dt.fromisoformat(_args.until).timestamp() if _args.until else None
+    if _args.days:
+        _since = max(_since or 0.0, time.time() - _args.days * 86400.0)
+    _records = Telemetry.read(_args.dir, _since, _until, _args.source, _args.event)
+    if not _args.daily:
+        for _record in _records:
+            print(json.dumps(_record, separators=( ',', ':' )))
+        return
+    _days = {} # day: { 'source event': count }
+    for _record in _records:
+        _day = _days.setdefault(dt.fromtimestamp(_record['t']).strftime('%Y-%m-%d'), {})
+        _key = '{} {}'.format(_record['src'], _record['ev'])
+        _day[_key] = _day.get(_key, 0) + 1
+    for _day, _counts in _days.items():
+        print('{}  {}'.format(_day, ', '.join('{} {:d}'.format(_key, _count) for _key, _count in sorted(_counts.items()))))
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
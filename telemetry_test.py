@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the Telemetry in a temporary directory: that records from several
+# threads are written in batches (one sync each), that files are rotated and
+# the oldest deleted, that a partial last line is skipped, and that read()
+# filters by time, source and event. Reports the cost of record() on the
+# calling thread, e.g.:
+#
+#   % python3 telemetry_test.py
+#
+
+import os, sys, time, shutil, argparse, tempfile, threading
+from colorama import init, Fore, Style
+init()
+
+from core.logger import Level, Logger
+from lbr.telemetry import Telemetry
+from test_support import Checker
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='test the telemetry.')
+    _parser.add_argument('--records', type=int, default=20000, help='records made when timing')
+    _args = _parser.parse_args(argv)
+    _log = Logger('telem-test', Level.INFO)
+    _dirname = tempfile.mkdtemp()
+
+    _checker = Checker(_log)
+    _check = _checker.check
+
+    # records from several threads, written in one batch
+    _telemetry = Telemetry(_dirname, sync_sec=0.5, level=Level.WARN)
+    def _record(source):
+        for _count in range(50):
+            _telemetry.record(source, 'count', count=_count)
+    _threads = [ threading.Thread(target=_record, args=[ _source ]) for _source in ( 'pir', 'door', 'stream', 'switch' ) ]
+    for _thread in _threads:
+        _thread.start()
+    for _thread in _threads:
+        _thread.join()
+    time.sleep(0.1)
+    _check(_telemetry.get_stats()['syncs'] == 0, 'nothing was written before the sync period.')
+    time.sleep(0.6)
+    _stats = _telemetry.get_stats()
+    _check(_stats['syncs'] == 1 and _stats['records'] == 200, 'the 200 records were written with one sync.')
+    _middle = time.time()
+    time.sleep(0.01)
+    _telemetry.record('door', 'open', elapsed_sec=0.0)
+    _telemetry.record('door', 'closed', elapsed_sec=4.2)
+    _telemetry.close()
+    _records = list(Telemetry.read(_dirname))
+    _check(len(_records) == 202 and _records[-1] == { 't': _records[-1]['t'], 'src': 'door', 'ev': 'closed', 'elapsed_sec': 4.2 },
+            'every record was written on close.')
+    _check(len(list(Telemetry.read(_dirname, sources=[ 'pir' ]))) == 50, 'records are filtered by source.')
+    _check([ _record['ev'] for _record in Telemetry.read(_dirname, since=_middle, sources=[ 'door' ]) ] == [ 'open', 'closed' ],
+            'records are filtered by time and event.')
+
+    # a partial last line, as left by a crash
+    _filename = Telemetry.files(_dirname)[-1]
+    with open(_filename, 'ab') as _file:
+        _file.write(b'{"t":17922')
+    _check(len(list(Telemetry.read(_dirname))) == 202, 'a partial line is skipped.')
+
+    # rotation and deletion of the oldest
+    shutil.rmtree(_dirname)
+    _telemetry = Telemetry(_dirname, max_bytes=2048, max_files=3, sync_sec=0.05, level=Level.WARN)
+    for _count in range(200):
+        _telemetry.record('pir', 'count', count=_count)
+        if _count % 20 == 19:
+            time.sleep(0.1)
+    _telemetry.close()
+    _files = Telemetry.files(_dirname)
+    _counts = [ _record['count'] for _record in Telemetry.read(_dirname) ]
+    _check(len(_files) == 3 and all(os.path.getsize(_file) <= 2048 for _file in _files), 'files were rotated, the oldest deleted.')
+    _check(_counts == list(range(_counts[0], 200)), 'the files kept are read in order, from record {:d}.'.format(_counts[0]))
+
+    # the cost of a record on the calling thread
+    shutil.rmtree(_dirname)
+    _telemetry = Telemetry(_dirname, level=Level.WARN)
+    _cpu = time.thread_time()
+    for _count in range(_args.records):
+        _telemetry.record('pir', 'count', count=_count % 10)
+    _cpu = time.thread_time() - _cpu
+    _telemetry.close()
+    _stats = _telemetry.get_stats()
+    _log.info('record(): {:5.1f}µs; {:d} records in {:d} syncs, {:5.1f} bytes each.'.format(1e6 * _cpu / _args.records,
+            _stats['records'], _stats['syncs'], _stats['bytes'] / _stats['records']))
+
+    shutil.rmtree(_dirname)
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF
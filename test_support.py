@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Helpers shared by the *_test.py scripts: a Checker counting the checks that
+# fail, waiting upon a condition, and HTTP requests to a local test server.
+#
+
+import sys, time, http.client
+from colorama import init, Fore, Style
+init()
+
+# ..............................................................................
+class Checker(object):
+    '''
+    Logs each check of a test script as ok or FAIL, counting the failures.
+    Call finish() at the end of the script, which exits with a status of 1
+    if any check failed.
+
+    :param log:  the Logger of the test script
+    '''
+    def __init__(self, log):
+        self._log = log
+        self.failures = 0
+
+    # ..........................................................................
+    def check(self, condition, message):
+        '''
+        Log the message as ok if the condition holds, otherwise as a failure.
+        Returns the condition.
+        '''
+        if condition:
+            self._log.info(Fore.GREEN + 'ok: ' + message)
+        else:
+            self._log.error('FAIL: ' + message)
+            self.failures += 1
+        return condition
+
+    # ..........................................................................
+    def finish(self):
+        if self.failures:
+            self._log.error('{:d} failures.'.format(self.failures))
+            sys.exit(1)
+        self._log.info(Fore.GREEN + 'passed.')
+
+# ..............................................................................
+def wait_for(condition, timeout, poll_sec=0.01):
+    '''
+    Returns True once the condition holds, False if it doesn't within the
+    timeout (seconds).
+    '''
+    return time_until(condition, timeout, poll_sec) is not None
+
+# ..............................................................................
+def time_until(condition, timeout, poll_sec=0.01):
+    '''
+    Returns the seconds taken for the condition to hold, or None if it
+    doesn't within the timeout.
+    '''
+    _start = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - _start > timeout:
+            return None
+        time.sleep(poll_sec)
+    return time.perf_counter() - _start
+
+# ..............................................................................
+def request(port, method, path, headers=None):
+    '''
+    Returns the status, the response (for its headers) and the body of a
+    request to the local server on the port.
+    '''
+    _connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5.0)
+    _connection.request(method, path, headers=headers or {})
+    _response = _connection.getresponse()
+    _body = _response.read()
+    _connection.close()
+    return _response.status, _response, _body
+
+# ..............................................................................
+def get(port, path, headers=None):
+    '''
+    Returns the status, the response and the body of a GET request.
+    '''
+    return request(port, 'GET', path, headers)
+
+#EOF
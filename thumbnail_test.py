@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020-2021 by Murray Altheim. All rights reserved. This file is part
+# of the Robot Operating System project, released under the MIT License. Please
+# see the LICENSE file included as part of this package.
+#
+# author:   Murray Altheim
+# created:  2026-10-17
+# modified: 2026-10-17
+#
+# Tests the thumbnails of Video with the simulated camera, in both server
+# modes: that '/thumb.jpg' is a greyscale JPEG at the configured scale, that
+# consumers of the same frame (concurrent requests, the motion and mail
+# detectors) share a single decode, and reports the cost of a scaled decode
+# against a full one, e.g.:
+#
+#   % python3 thumbnail_test.py
+#   % python3 thumbnail_test.py --server threaded
+#
+
+import io, sys, time, asyncio, argparse, threading
+from colorama import init, Fore, Style
+init()
+from PIL import Image
+
+from core.config_loader import ConfigLoader
+from core.logger import Level, Logger
+from lbr.hal import Hal, SimCamera
+from lbr.thumbnailer import Thumbnailer
+from lbr.video import Video
+from test_support import Checker, get
+
+# main .........................................................................
+def main(argv):
+    _parser = argparse.ArgumentParser(description='test the thumbnails of the video.')
+    _parser.add_argument('--server',  choices=['threaded', 'asyncio'], default='asyncio', help='the server mode to test')
+    _parser.add_argument('--port',    type=int, default=18005, help='local port for the test server')
+    _parser.add_argument('--clients', type=int, default=8, help='concurrent requests made for each frame')
+    _args = _parser.parse_args(argv)
+
+    _log = Logger('thumb-test', Level.INFO)
+    _config = ConfigLoader(Level.WARN).configure('config.yaml')
+    _config['ros']['hal']['backend'] = 'sim'
+    _video_config = _config['ros']['video']
+    _video_config['enable_streaming']   = True
+    _video_config['enable_file_output'] = False
+    _video_config['duty_cycle']         = False
+    _video_config['server']             = _args.server
+    _video_config['port']               = _args.port
+    _video_config['thumbnail']          = True
+    _video_config['motion_detect']      = True
+    _video_config['mail_detect']        = True
+    _video_config['mail_settle_sec']    = 0.2
+    _video_config['mail_interval_sec']  = 0.5
+    _video_config['mail_baseline_file'] = None
+    _width, _height = _video_config['width'], _video_config['height']
+    _scale = _video_config.get('thumbnail_scale', 8)
+    _video = Video(_config, Level.WARN, Hal(_config, Level.WARN))
+    _thread = threading.Thread(target=lambda: asyncio.run(_video.run()), daemon=True)
+    _thread.start()
+    time.sleep(1.0)
+
+    _checker = Checker(_log)
+    _check = _checker.check
+
+    _status, _response, _body = get(_args.port, '/thumb.jpg')
+    _image = Image.open(io.BytesIO(_body)) if _status == 200 else None
+    _check(_response.getheader('Content-Type') == 'image/jpeg' and _image is not None and _image.mode == 'L' and _image.size == ( _width // _scale, _height // _scale ),
+            'the thumbnail is a {}x{} greyscale JPEG of {:d} bytes.'.format(*( _image.size if _image else ( 0, 0 ) ), len(_body)))
+
+    # concurrent requests for the thumbnail, alongside the detectors
+    _before = _video.get_thumbnail_stats()
+    _errors = []
+    def _poll():
+        for _ in range(20):
+            _status, _, _ = get(_args.port, '/thumb.jpg')
+            if _status != 200:
+                _errors.append(_status)
+            time.sleep(0.01)
+    _pollers = [ threading.Thread(target=_poll) for _ in range(_args.clients) ]
+    _start = time.perf_counter()
+    for _poller in _pollers:
+        _poller.start()
+    for _poller in _pollers:
+        _poller.join()
+    _elapsed = time.perf_counter() - _start
+    _stats = _video.get_thumbnail_stats()
+    _requests, _decodes, _encodes = ( _stats[_key] - _before[_key] for _key in ( 'requests', 'decodes', 'encodes' ) )
+    _frames = int(_elapsed * _video_config['framerate']) + 1
+    _log.info('{:d} requests over {:5.2f}s ({:d} frames): {:d} decodes, {:d} encodes; cpu {:5.3f}s in all.'.format(
+            _requests, _elapsed, _frames, _decodes, _encodes, _stats['cpu_sec']))
+    _check(not _errors, 'every request was answered.')
+    _check(_decodes <= _frames + 1 and _encodes <= _decodes, 'each frame was decoded at most once, however many consumers.')
+    _motion, _mail = _video.get_motion_stats(), _video.get_mail_stats()
+    _check(_motion['samples'] > 0 and _mail['evaluations'] > 0, 'the motion and mail detectors analysed thumbnails.')
+
+    _video.stop()
+    _thread.join()
+
+    # the cost of a scaled decode against a full one
+    _jpeg = SimCamera.render_frames(( _width, _height ), 1)[0]
+    for _each_scale in Thumbnailer.SCALES:
+        _cpu = time.thread_time()
+        for _ in range(20):
+            Thumbnailer.decode(_jpeg, _each_scale)
+        _log.info('decode at 1/{:d}: {:6.2f}ms'.format(_each_scale, 1000.0 * ( time.thread_time() - _cpu ) / 20))
+    _cpu = time.thread_time()
+    for _ in range(20):
+        Image.open(io.BytesIO(_jpeg)).convert('RGB')
+    _log.info('full colour decode: {:6.2f}ms'.format(1000.0 * ( time.thread_time() - _cpu ) / 20))
+
+    _checker.finish()
+
+# call main ....................................................................
+if __name__== "__main__":
+    main(sys.argv[1:])
+
+#EOF